@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""История результатов нагрузочных прогонов и поиск регрессий между прошивками.
+
+Хранилище - каталог с файлами:
+    strings.txt  - имена образов и endpoint, номер строки служит id;
+    runs.bin     - записи фиксированной длины (RECORD), по одной на
+                   endpoint прогона, только дозапись;
+    images.json  - пакеты каждого образа из image_metadata, чтобы
+                   регрессию можно было сопоставить со сменой пакетов;
+    lock         - flock для одновременной записи из нескольких процессов.
+
+У каждого сценария нагрузки (locustfile, open-loop, обход дерева) свой
+подкаталог хранилища (--scenario, scenario_store()): базовая линия и MAD
+считаются только по прогонам с тем же профилем нагрузки.
+
+Запись прогона - одна операция write в конец файла, чтение последних
+прогонов идет с конца блоками, поэтому и дозапись, и выборка базовой
+линии не зависят от размера истории. Оборванная при падении запись
+(хвост короче RECORD.size) просто игнорируется.
+
+Регрессия ищется по устойчивой z-оценке: текущее значение сравнивается
+с медианой последних N прогонов с учетом MAD, а изменение должно быть
+больше min_change, чтобы шум эмулятора не давал ложных срабатываний.
+Если все прогоны базовой линии одинаковы (MAD = 0), z-оценка не
+считается (null в JSON) и регрессию определяет только min_change.
+
+    python lab7/tests/bench_history.py --store ~/openbmc-history --scenario locustfile record \
+        --csv results/load_stats.csv --image-dir romulus
+    python lab7/tests/bench_history.py --store ~/openbmc-history --scenario locustfile compare \
+        --junit results/load_regressions.xml
+    python lab7/tests/bench_history.py --store ~/openbmc-history --scenario locustfile list
+"""
+
+import argparse
+import configparser
+import csv
+import fcntl
+import glob
+import json
+import os
+import statistics
+import struct
+import sys
+import time
+
+import image_metadata
+from xml_reporter import XMLReporter
+
+RECORD = struct.Struct("<dIIIIffffff")
+FIELDS = ("timestamp", "image", "endpoint", "requests", "failures",
+          "rps", "avg", "p50", "p95", "p99", "max")
+READ_BLOCK = 4096
+
+# Для латентности регрессия - рост значения, для пропускной способности - падение.
+METRICS = {"p95": 1, "p99": 1, "rps": -1}
+
+WINDOW = 10
+MIN_RUNS = 3
+Z_THRESHOLD = 3.0
+MIN_CHANGE = 0.10
+TOTAL_NAME = "Aggregated"
+
+
+def detect_image(romulus_dir):
+    """Имя образа из qemuboot.conf (или testdata.json) каталога сборки."""
+    for path in sorted(glob.glob(os.path.join(romulus_dir, "obmc-phosphor-image-*.qemuboot.conf"))):
+        parser = configparser.ConfigParser()
+        parser.read(path)
+        if parser.has_option("config_bsp", "image_name"):
+            return parser.get("config_bsp", "image_name")
+
+    for path in sorted(glob.glob(os.path.join(romulus_dir, "obmc-phosphor-image-*.testdata.json"))):
+        with open(path, encoding="utf-8") as f:
+            name = json.load(f).get("IMAGE_NAME")
+        if name:
+            return name
+    return "unknown"
+
+
+def stats_from_environment(environment):
+    """Метрики прогона Locust по endpoint, включая Aggregated."""
+    endpoints = {}
+    entries = list(environment.stats.entries.values()) + [environment.stats.total]
+    for entry in entries:
+        if not entry.num_requests:
+            continue
+        name = entry.name
+        if entry.method and not name.startswith(entry.method):
+            name = f"{entry.method} {name}"
+        endpoints[name] = {
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "rps": entry.total_rps,
+            "avg": entry.avg_response_time,
+            "p50": entry.get_response_time_percentile(0.5),
+            "p95": entry.get_response_time_percentile(0.95),
+            "p99": entry.get_response_time_percentile(0.99),
+            "max": entry.max_response_time or 0,
+        }
+    return endpoints
+
+
+def scenario_store(directory, scenario):
+    """Хранилище прогонов одного сценария нагрузки в подкаталоге directory."""
+    return HistoryStore(os.path.join(directory, scenario))
+
+
+class HistoryStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.runs_path = os.path.join(directory, "runs.bin")
+        self.strings_path = os.path.join(directory, "strings.txt")
+        self.lock_path = os.path.join(directory, "lock")
+        self.images_path = os.path.join(directory, "images.json")
+        self._strings = []
+        self._ids = {}
+        self._load_strings()
+
+    def _load_strings(self):
+        if not os.path.exists(self.strings_path):
+            return
+        with open(self.strings_path, encoding="utf-8") as f:
+            lines = f.read().split("\n")[:-1]
+        for name in lines[len(self._strings):]:
+            self._ids[name] = len(self._strings)
+            self._strings.append(name)
+
+    def _intern(self, name, strings_file):
+        name = name.replace("\n", " ")
+        if name not in self._ids:
+            strings_file.write(name + "\n")
+            self._ids[name] = len(self._strings)
+            self._strings.append(name)
+        return self._ids[name]
+
+    def name(self, string_id):
+        if string_id >= len(self._strings):
+            self._load_strings()
+        return self._strings[string_id]
+
+    def append(self, image, endpoints, timestamp=None):
+        """Дописывает прогон: endpoints - {name: {requests, failures, rps, avg, p50, p95, p99, max}}."""
+        timestamp = timestamp or time.time()
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load_strings()
+            with open(self.strings_path, "a", encoding="utf-8") as strings_file:
+                image_id = self._intern(image, strings_file)
+                chunks = []
+                for name, m in endpoints.items():
+                    chunks.append(RECORD.pack(
+                        timestamp, image_id, self._intern(name, strings_file),
+                        int(m["requests"]), int(m["failures"]),
+                        m["rps"], m["avg"], m["p50"], m["p95"], m["p99"], m["max"],
+                    ))
+            with open(self.runs_path, "ab") as runs:
+                runs.write(b"".join(chunks))
+        return timestamp
+
+    def record_packages(self, image, packages):
+        """Запоминает пакеты образа {пакет: версия}; файл переписывается, только если они новые."""
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            images = self.image_packages()
+            if images.get(image) == packages:
+                return
+            images[image] = packages
+            tmp = f"{self.images_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(images, f, separators=(",", ":"))
+            os.replace(tmp, self.images_path)
+
+    def image_packages(self):
+        """{образ: {пакет: версия}} для образов, записанных через record_packages."""
+        if not os.path.exists(self.images_path):
+            return {}
+        with open(self.images_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def iter_reverse(self):
+        """Записи от новых к старым как словари FIELDS."""
+        if not os.path.exists(self.runs_path):
+            return
+        with open(self.runs_path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size // RECORD.size * RECORD.size
+            while end > 0:
+                start = max(0, end - READ_BLOCK * RECORD.size)
+                f.seek(start)
+                block = f.read(end - start)
+                records = list(RECORD.iter_unpack(block))
+                for values in reversed(records):
+                    yield dict(zip(FIELDS, values))
+                end = start
+
+    def runs(self, limit=None):
+        """Последние прогоны: [(timestamp, image, {endpoint: metrics})], от новых к старым."""
+        result = []
+        current = None
+        for record in self.iter_reverse():
+            if current is None or current[0] != record["timestamp"]:
+                if limit is not None and len(result) == limit:
+                    break
+                current = (record["timestamp"], self.name(record["image"]), {})
+                result.append(current)
+            current[2][self.name(record["endpoint"])] = record
+        return result
+
+    def baseline(self, endpoint, before, window=WINDOW):
+        """Значения endpoint за window прогонов, предшествующих моменту before."""
+        endpoint_id = self._ids.get(endpoint)
+        if endpoint_id is None:
+            return []
+        values = []
+        for record in self.iter_reverse():
+            if record["timestamp"] >= before or record["endpoint"] != endpoint_id:
+                continue
+            values.append(record)
+            if len(values) == window:
+                break
+        return values
+
+
+def compare(store, current, before, window=WINDOW, z_threshold=Z_THRESHOLD,
+            min_change=MIN_CHANGE, min_runs=MIN_RUNS):
+    """Сравнивает метрики прогона с базовой линией; возвращает список словарей."""
+    findings = []
+    for endpoint, metrics in current.items():
+        history = store.baseline(endpoint, before, window)
+        for metric, direction in METRICS.items():
+            value = metrics[metric]
+            finding = {
+                "endpoint": endpoint,
+                "metric": metric,
+                "current": value,
+                "baseline_runs": len(history),
+                "baseline": None,
+                "change_pct": None,
+                "z": None,
+                "regression": False,
+            }
+            if len(history) >= min_runs:
+                samples = [record[metric] for record in history]
+                median = statistics.median(samples)
+                mad = statistics.median(abs(x - median) for x in samples) * 1.4826
+                change = (value - median) / median if median else 0.0
+                delta = (value - median) * direction
+                beyond = change * direction > min_change
+                if mad:
+                    z = delta / mad
+                    regression = z > z_threshold and beyond
+                else:
+                    z = None
+                    regression = beyond
+                finding.update(
+                    baseline=median,
+                    change_pct=change * 100,
+                    z=z,
+                    regression=regression,
+                )
+            findings.append(finding)
+    return findings
+
+
+def stats_from_csv(path):
+    """Метрики прогона из *_stats.csv, который пишет locust --csv."""
+    def number(value):
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+
+    endpoints = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            requests = int(number(row["Request Count"]))
+            if not requests:
+                continue
+            name = row["Name"]
+            if row["Type"] and not name.startswith(row["Type"]):
+                name = f"{row['Type']} {name}"
+            endpoints[name] = {
+                "requests": requests,
+                "failures": int(number(row["Failure Count"])),
+                "rps": number(row["Requests/s"]),
+                "avg": number(row["Average Response Time"]),
+                "p50": number(row["50%"]),
+                "p95": number(row["95%"]),
+                "p99": number(row["99%"]),
+                "max": number(row["Max Response Time"]),
+            }
+    return endpoints
+
+
+def record_and_compare(store, image, endpoints, packages=None, **kwargs):
+    if packages is not None:
+        store.record_packages(image, packages)
+    timestamp = store.append(image, endpoints)
+    return compare(store, endpoints, timestamp, **kwargs)
+
+
+def package_changes(store, image, window=WINDOW):
+    """(предыдущий образ, diff пакетов) относительно последнего из window прогонов на другом образе."""
+    images = store.image_packages()
+    if image not in images:
+        return None
+    for _, previous, _ in store.runs(window + 1):
+        if previous != image and previous in images:
+            return previous, image_metadata.diff_packages(images[previous], images[image])
+    return None
+
+
+def report_changes(changes, reporter, suite="load"):
+    if changes is None:
+        return
+    previous, diff = changes
+    lines = image_metadata.format_diff(diff)
+    reporter.add_test_result(
+        suite, f"packages since {previous}", 'passed',
+        f"изменений {len(lines)}" + (": " + "; ".join(lines) if lines else ""), 0
+    )
+
+
+def _score(finding):
+    if finding["z"] is not None:
+        return f"z={finding['z']:.1f}"
+    return "MAD=0, изменение больше min_change" if finding["regression"] else "MAD=0"
+
+
+def report(findings, reporter, suite="load"):
+    for f in findings:
+        if f["baseline"] is None:
+            continue
+        message = (
+            f"{f['metric']}={f['current']:.2f}, baseline={f['baseline']:.2f} "
+            f"({f['change_pct']:+.1f}%, {_score(f)}, runs={f['baseline_runs']})"
+        )
+        status = 'failed' if f["regression"] else 'passed'
+        reporter.add_test_result(suite, f"regression {f['endpoint']} {f['metric']}", status, message, 0)
+    return not any(f["regression"] for f in findings)
+
+
+def print_findings(findings):
+    for f in findings:
+        if f["baseline"] is None:
+            print(f"{f['endpoint']} {f['metric']}: мало прогонов для сравнения ({f['baseline_runs']})")
+            continue
+        mark = "РЕГРЕССИЯ" if f["regression"] else "ok"
+        print(
+            f"{mark:9} {f['endpoint']} {f['metric']}: {f['current']:.2f} "
+            f"против {f['baseline']:.2f} ({f['change_pct']:+.1f}%, {_score(f)})"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="История нагрузочных прогонов OpenBMC")
+    parser.add_argument("--store", required=True, help="каталог хранилища истории")
+    parser.add_argument("--scenario", help="сценарий нагрузки; у каждого своя история в подкаталоге --store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compare_cmd = sub.add_parser("compare", help="сравнить последний прогон с базовой линией")
+    compare_cmd.add_argument("--window", type=int, default=WINDOW)
+    compare_cmd.add_argument("--z-threshold", type=float, default=Z_THRESHOLD)
+    compare_cmd.add_argument("--min-change", type=float, default=MIN_CHANGE)
+    compare_cmd.add_argument("--output", help="записать результат в JSON")
+    compare_cmd.add_argument("--junit", help="записать результат в JUnit XML")
+
+    record_cmd = sub.add_parser("record", help="добавить прогон из locust --csv")
+    record_cmd.add_argument("--csv", required=True, help="файл *_stats.csv")
+    record_cmd.add_argument("--image", help="имя образа прошивки")
+    record_cmd.add_argument("--image-dir", help="каталог сборки romulus для определения имени образа")
+
+    list_cmd = sub.add_parser("list", help="последние прогоны")
+    list_cmd.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    store = scenario_store(args.store, args.scenario) if args.scenario else HistoryStore(args.store)
+
+    if args.command == "record":
+        image = args.image or (detect_image(args.image_dir) if args.image_dir else "unknown")
+        endpoints = stats_from_csv(args.csv)
+        if args.image_dir:
+            index = image_metadata.load_index(args.image_dir)
+            if image in index.images:
+                store.record_packages(image, index.images[image]["packages"])
+        store.append(image, endpoints)
+        print(f"Записан прогон {image}: {len(endpoints)} endpoint")
+        return 0
+
+    if args.command == "list":
+        for timestamp, image, endpoints in store.runs(args.limit):
+            total = endpoints.get(TOTAL_NAME, {})
+            print(
+                f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))} {image} "
+                f"rps={total.get('rps', 0):.2f} p95={total.get('p95', 0):.0f}ms "
+                f"p99={total.get('p99', 0):.0f}ms endpoints={len(endpoints)}"
+            )
+        return 0
+
+    latest = store.runs(1)
+    if not latest:
+        print("История пуста")
+        return 0
+    timestamp, image, endpoints = latest[0]
+    print(f"Прогон {image} от {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}")
+    findings = compare(
+        store, endpoints, timestamp,
+        window=args.window, z_threshold=args.z_threshold, min_change=args.min_change
+    )
+    print_findings(findings)
+    changes = package_changes(store, image, args.window)
+    if changes is not None:
+        lines = image_metadata.format_diff(changes[1])
+        print(f"Пакеты относительно {changes[0]}: изменений {len(lines)}")
+        for line in lines:
+            print(f"  {line}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            result = {"image": image, "timestamp": timestamp, "findings": findings}
+            if changes is not None:
+                result["packages"] = dict(changes[1], previous=changes[0])
+            json.dump(result, f, indent=2)
+    if args.junit:
+        reporter = XMLReporter(args.junit, name="OpenBMC Load History")
+        report(findings, reporter)
+        report_changes(changes, reporter)
+        reporter.close()
+    return 1 if any(f["regression"] for f in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
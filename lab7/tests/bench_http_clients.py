@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Сравнение HttpUser (requests) и FastHttpUser (geventhttpclient) на одном BMC.
+
+Оба варианта нагрузочного сценария из load_users.py запускаются по
+очереди в этом процессе без пауз между задачами; печатаются RPS,
+перцентили, загрузка CPU генератора и число TLS-рукопожатий:
+
+    python lab7/tests/bench_http_clients.py --host https://localhost:2443 --users 20 --run-time 60
+"""
+
+from locust import constant
+import argparse
+import os
+import sys
+
+import fast_http
+import load_runner
+from load_users import OpenBMCFastLoadTest, OpenBMCLoadTest
+
+
+def benchmark(host, users, spawn_rate, run_time):
+    """Один и тот же сценарий на requests и на geventhttpclient без пауз между задачами."""
+    results = {}
+    for label, base in (("requests", OpenBMCLoadTest), ("fast", OpenBMCFastLoadTest)):
+        user_class = type(f"{base.__name__}Bench", (base,), {"wait_time": constant(0)})
+        environment = load_runner.run_load(
+            [user_class], host, users=users, spawn_rate=spawn_rate, run_time=run_time
+        )
+        total = environment.stats.total
+        results[label] = dict(
+            fast_http.connection_stats(environment),
+            rps=total.total_rps,
+            p50=total.get_response_time_percentile(0.5),
+            p95=total.get_response_time_percentile(0.95),
+            cpu=environment.cpu_monitor.summary().get("local", {}).get("avg", 0.0),
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение HttpUser и FastHttpUser на одном BMC")
+    parser.add_argument("--host", default=os.environ.get("OPENBMC_URL", "https://localhost:2443"))
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--spawn-rate", type=float, default=20)
+    parser.add_argument("--run-time", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.host, args.users, args.spawn_rate, args.run_time)
+    print(f"{'client':<10} {'rps':>8} {'p50':>7} {'p95':>7} {'cpu%':>6} {'full':>6} {'resumed':>8} {'reuse':>7}")
+    for label, row in results.items():
+        print(
+            f"{label:<10} {row['rps']:>8.1f} {row['p50']:>7.0f} {row['p95']:>7.0f} {row['cpu']:>6.0f} "
+            f"{row['handshakes_full']:>6} {row['handshakes_resumed']:>8} {row['connection_reuse']:>7.1%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Ферма из нескольких romulus в QEMU и реестр целей для pytest и Locust.
+
+Каждый экземпляр запускается через QemuManager в своем каталоге
+состояния со свободными портами для SSH, HTTPS и IPMI. Список
+поднятых BMC пишется в JSON-реестр, путь к которому передается тестам
+через OPENBMC_TARGETS:
+
+    python lab7/tests/bmc_farm.py start --count 3 --state-root ~/qemu-farm --registry results/targets.json
+    OPENBMC_TARGETS=results/targets.json python -m pytest lab7/tests -n 6 --dist loadgroup
+
+Без реестра единственная цель берется из OPENBMC_URL, как и раньше.
+worker-процессы pytest-xdist и пользователи Locust распределяются по
+целям по кругу. --dist loadgroup обязателен: тесты группы xdist_group
+"power" меняют питание BMC и должны идти одним worker подряд, иначе
+без фермы они переключают питание одной и той же цели одновременно.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from qemu_manager import (
+    BOOT_TIMEOUT, QemuError, QemuManager, find_qemuboot, redfish_ready, stop_from_pid_file
+)
+
+REGISTRY_ENV = "OPENBMC_TARGETS"
+DEFAULT_URL = "https://localhost:2443"
+
+
+def free_port(kind=socket.SOCK_STREAM, host="127.0.0.1"):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def load_targets(path=None):
+    """Цели из реестра OPENBMC_TARGETS или одна цель из OPENBMC_URL."""
+    path = path or os.environ.get(REGISTRY_ENV)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            targets = json.load(f)["targets"]
+        if targets:
+            return targets
+    return [{"name": "default", "url": os.environ.get("OPENBMC_URL", DEFAULT_URL)}]
+
+
+def save_targets(path, targets):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"targets": targets}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def shard_index(worker):
+    """Номер worker pytest-xdist ("gw3" -> 3), без xdist - 0."""
+    if not worker:
+        return 0
+    digits = "".join(c for c in worker if c.isdigit())
+    return int(digits) if digits else 0
+
+
+def target_for(index, targets=None):
+    targets = targets or load_targets()
+    return targets[index % len(targets)]
+
+
+def health_check(targets, timeout=5):
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        results = executor.map(lambda t: redfish_ready(t["url"], timeout), targets)
+    return {target["name"]: ok for target, ok in zip(targets, results)}
+
+
+_user_counter = itertools.count()
+
+
+def assign_target(user):
+    """Переводит пользователя Locust на следующую цель из реестра.
+
+    Счетчик начинается со смещения worker_index, чтобы worker-процессы
+    с небольшим числом пользователей не нагружали только первую цель.
+    """
+    if not os.environ.get(REGISTRY_ENV):
+        return user.host
+    targets = load_targets()
+    offset = getattr(user.environment.runner, "worker_index", 0) or 0
+    url = target_for(offset + next(_user_counter), targets)["url"]
+    user.host = url
+    if hasattr(user, "client"):
+        user.client.base_url = url
+    return url
+
+
+class BmcFarm:
+    def __init__(self, count, state_root, qemuboot, image=None, snapshot=True,
+                 boot_timeout=BOOT_TIMEOUT):
+        if count < 1:
+            raise ValueError("Число экземпляров BMC должно быть не меньше 1")
+        self.managers = []
+        for i in range(count):
+            ports = {
+                "ssh": free_port(),
+                "https": free_port(),
+                "ipmi": free_port(socket.SOCK_DGRAM),
+            }
+            self.managers.append(QemuManager(
+                qemuboot, os.path.join(state_root, f"bmc{i}"), image=image, ports=ports,
+                snapshot=snapshot, boot_timeout=boot_timeout
+            ))
+        self.errors = {}
+
+    def start(self):
+        """Запускает все экземпляры параллельно и возвращает поднявшиеся цели."""
+        def start_one(manager):
+            try:
+                return manager.start()
+            except (QemuError, OSError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=len(self.managers)) as executor:
+            results = list(executor.map(start_one, self.managers))
+
+        targets = []
+        for i, (manager, result) in enumerate(zip(self.managers, results)):
+            name = f"bmc{i}"
+            if isinstance(result, Exception):
+                self.errors[name] = str(result)
+                continue
+            targets.append({
+                "name": name,
+                "url": manager.base_url,
+                "ssh_port": manager.ports["ssh"],
+                "ipmi_port": manager.ports["ipmi"],
+                "state_dir": manager.state_dir,
+                "boot": result,
+            })
+        if not targets:
+            raise QemuError(f"Не поднялся ни один BMC: {self.errors}")
+        return targets
+
+    def stop(self):
+        for manager in self.managers:
+            manager.stop()
+
+
+def stop_targets(targets):
+    for target in targets:
+        state_dir = target.get("state_dir")
+        if state_dir:
+            stop_from_pid_file(os.path.join(state_dir, "qemu.pid"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ферма OpenBMC romulus в QEMU")
+    parser.add_argument("--registry", required=True, help="JSON-реестр целей")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    start = sub.add_parser("start")
+    start.add_argument("--count", type=int, default=2, help="-1 - по экземпляру на ядро")
+    start.add_argument("--state-root", required=True)
+    start.add_argument("--image-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "romulus"))
+    start.add_argument("--image", help="образ static.mtd, см. qemu_manager.rootfs_path")
+    start.add_argument("--no-snapshot", action="store_true")
+    start.add_argument("--timeout", type=int, default=BOOT_TIMEOUT)
+
+    sub.add_parser("stop")
+    sub.add_parser("health")
+
+    url = sub.add_parser("url", help="URL цели по номеру (по модулю числа целей)")
+    url.add_argument("--index", type=int, default=0)
+
+    select = sub.add_parser("select", help="записать реестр из целей начиная с --start")
+    select.add_argument("--start", type=int, default=0)
+    select.add_argument("--output", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        count = (os.cpu_count() or 1) if args.count < 0 else args.count
+        try:
+            farm = BmcFarm(
+                count, args.state_root, find_qemuboot(args.image_dir), image=args.image,
+                snapshot=not args.no_snapshot, boot_timeout=args.timeout
+            )
+            targets = farm.start()
+        except QemuError as e:
+            print(e, file=sys.stderr)
+            return 1
+        save_targets(args.registry, targets)
+        for name, error in farm.errors.items():
+            print(f"{name}: {error}", file=sys.stderr)
+        for target in targets:
+            print(f"{target['name']}: {target['url']} ({target['boot']['mode']} start, "
+                  f"{target['boot']['boot_to_ready']:.1f} с)")
+        return 0
+
+    if args.command == "stop":
+        if os.path.exists(args.registry):
+            stop_targets(load_targets(args.registry))
+            os.remove(args.registry)
+        return 0
+
+    targets = load_targets(args.registry)
+
+    if args.command == "health":
+        status = health_check(targets)
+        for name, ok in status.items():
+            print(f"{name}: {'OK' if ok else 'FAIL'}")
+        return 0 if all(status.values()) else 1
+    elif args.command == "url":
+        print(target_for(args.index, targets)["url"])
+    elif args.command == "select":
+        start = args.start if args.start < len(targets) else len(targets) - 1
+        save_targets(args.output, targets[start:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
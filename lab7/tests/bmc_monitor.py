@@ -0,0 +1,387 @@
+"""Ресурсы эмулируемого BMC во время нагрузочного теста.
+
+По одной латентности Locust не отличить насыщение CPU BMC от
+блокировки в bmcweb или нехватки памяти в гостевой системе. BmcMonitor
+раз в --bmc-metrics-interval секунд снимает для каждой цели:
+
+    host_cpu, host_rss_mb     процесс qemu-system-* на хосте (psutil)
+    guest_cpu, guest_mem_mb   CPU и MemAvailable внутри BMC (по SSH)
+    bmcweb_cpu, bmcweb_rss_mb процесс bmcweb внутри BMC (по SSH)
+
+и пишет строку CSV вместе с текущими rps, p50/p95 и числом пользователей
+Locust за тот же интервал, так что в одном файле латентность идет рядом
+с загрузкой BMC. Процесс QEMU берется из qemu.pid в state_dir реестра
+bmc_farm, иначе ищется qemu-system-* с hostfwd на HTTPS-порт цели;
+--bmc-pid задает pid явно. Гостевые метрики снимаются только с
+--bmc-ssh 1 через проброшенный SSH-порт (ssh_port реестра, 2222),
+пароль - из OPENBMC_SSH_PASSWORD через sshpass, иначе ключ.
+
+    locust -f lab7/tests/locustfile.py --headless --bmc-metrics-file results/load_bmc_metrics.csv --bmc-ssh 1
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+import csv
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import gevent
+import psutil
+
+import bmc_farm
+from qemu_manager import DEFAULT_PORTS
+
+METRICS_FILE = os.environ.get("OPENBMC_BMC_METRICS_FILE")
+INTERVAL = float(os.environ.get("OPENBMC_BMC_METRICS_INTERVAL", 1.0))
+BMC_PIDS = os.environ.get("OPENBMC_BMC_PID", "")
+GUEST_SSH = os.environ.get("OPENBMC_BMC_SSH", "0") != "0"
+SSH_USER = os.environ.get("OPENBMC_SSH_USER", "root")
+SSH_PASSWORD = os.environ.get("OPENBMC_SSH_PASSWORD")
+SSH_TIMEOUT = 5
+CPU_SATURATED = 95.0
+LOW_MEMORY = 0.1
+GUEST_CLOCK_TICKS = 100
+GUEST_PAGE_SIZE = 4096
+LOAD_SUITE = "load"
+COLUMNS = [
+    "timestamp", "target",
+    "host_cpu", "host_rss_mb", "guest_cpu", "guest_mem_mb", "bmcweb_cpu", "bmcweb_rss_mb",
+    "users", "rps", "fail_per_sec", "p50", "p95",
+]
+GUEST_COMMAND = (
+    "head -1 /proc/stat; "
+    "grep -E '^(MemTotal|MemAvailable):' /proc/meminfo; "
+    "pid=$(pidof bmcweb | cut -d' ' -f1); [ -n \"$pid\" ] && cat /proc/$pid/stat"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def find_qemu_process(target):
+    """psutil.Process QEMU цели: по qemu.pid из state_dir или по hostfwd на HTTPS-порт."""
+    state_dir = target.get("state_dir")
+    if state_dir:
+        try:
+            with open(os.path.join(state_dir, "qemu.pid")) as f:
+                return psutil.Process(int(f.read().strip()))
+        except (OSError, ValueError, psutil.Error):
+            pass
+    port = urlsplit(target["url"]).port or DEFAULT_PORTS["https"]
+    forward = f"hostfwd=tcp::{port}-:443"
+    for process in psutil.process_iter(["name", "cmdline"]):
+        name = process.info["name"] or ""
+        if name.startswith("qemu-system") and any(forward in arg for arg in process.info["cmdline"] or ()):
+            return process
+    return None
+
+
+def parse_guest(output):
+    """Разбор вывода GUEST_COMMAND: счетчики CPU, память (кБ) и bmcweb из /proc."""
+    sample = {}
+    for line in output.splitlines():
+        if line.startswith("cpu "):
+            ticks = [int(value) for value in line.split()[1:]]
+            sample["cpu_total"] = sum(ticks)
+            sample["cpu_idle"] = ticks[3] + (ticks[4] if len(ticks) > 4 else 0)
+        elif line.startswith("MemTotal:"):
+            sample["mem_total"] = int(line.split()[1])
+        elif line.startswith("MemAvailable:"):
+            sample["mem_available"] = int(line.split()[1])
+        elif ")" in line:
+            fields = line.rsplit(")", 1)[1].split()
+            sample["bmcweb_ticks"] = int(fields[11]) + int(fields[12])
+            sample["bmcweb_rss"] = int(fields[21]) * GUEST_PAGE_SIZE
+    return sample
+
+
+class GuestProbe:
+    """Метрики внутри BMC по SSH; соединение переиспользуется через ControlMaster."""
+
+    def __init__(self, host, port, user=SSH_USER, password=SSH_PASSWORD):
+        control = os.path.join(tempfile.gettempdir(), "openbmc-ssh-%r@%h:%p")
+        self.command = [
+            "ssh", "-p", str(port),
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "UserKnownHostsFile=/dev/null",
+            "-o", "LogLevel=ERROR",
+            "-o", f"ConnectTimeout={SSH_TIMEOUT}",
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={control}",
+            "-o", "ControlPersist=60",
+        ]
+        self.env = None
+        if password:
+            self.command = ["sshpass", "-e"] + self.command
+            self.env = dict(os.environ, SSHPASS=password)
+        else:
+            self.command += ["-o", "BatchMode=yes"]
+        self.command += [f"{user}@{host}", GUEST_COMMAND]
+        self.previous = None
+        self.failed = False
+
+    def sample(self):
+        try:
+            result = subprocess.run(self.command, capture_output=True, text=True, timeout=SSH_TIMEOUT * 2, env=self.env)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return self._fail(str(e))
+        if result.returncode not in (0, 1) or not result.stdout:
+            return self._fail(result.stderr.strip() or f"ssh завершился с кодом {result.returncode}")
+        self.failed = False
+
+        now = time.monotonic()
+        current = parse_guest(result.stdout)
+        previous, self.previous = self.previous, (now, current)
+        metrics = {}
+        if "mem_available" in current:
+            metrics["guest_mem_mb"] = current["mem_available"] / 1024
+        if "bmcweb_rss" in current:
+            metrics["bmcweb_rss_mb"] = current["bmcweb_rss"] / 1048576
+        if previous is not None:
+            elapsed, before = now - previous[0], previous[1]
+            total = current.get("cpu_total", 0) - before.get("cpu_total", 0)
+            if total > 0:
+                metrics["guest_cpu"] = 100 * (1 - (current["cpu_idle"] - before["cpu_idle"]) / total)
+            if elapsed > 0 and "bmcweb_ticks" in current and "bmcweb_ticks" in before:
+                ticks = current["bmcweb_ticks"] - before["bmcweb_ticks"]
+                metrics["bmcweb_cpu"] = 100 * ticks / GUEST_CLOCK_TICKS / elapsed
+        return metrics, current.get("mem_total")
+
+    def _fail(self, error):
+        if not self.failed:
+            logger.warning(f"Метрики BMC по SSH недоступны: {error}")
+        self.failed = True
+        self.previous = None
+        return {}, None
+
+
+class TargetSampler:
+    def __init__(self, target, pid=None, ssh=False):
+        self.name = target.get("name", target["url"])
+        self.process = None
+        try:
+            self.process = psutil.Process(pid) if pid else find_qemu_process(target)
+        except psutil.Error:
+            self.process = None
+        if self.process is None:
+            logger.warning(f"{self.name}: процесс QEMU не найден, метрики хоста не снимаются")
+        else:
+            self.process.cpu_percent()
+        self.guest = None
+        if ssh:
+            host = urlsplit(target["url"]).hostname
+            self.guest = GuestProbe(host, target.get("ssh_port", DEFAULT_PORTS["ssh"]))
+        self.mem_total = None
+        self.stats = {}
+        self.series = []
+
+    def sample(self):
+        metrics = {}
+        if self.process is not None:
+            try:
+                with self.process.oneshot():
+                    metrics["host_cpu"] = self.process.cpu_percent()
+                    metrics["host_rss_mb"] = self.process.memory_info().rss / 1048576
+            except psutil.Error:
+                logger.warning(f"{self.name}: процесс QEMU {self.process.pid} завершился")
+                self.process = None
+        if self.guest is not None:
+            guest, mem_total = self.guest.sample()
+            metrics.update(guest)
+            self.mem_total = mem_total or self.mem_total
+        for key, value in metrics.items():
+            peak, total, count = self.stats.get(key, (value, 0.0, 0))
+            low = key == "guest_mem_mb"
+            self.stats[key] = (min(peak, value) if low else max(peak, value), total + value, count + 1)
+        return metrics
+
+
+class BmcMonitor:
+    """Периодический опрос TargetSampler, строки CSV с интервальной статистикой Locust."""
+
+    def __init__(self, environment, targets, path=None, interval=INTERVAL, pids=(), ssh=GUEST_SSH):
+        self.environment = environment
+        self.interval = interval
+        self.path = path
+        self.samplers = [
+            TargetSampler(target, pids[i] if i < len(pids) else None, ssh)
+            for i, target in enumerate(targets)
+        ]
+        self._file = None
+        self._writer = None
+        self._greenlet = None
+
+    def locust_interval(self):
+        runner = self.environment.runner
+        total = self.environment.stats.total
+        row = {
+            "users": runner.user_count if runner is not None else 0,
+            "rps": total.current_rps or 0,
+            "fail_per_sec": total.current_fail_per_sec or 0,
+        }
+        if total.use_response_times_cache:
+            row["p50"] = total.get_current_response_time_percentile(0.5) or 0
+            row["p95"] = total.get_current_response_time_percentile(0.95) or 0
+        return row
+
+    def sample(self):
+        timestamp = time.time()
+        interval = self.locust_interval()
+        results = [gevent.spawn(sampler.sample) for sampler in self.samplers]
+        gevent.joinall(results)
+        for sampler, result in zip(self.samplers, results):
+            metrics = result.value or {}
+            sampler.series.append((metrics.get("host_cpu"), metrics.get("guest_cpu"), interval.get("p95"), interval["rps"]))
+            if self._writer is not None:
+                row = dict(interval, **metrics, timestamp=f"{timestamp:.3f}", target=sampler.name)
+                self._writer.writerow({
+                    key: f"{value:.1f}" if isinstance(value, float) else value
+                    for key, value in row.items()
+                })
+        if self._file is not None:
+            self._file.flush()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            self.sample()
+            gevent.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    def start(self):
+        if self.path and self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, COLUMNS)
+            self._writer.writeheader()
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=True)
+            self._greenlet = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def summary(self):
+        """{target: {метрика: {max|min, avg}, corr_cpu_p95, verdict}}."""
+        rows = {}
+        for sampler in self.samplers:
+            row = {}
+            for key, (peak, total, count) in sorted(sampler.stats.items()):
+                row[key] = {"min" if key == "guest_mem_mb" else "max": peak, "avg": total / count}
+            cpu_column = 1 if "guest_cpu" in sampler.stats else 0
+            pairs = [(s[cpu_column], s[2]) for s in sampler.series if s[cpu_column] is not None and s[2] is not None and s[3]]
+            row["corr_cpu_p95"] = correlation(pairs)
+            row["verdict"] = verdict(row, sampler.mem_total)
+            rows[sampler.name] = row
+        return rows
+
+
+def correlation(pairs):
+    """Коэффициент Пирсона или None, если точек меньше трех или ряд постоянный."""
+    if len(pairs) < 3:
+        return None
+    n = len(pairs)
+    mean_x = sum(x for x, _ in pairs) / n
+    mean_y = sum(y for _, y in pairs) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    if not var_x or not var_y:
+        return None
+    return cov / (var_x * var_y) ** 0.5
+
+
+def verdict(row, mem_total=None):
+    cpu = row.get("guest_cpu") or row.get("host_cpu")
+    if cpu is None:
+        return "нет данных"
+    if mem_total and "guest_mem_mb" in row and row["guest_mem_mb"]["min"] * 1024 < mem_total * LOW_MEMORY:
+        return "нехватка памяти в BMC"
+    if cpu["max"] >= CPU_SATURATED:
+        return "CPU BMC насыщен"
+    return "CPU BMC не насыщен"
+
+
+def format_row(name, row):
+    parts = []
+    for key, value in row.items():
+        if isinstance(value, dict):
+            extreme = "min" if "min" in value else "max"
+            parts.append(f"{key} {extreme} {value[extreme]:.1f} avg {value['avg']:.1f}")
+    if row.get("corr_cpu_p95") is not None:
+        parts.append(f"corr(cpu, p95) {row['corr_cpu_p95']:.2f}")
+    return f"{name}: {', '.join(parts)} - {row['verdict']}"
+
+
+def report(environment, reporter, suite=LOAD_SUITE):
+    monitor = getattr(environment, "bmc_monitor", None)
+    if monitor is None:
+        return
+    for name, row in monitor.summary().items():
+        reporter.add_test_result(suite, f"bmc resources {name}", 'passed', format_row(name, row), 0)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--bmc-metrics-file", default=METRICS_FILE, env_var="OPENBMC_BMC_METRICS_FILE",
+        help="CSV с ресурсами BMC и интервальной статистикой Locust; включает опрос BMC",
+    )
+    parser.add_argument(
+        "--bmc-metrics-interval", type=float, default=INTERVAL, env_var="OPENBMC_BMC_METRICS_INTERVAL",
+        help="Интервал опроса ресурсов BMC, с",
+    )
+    parser.add_argument(
+        "--bmc-pid", default=BMC_PIDS, env_var="OPENBMC_BMC_PID",
+        help="pid процессов BMC на хосте через запятую, по порядку целей (по умолчанию ищется qemu-system-*)",
+    )
+    parser.add_argument(
+        "--bmc-ssh", type=int, default=int(GUEST_SSH), choices=(0, 1), env_var="OPENBMC_BMC_SSH",
+        help="Снимать CPU/память BMC и bmcweb по SSH (1) или нет (0)",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    if isinstance(runner, WorkerRunner):
+        return
+    options = environment.parsed_options
+    path = getattr(options, "bmc_metrics_file", None) or METRICS_FILE
+    if not path:
+        return
+    pids = getattr(options, "bmc_pid", None) or BMC_PIDS
+    ssh = getattr(options, "bmc_ssh", None)
+    environment.bmc_monitor = BmcMonitor(
+        environment,
+        bmc_farm.load_targets(),
+        path,
+        getattr(options, "bmc_metrics_interval", None) or INTERVAL,
+        [int(pid) for pid in pids.split(",") if pid.strip()],
+        GUEST_SSH if ssh is None else bool(ssh),
+    )
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    monitor = getattr(environment, "bmc_monitor", None)
+    if monitor is not None:
+        monitor.start()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    monitor = getattr(environment, "bmc_monitor", None)
+    if monitor is None:
+        return
+    monitor.stop()
+    for name, row in monitor.summary().items():
+        print(f"Ресурсы BMC {format_row(name, row)}")
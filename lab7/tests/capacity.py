@@ -0,0 +1,334 @@
+"""Поиск максимальной устойчивой пропускной способности BMC.
+
+Фиксированные -u 20 -r 3 показывают латентность при одной нагрузке, но
+не отвечают, сколько запросов в секунду выдерживает сборка прошивки.
+CapacitySearchShape сам меняет число пользователей:
+
+1. уровень держится, пока rps двух последних окон --capacity-window
+   не совпадет в пределах --capacity-tolerance (но не меньше
+   --capacity-min-hold и не больше --capacity-max-hold секунд);
+2. по последним двум окнам уровень проверяется бюджетами p95 и
+   max_error_pct из slo.json и приростом rps относительно предыдущего
+   прошедшего уровня (не меньше --capacity-min-gain);
+3. пока проверки проходят, пользователи умножаются на --capacity-step;
+   после первого непрошедшего уровня граница уточняется делением
+   отрезка пополам до --capacity-resolution.
+
+Итог - наибольший rps среди уровней в пределах бюджетов (в целом и по
+endpoint; уровень насыщения без прироста rps тоже считается) и уровень,
+на котором начался излом, - печатается, пишется в XMLReporter и в JSON
+--capacity-file. Пользователей без пауз между запросами дает
+locustfile_capacity.py:
+
+    locust -f lab7/tests/locustfile_capacity.py --headless --run-time 20m --capacity-file results/capacity.json
+"""
+
+from locust import LoadTestShape, events
+from locust.runners import WorkerRunner
+from locust.stats import calculate_response_time_percentile
+import json
+import os
+
+import slo
+
+START_USERS = int(os.environ.get("OPENBMC_CAPACITY_START", 2))
+STEP = float(os.environ.get("OPENBMC_CAPACITY_STEP", 2.0))
+MAX_USERS = int(os.environ.get("OPENBMC_CAPACITY_MAX_USERS", 256))
+WINDOW = float(os.environ.get("OPENBMC_CAPACITY_WINDOW", 5))
+MIN_HOLD = float(os.environ.get("OPENBMC_CAPACITY_MIN_HOLD", 15))
+MAX_HOLD = float(os.environ.get("OPENBMC_CAPACITY_MAX_HOLD", 60))
+TOLERANCE = float(os.environ.get("OPENBMC_CAPACITY_TOLERANCE", 0.1))
+MIN_GAIN = float(os.environ.get("OPENBMC_CAPACITY_MIN_GAIN", 0.05))
+RESOLUTION = float(os.environ.get("OPENBMC_CAPACITY_RESOLUTION", 0.1))
+CAPACITY_FILE = os.environ.get("OPENBMC_CAPACITY_FILE")
+CAPACITY_RUN_TIME = int(os.environ.get("OPENBMC_CAPACITY_RUN_TIME", 1200))
+ENABLED = os.environ.get("OPENBMC_CAPACITY_SEARCH", "0") != "0"
+DEFAULT_P95 = 4000
+DEFAULT_ERROR_PCT = 1.0
+LOAD_SUITE = "load"
+
+
+def _settings(environment):
+    options = environment.parsed_options
+
+    def option(name, default):
+        value = getattr(options, name, None)
+        return default if value is None else value
+
+    return {
+        "start": option("capacity_start", START_USERS),
+        "step": option("capacity_step", STEP),
+        "max_users": option("capacity_max_users", MAX_USERS),
+        "window": option("capacity_window", WINDOW),
+        "min_hold": option("capacity_min_hold", MIN_HOLD),
+        "max_hold": option("capacity_max_hold", MAX_HOLD),
+        "tolerance": option("capacity_tolerance", TOLERANCE),
+        "min_gain": option("capacity_min_gain", MIN_GAIN),
+        "resolution": option("capacity_resolution", RESOLUTION),
+        "slo_file": option("slo_file", None) or slo.SLO_FILE,
+    }
+
+
+def snapshot(stats, elapsed):
+    """Копия счетчиков по endpoint для разности между окнами."""
+    entries = {}
+    for entry in stats.entries.values():
+        entries[entry.name] = (entry.num_requests, entry.num_failures, dict(entry.response_times))
+    return elapsed, entries
+
+
+def window_stats(start, end):
+    """rps, p95 и доля ошибок по endpoint и в целом (Aggregated) между двумя снимками."""
+    duration = end[0] - start[0]
+    if duration <= 0:
+        return {}
+    result = {}
+    totals = [0, 0, {}]
+    for name, (requests, failures, times) in end[1].items():
+        before = start[1].get(name, (0, 0, {}))
+        count = requests - before[0]
+        failed = failures - before[1]
+        delta = {rt: n - before[2].get(rt, 0) for rt, n in times.items() if n > before[2].get(rt, 0)}
+        result[name] = _window_row(count, failed, delta, duration)
+        totals[0] += count
+        totals[1] += failed
+        for rt, n in delta.items():
+            totals[2][rt] = totals[2].get(rt, 0) + n
+    result[slo.TOTAL_NAME] = _window_row(totals[0], totals[1], totals[2], duration)
+    return result
+
+
+def _window_row(count, failed, times, duration):
+    completed = sum(times.values())
+    return {
+        "requests": count,
+        "rps": count / duration,
+        "p95": calculate_response_time_percentile(times, completed, 0.95) if completed else 0,
+        "error_pct": 100 * failed / count if count else 0.0,
+    }
+
+
+def check_level(window, budgets):
+    """Причина, по которой уровень вышел за бюджеты p95/ошибок, или None."""
+    total = window.get(slo.TOTAL_NAME)
+    if not total or not total["requests"]:
+        return "нет запросов"
+    for name, row in window.items():
+        limits = budgets.get(name, {})
+        p95_limit = limits.get("p95", DEFAULT_P95 if name == slo.TOTAL_NAME else None)
+        error_limit = limits.get("max_error_pct", DEFAULT_ERROR_PCT if name == slo.TOTAL_NAME else None)
+        if not row["requests"]:
+            continue
+        if p95_limit is not None and row["p95"] > p95_limit:
+            return f"{name}: p95 {row['p95']:.0f} мс > {p95_limit} мс"
+        if error_limit is not None and row["error_pct"] > error_limit:
+            return f"{name}: ошибок {row['error_pct']:.1f}% > {error_limit}%"
+    return None
+
+
+class CapacitySearchShape(LoadTestShape):
+    """Ступенчатый, затем бинарный поиск уровня пользователей до излома."""
+
+    use_common_options = True
+    run_time = None
+
+    def __init__(self):
+        super().__init__()
+        self.settings = None
+        self.levels = []
+        self.result = None
+
+    def _begin(self, users):
+        self.users = users
+        self.level_started = None
+        self.windows = []
+
+    def _setup(self):
+        self.settings = _settings(self.runner.environment)
+        self.budgets = slo.load_budgets(self.settings["slo_file"])
+        self.good = None
+        self.bad = None
+        self._begin(max(1, int(self.settings["start"])))
+
+    def tick(self):
+        if self.settings is None:
+            self._setup()
+        if self.result is not None:
+            return None
+        options = self.runner.environment.parsed_options
+        run_time = getattr(options, "run_time", None) or self.run_time
+        now = self.get_run_time()
+        if run_time and now > run_time:
+            self.finish("закончилось время --run-time")
+            return None
+
+        if self.level_started is None:
+            if self.runner.user_count >= self.users:
+                self.level_started = now
+                self.windows = [snapshot(self.runner.environment.stats, now)]
+            return self.users, self.users
+        if now - self.windows[-1][0] >= self.settings["window"]:
+            self.windows.append(snapshot(self.runner.environment.stats, now))
+            held = now - self.level_started
+            if held >= self.settings["min_hold"] and (self.stable() or held >= self.settings["max_hold"]):
+                if not self.next_level():
+                    return None
+        return self.users, self.users
+
+    def stable(self):
+        if len(self.windows) < 3:
+            return False
+        a = window_stats(self.windows[-3], self.windows[-2])[slo.TOTAL_NAME]["rps"]
+        b = window_stats(self.windows[-2], self.windows[-1])[slo.TOTAL_NAME]["rps"]
+        return bool(a and b) and abs(a - b) / max(a, b) <= self.settings["tolerance"]
+
+    def next_level(self):
+        """Оценивает текущий уровень и выбирает следующий; False - поиск закончен."""
+        window = window_stats(self.windows[max(len(self.windows) - 3, 0)], self.windows[-1])
+        budget = check_level(window, self.budgets)
+        reason = budget
+        rps = window.get(slo.TOTAL_NAME, {}).get("rps", 0.0)
+        if reason is None and self.good is not None and self.good["users"] < self.users:
+            previous = self.good["window"][slo.TOTAL_NAME]["rps"]
+            if rps < previous * (1 + self.settings["min_gain"]):
+                reason = f"rps {rps:.1f} не вырос относительно {previous:.1f}"
+        level = {
+            "users": self.users,
+            "hold": self.windows[-1][0] - self.level_started,
+            "stable": self.stable(),
+            "within_budget": budget is None,
+            "passed": reason is None,
+            "reason": reason,
+            "window": window,
+        }
+        self.levels.append(level)
+        if reason is None:
+            self.good = level
+            low = self.users
+        else:
+            if self.bad is None or self.users < self.bad["users"]:
+                self.bad = level
+            low = self.good["users"] if self.good else 0
+
+        if self.bad is None:
+            if self.users >= self.settings["max_users"]:
+                return self.finish(f"достигнут предел {self.settings['max_users']} пользователей")
+            users = min(max(int(self.users * self.settings["step"]), self.users + 1), self.settings["max_users"])
+        else:
+            high = self.bad["users"]
+            if high - low <= max(1, int(low * self.settings["resolution"])):
+                return self.finish(None)
+            users = (low + high) // 2
+        self._begin(users)
+        return True
+
+    def finish(self, note):
+        """Итог: лучший по rps уровень в пределах бюджетов (и насыщение без роста rps)."""
+        within = [level for level in self.levels if level["within_budget"]]
+        good = max(within, key=lambda level: level["window"][slo.TOTAL_NAME]["rps"]) if within else None
+        bad = self.bad
+        self.result = {
+            "max_rps": good["window"][slo.TOTAL_NAME]["rps"] if good else 0.0,
+            "users": good["users"] if good else 0,
+            "knee": {"users": bad["users"], "reason": bad["reason"]} if bad else None,
+            "note": note,
+            "endpoints": {
+                name: {"rps": row["rps"], "p95": row["p95"], "error_pct": row["error_pct"]}
+                for name, row in (good["window"].items() if good else ())
+                if name != slo.TOTAL_NAME
+            },
+            "levels": [
+                {key: value for key, value in level.items() if key != "window"}
+                | {key: level["window"].get(slo.TOTAL_NAME, {}).get(key) for key in ("rps", "p95", "error_pct")}
+                for level in self.levels
+            ],
+        }
+        return False
+
+
+def format_result(result):
+    lines = [f"Максимальная устойчивая нагрузка: {result['max_rps']:.1f} rps при {result['users']} пользователях"]
+    if result["knee"]:
+        lines.append(f"Излом при {result['knee']['users']} пользователях: {result['knee']['reason']}")
+    if result["note"]:
+        lines.append(f"Поиск остановлен: {result['note']}")
+    for name, row in result["endpoints"].items():
+        lines.append(f"  {name}: {row['rps']:.1f} rps, p95 {row['p95']:.0f} мс, ошибок {row['error_pct']:.1f}%")
+    lines.append("Уровни:")
+    for level in result["levels"]:
+        status = "ok" if level["passed"] else level["reason"]
+        lines.append(
+            f"  {level['users']:>4} польз. {level['rps'] or 0:>8.1f} rps p95 {level['p95'] or 0:>6.0f} мс "
+            f"{level['hold']:>4.0f} с - {status}"
+        )
+    return "\n".join(lines)
+
+
+def shape_result(environment):
+    shape = environment.shape_class
+    if not isinstance(shape, CapacitySearchShape):
+        return None
+    if shape.result is None and shape.levels:
+        shape.finish("тест остановлен до завершения поиска")
+    return shape.result
+
+
+def save(result, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+def report(environment, reporter, suite=LOAD_SUITE):
+    result = shape_result(environment)
+    if result is None:
+        return
+    message = f"max_rps={result['max_rps']:.1f} users={result['users']}"
+    if result["knee"]:
+        message += f" knee_users={result['knee']['users']} ({result['knee']['reason']})"
+    status = 'passed' if result["users"] else 'failed'
+    reporter.add_test_result(suite, "capacity", status, message, 0)
+    for name, row in result["endpoints"].items():
+        reporter.add_test_result(
+            suite, f"capacity {name}", 'passed',
+            f"max_rps={row['rps']:.2f} p95={row['p95']:.0f}ms errors={row['error_pct']:.1f}%", 0
+        )
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument("--capacity-start", type=int, default=START_USERS, env_var="OPENBMC_CAPACITY_START",
+                        help="Пользователей на первом уровне")
+    parser.add_argument("--capacity-step", type=float, default=STEP, env_var="OPENBMC_CAPACITY_STEP",
+                        help="Множитель пользователей между уровнями до излома")
+    parser.add_argument("--capacity-max-users", type=int, default=MAX_USERS, env_var="OPENBMC_CAPACITY_MAX_USERS",
+                        help="Верхний предел пользователей")
+    parser.add_argument("--capacity-window", type=float, default=WINDOW, env_var="OPENBMC_CAPACITY_WINDOW",
+                        help="Окно сравнения rps, с")
+    parser.add_argument("--capacity-min-hold", type=float, default=MIN_HOLD, env_var="OPENBMC_CAPACITY_MIN_HOLD",
+                        help="Минимальное время на уровне, с")
+    parser.add_argument("--capacity-max-hold", type=float, default=MAX_HOLD, env_var="OPENBMC_CAPACITY_MAX_HOLD",
+                        help="Максимальное время на уровне, если rps не стабилизировался, с")
+    parser.add_argument("--capacity-tolerance", type=float, default=TOLERANCE, env_var="OPENBMC_CAPACITY_TOLERANCE",
+                        help="Допустимое расхождение rps соседних окон (доля)")
+    parser.add_argument("--capacity-min-gain", type=float, default=MIN_GAIN, env_var="OPENBMC_CAPACITY_MIN_GAIN",
+                        help="Минимальный прирост rps следующего уровня (доля), меньше - насыщение")
+    parser.add_argument("--capacity-resolution", type=float, default=RESOLUTION, env_var="OPENBMC_CAPACITY_RESOLUTION",
+                        help="Точность бинарного поиска (доля от числа пользователей)")
+    parser.add_argument("--capacity-file", default=CAPACITY_FILE, env_var="OPENBMC_CAPACITY_FILE",
+                        help="Куда записать итог поиска (JSON)")
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    result = shape_result(environment)
+    if result is None:
+        return
+    print(format_result(result))
+    path = getattr(environment.parsed_options, "capacity_file", None) or CAPACITY_FILE
+    if path:
+        save(result, path)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Запись и воспроизведение HTTP-ответов (кассеты) для requests и HttpUser.
+
+MyLoadTest обращается к публичному https://wttr.in, поэтому смешанный
+сценарий не запускается на изолированных CI-узлах и от прогона к
+прогону ведет себя по-разному. CassetteAdapter подключается к
+requests.Session (в том числе к HttpSession пользователей Locust) и в
+режиме record пишет ответы и распределение их латентности в кассету,
+а в режиме replay отдает ответы из памяти, по желанию выдерживая
+задержку, выбранную из записанного распределения:
+
+    OPENBMC_CASSETTE=results/wttr.cassette OPENBMC_CASSETTE_MODE=record \\
+        locust -f lab7/tests/locustfile.py --headless -t 5m MyLoadTest
+    OPENBMC_CASSETTE=results/wttr.cassette OPENBMC_CASSETTE_MODE=replay \\
+        OPENBMC_CASSETTE_HOSTS=https://wttr.in locust -f lab7/tests/locustfile.py ...
+
+Ответы сопоставляются по методу и пути с query без хоста, так что
+кассета, записанная на одном BMC, подходит для любого. На один запрос
+хранится до MAX_RESPONSES разных ответов, они отдаются по кругу;
+одинаковые тела хранятся один раз. Латентность хранится
+HDR-гистограммой. OPENBMC_CASSETTE_HOSTS ограничивает кассету
+перечисленными адресами, остальные запросы идут в сеть как обычно.
+
+worker-процессы Locust и pytest-xdist пишут каждый свою кассету
+(<путь>.<worker>), которые объединяются командой merge.
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+import argparse
+import base64
+import datetime
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from hdr_histogram import HdrHistogram
+
+CASSETTE_FILE = os.environ.get("OPENBMC_CASSETTE")
+CASSETTE_MODE = os.environ.get("OPENBMC_CASSETTE_MODE", "")
+CASSETTE_LATENCY = float(os.environ.get("OPENBMC_CASSETTE_LATENCY", 1.0))
+CASSETTE_HOSTS = os.environ.get("OPENBMC_CASSETTE_HOSTS", "")
+MODES = ("", "record", "replay")
+VERSION = 1
+MAX_RESPONSES = 16
+LATENCY_HIGHEST_US = 120 * 1000 * 1000
+LATENCY_DIGITS = 2
+LATENCY_TABLE_SIZE = 256
+SKIPPED_HEADERS = frozenset((
+    "connection", "content-encoding", "content-length", "keep-alive", "transfer-encoding",
+))
+
+
+class CassetteError(Exception):
+    pass
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """В кассете нет ответа на запрос; для вызывающего кода - как недоступный сервер."""
+
+
+def request_key(method, url):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    return f"{method.upper()} {path}?{parts.query}" if parts.query else f"{method.upper()} {path}"
+
+
+class Interaction:
+    """Записанные ответы на один запрос и гистограмма их латентности (мкс)."""
+
+    def __init__(self):
+        self.responses = []
+        self.latency = HdrHistogram(highest=LATENCY_HIGHEST_US, significant_figures=LATENCY_DIGITS)
+        self._order = itertools.count()
+        self._table = None
+
+    def add(self, status, reason, headers, body_id, elapsed):
+        """Возвращает True, если ответ новый и сохранен."""
+        self.latency.record(round(elapsed * 1000000))
+        self._table = None
+        response = [status, reason, headers, body_id]
+        if response in self.responses or len(self.responses) >= MAX_RESPONSES:
+            return False
+        self.responses.append(response)
+        return True
+
+    def next_response(self):
+        return self.responses[next(self._order) % len(self.responses)]
+
+    def sample_latency(self):
+        """Задержка в секундах, распределенная как записанная (по таблице квантилей)."""
+        if self._table is None:
+            self._table = _quantile_table(self.latency, LATENCY_TABLE_SIZE)
+        if not self._table:
+            return 0.0
+        return random.choice(self._table) / 1000000
+
+
+def _quantile_table(histogram, size):
+    """size значений, равномерно расположенных по квантилям гистограммы."""
+    if not histogram.total_count:
+        return []
+    table = []
+    targets = [(i + 0.5) / size * histogram.total_count for i in range(size)]
+    position = 0
+    seen = 0
+    for index, count in histogram.nonzero():
+        seen += count
+        value = min(histogram.highest_equivalent(index), histogram.max_value)
+        while position < size and targets[position] <= seen:
+            table.append(value)
+            position += 1
+    table.extend([histogram.max_value] * (size - len(table)))
+    return table
+
+
+class Cassette:
+    def __init__(self, path=None):
+        self.path = path
+        self.interactions = {}
+        self.bodies = {}
+        self.dirty = False
+
+    def record(self, request, response, elapsed):
+        body = response.content or b""
+        body_id = hashlib.sha1(body).hexdigest()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        key = request_key(request.method, request.url)
+        interaction = self.interactions.get(key)
+        if interaction is None:
+            interaction = self.interactions[key] = Interaction()
+        if interaction.add(response.status_code, response.reason, headers, body_id, elapsed):
+            self.bodies.setdefault(body_id, body)
+        self.dirty = True
+
+    def play(self, request, latency_scale=1.0):
+        key = request_key(request.method, request.url)
+        interaction = self.interactions.get(key)
+        if interaction is None or not interaction.responses:
+            raise CassetteMiss(f"В кассете нет ответа на {key}", request=request)
+        status, reason, headers, body_id = interaction.next_response()
+        delay = interaction.sample_latency() * latency_scale if latency_scale else 0.0
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = self.bodies[body_id]
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=delay)
+        return response
+
+    def merge(self, other):
+        self.bodies.update(other.bodies)
+        for key, theirs in other.interactions.items():
+            ours = self.interactions.get(key)
+            if ours is None:
+                ours = self.interactions[key] = Interaction()
+            for response in theirs.responses:
+                if response not in ours.responses and len(ours.responses) < MAX_RESPONSES:
+                    ours.responses.append(response)
+            ours.latency.add(theirs.latency)
+            ours._table = None
+        self.dirty = True
+        return self
+
+    def save(self, path=None):
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        used = {response[3] for i in self.interactions.values() for response in i.responses}
+        data = {
+            "version": VERSION,
+            "interactions": {
+                key: {"responses": i.responses, "latency": i.latency.to_base64()}
+                for key, i in sorted(self.interactions.items())
+            },
+            "bodies": {
+                body_id: base64.b64encode(body).decode("ascii")
+                for body_id, body in sorted(self.bodies.items()) if body_id in used
+            },
+        }
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != VERSION:
+            raise CassetteError(f"{path}: неизвестная версия кассеты {data.get('version')}")
+        cassette = cls(path)
+        cassette.bodies = {body_id: base64.b64decode(text) for body_id, text in data["bodies"].items()}
+        for key, entry in data["interactions"].items():
+            interaction = cassette.interactions[key] = Interaction()
+            interaction.responses = [list(response) for response in entry["responses"]]
+            interaction.latency = HdrHistogram.from_base64(entry["latency"])
+        return cassette
+
+    def summary(self):
+        rows = {}
+        for key, interaction in sorted(self.interactions.items()):
+            latency = interaction.latency
+            rows[key] = {
+                "responses": len(interaction.responses),
+                "count": latency.total_count,
+                "p50_ms": latency.percentile(50) / 1000,
+                "p95_ms": latency.percentile(95) / 1000,
+                "max_ms": latency.max_value / 1000,
+            }
+        return rows
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Адаптер requests: record - через real с записью, replay - из кассеты без сети."""
+
+    def __init__(self, cassette, mode, real=None, latency_scale=CASSETTE_LATENCY):
+        if mode not in ("record", "replay"):
+            raise CassetteError(f"Неизвестный режим кассеты: {mode!r}")
+        super().__init__()
+        self.cassette = cassette
+        self.mode = mode
+        self.real = real or HTTPAdapter()
+        self.latency_scale = latency_scale
+
+    def send(self, request, **kwargs):
+        if self.mode == "replay":
+            return self.cassette.play(request, self.latency_scale)
+        started = time.perf_counter()
+        response = self.real.send(request, **kwargs)
+        self.cassette.record(request, response, time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self.real.close()
+        super().close()
+
+
+class _Config:
+    def __init__(self, path=CASSETTE_FILE, mode=CASSETTE_MODE, latency_scale=CASSETTE_LATENCY,
+                 hosts=CASSETTE_HOSTS, worker=None):
+        if mode not in MODES:
+            raise CassetteError(f"Неизвестный режим кассеты: {mode!r}, допустимы record и replay")
+        self.mode = mode if path else ""
+        self.latency_scale = latency_scale
+        self.hosts = [h.strip().rstrip("/") for h in hosts.split(",") if h.strip()]
+        self.path = path
+        if self.mode == "record" and worker:
+            self.path = f"{path}.{worker}"
+        self.cassette = None
+        if self.mode == "replay":
+            self.cassette = Cassette.load(path)
+        elif self.mode == "record":
+            self.cassette = Cassette(self.path)
+
+
+_config = None
+
+
+def configure(path=CASSETTE_FILE, mode=CASSETTE_MODE, latency_scale=CASSETTE_LATENCY,
+              hosts=CASSETTE_HOSTS, worker=None):
+    global _config
+    _config = _Config(path, mode, latency_scale, hosts, worker)
+    return _config
+
+
+def _active():
+    if _config is None:
+        configure(worker=os.environ.get("PYTEST_XDIST_WORKER"))
+    return _config
+
+
+def install(session):
+    """Подключает кассету к requests.Session, если она включена; возвращает адаптеры."""
+    config = _active()
+    if not config.mode:
+        return []
+    if not hasattr(session, "mount"):
+        raise CassetteError(f"{type(session).__name__} не поддерживает кассеты, нужен requests.Session")
+    prefixes = config.hosts or ["https://", "http://"]
+    adapters = []
+    for prefix in prefixes:
+        adapter = CassetteAdapter(
+            config.cassette, config.mode, real=session.get_adapter(prefix),
+            latency_scale=config.latency_scale
+        )
+        session.mount(prefix, adapter)
+        adapters.append(adapter)
+    return adapters
+
+
+def save():
+    """Сохраняет записанное, если идет запись и есть новые ответы."""
+    config = _active()
+    if config.mode == "record" and config.cassette.dirty:
+        config.cassette.save(config.path)
+        return config.path
+    return None
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--cassette", default=CASSETTE_FILE, env_var="OPENBMC_CASSETTE",
+        help="Файл кассеты с записанными HTTP-ответами",
+    )
+    parser.add_argument(
+        "--cassette-mode", default=CASSETTE_MODE, choices=MODES, env_var="OPENBMC_CASSETTE_MODE",
+        help="record - записывать ответы, replay - отдавать из кассеты без сети",
+    )
+    parser.add_argument(
+        "--cassette-latency", type=float, default=CASSETTE_LATENCY, env_var="OPENBMC_CASSETTE_LATENCY",
+        help="Множитель записанной латентности при replay (0 - без задержек)",
+    )
+    parser.add_argument(
+        "--cassette-hosts", default=CASSETTE_HOSTS, env_var="OPENBMC_CASSETTE_HOSTS",
+        help="Адреса через запятую, к которым применяется кассета (по умолчанию все)",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    options = environment.parsed_options
+    worker = None
+    if isinstance(runner, WorkerRunner):
+        worker = f"worker{runner.worker_index}"
+    configure(
+        getattr(options, "cassette", None) or CASSETTE_FILE,
+        getattr(options, "cassette_mode", None) or CASSETTE_MODE,
+        getattr(options, "cassette_latency", CASSETTE_LATENCY),
+        getattr(options, "cassette_hosts", None) or CASSETTE_HOSTS,
+        worker,
+    )
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if _config is None:
+        return
+    path = save()
+    if path:
+        print(f"Кассета сохранена: {path} ({len(_config.cassette.interactions)} запросов)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Кассеты с записанными HTTP-ответами")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="запросы кассеты и их латентность")
+    show.add_argument("file")
+    merge = sub.add_parser("merge", help="объединить кассеты (например, от worker-процессов)")
+    merge.add_argument("files", nargs="+")
+    merge.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "merge":
+        cassette = Cassette(args.output)
+        for path in args.files:
+            cassette.merge(Cassette.load(path))
+        cassette.save()
+    else:
+        cassette = Cassette.load(args.file)
+
+    print(f"{'Request':<60} {'resp':>5} {'count':>7} {'p50':>8} {'p95':>8} {'max':>8}")
+    for key, row in cassette.summary().items():
+        print(f"{key:<60} {row['responses']:>5} {row['count']:>7} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['max_ms']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
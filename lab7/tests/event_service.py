@@ -0,0 +1,531 @@
+"""Нагрузка через Redfish EventService: события вместо опроса.
+
+Все сценарии нагрузки опрашивают Systems/system и ThermalSubSystem,
+и именно такой трафик перегружает bmcweb. EventSubscriberUser не
+опрашивает, а держит SSE-поток /redfish/v1/EventService/SSE (mode =
+"sse") или регистрирует подписку с Destination на локальный
+HTTP-приемник генератора (mode = "push"). Изменения вызывает один
+триггер на master (или в локальном процессе): каждые
+--event-trigger-interval секунд он переключает питание через
+ComputerSystem.Reset и сообщает worker-процессам момент запуска.
+
+В статистику Locust попадают строки EVENT "<MessageId> <ресурс>" со
+временем от запуска изменения до получения события (часы генератора
+общие для всех процессов на одной машине), EVENT "lost" для
+пропущенных событий и SSE/SUBSCRIBE для установки потоков. В конце
+теста печатается число BMC-запросов на одно изменение у опроса
+(GET /Systems/system) и у подписчиков:
+
+    locust -f lab7/tests/locustfile_events.py --headless -u 50 -t 2m \\
+           --event-mode sse --event-trigger-interval 5
+
+Для push из QEMU user-net BMC достучится до генератора по адресу
+10.0.2.2: --event-listener-host 10.0.2.2.
+"""
+
+from locust import User, constant, events, task
+from locust.runners import MasterRunner, WorkerRunner
+import gevent
+import itertools
+import json
+import os
+import time
+from collections import deque
+from gevent.pywsgi import WSGIServer
+
+import requests
+import urllib3
+
+import bmc_farm
+import session_pool
+
+EVENT_MODE = os.environ.get("OPENBMC_EVENT_MODE", "sse")
+TRIGGER_INTERVAL = float(os.environ.get("OPENBMC_EVENT_TRIGGER_INTERVAL", 5))
+LISTENER_HOST = os.environ.get("OPENBMC_EVENT_LISTENER_HOST", "127.0.0.1")
+MODES = ("sse", "push")
+SSE_PATH = "/redfish/v1/EventService/SSE"
+SUBSCRIPTIONS_PATH = "/redfish/v1/EventService/Subscriptions"
+RESET_PATH = "/redfish/v1/Systems/system/Actions/ComputerSystem.Reset"
+POLLED_RESOURCE = "/Systems/system"
+EVENT_REQUEST_TYPE = "EVENT"
+STREAM_REQUEST_TYPE = "SSE"
+SUBSCRIBE_REQUEST_TYPE = "SUBSCRIBE"
+TRIGGER_REQUEST_TYPE = "TRIGGER"
+LOST_NAME = "lost"
+CONTEXT_PREFIX = "locust-"
+TIMEOUT = 30
+READ_SIZE = 65536
+EVENT_SUITE = "load"
+
+_listener = None
+
+
+class TriggerLog:
+    """Запущенные изменения по BMC: (номер, time.time() запуска)."""
+
+    def __init__(self, size=256):
+        self.size = size
+        self.triggers = {}
+
+    def add(self, host, seq, sent_at):
+        self.triggers.setdefault(host, deque(maxlen=self.size)).append((seq, sent_at))
+
+    def latest_seq(self, host):
+        triggers = self.triggers.get(host)
+        return triggers[-1][0] if triggers else 0
+
+    def match(self, host, received_at, after_seq):
+        """Последнее изменение после after_seq, запущенное не позже received_at."""
+        for seq, sent_at in reversed(self.triggers.get(host, ())):
+            if seq <= after_seq:
+                break
+            if sent_at <= received_at:
+                return seq, sent_at
+        return None
+
+
+triggers = TriggerLog()
+
+
+def iter_sse(response):
+    """data событий text/event-stream по мере поступления; комментарии пропускаются."""
+    buffer = b""
+    data = []
+    while True:
+        chunk = response.raw.read1(READ_SIZE)
+        if not chunk:
+            return
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            line = line.rstrip(b"\r")
+            if not line:
+                if data:
+                    yield b"\n".join(data)
+                    data = []
+            elif line.startswith(b"data:"):
+                data.append(line[5:].lstrip())
+
+
+def event_records(payload):
+    """Записи Events[] из тела события Redfish (bytes или dict)."""
+    if isinstance(payload, (bytes, str)):
+        payload = json.loads(payload)
+    return payload.get("Events", [])
+
+
+def event_name(record):
+    message = record.get("MessageId", "").rsplit(".", 1)[-1]
+    origin = record.get("OriginOfCondition", {})
+    if isinstance(origin, dict):
+        origin = origin.get("@odata.id", "")
+    return f"{message} {origin.replace('/redfish/v1', '')}".strip()
+
+
+class _Listener:
+    """HTTP-приемник push-подписок процесса: POST /events/<ключ> -> обработчик."""
+
+    def __init__(self, host):
+        self.handlers = {}
+        self._keys = itertools.count(1)
+        self.server = WSGIServer(("0.0.0.0", 0), self.application, log=None, error_log=None)
+        self.server.start()
+        self.url = f"http://{host}:{self.server.server_port}/events"
+
+    def register(self, handler):
+        key = str(next(self._keys))
+        self.handlers[key] = handler
+        return f"{self.url}/{key}"
+
+    def unregister(self, destination):
+        self.handlers.pop(destination.rsplit("/", 1)[1], None)
+
+    def application(self, environ, start_response):
+        received_at = time.time()
+        handler = self.handlers.get(environ.get("PATH_INFO", "").rsplit("/", 1)[-1])
+        if environ.get("REQUEST_METHOD") != "POST" or handler is None:
+            start_response("404 Not Found", [("Content-Length", "0")])
+            return [b""]
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length)
+        start_response("204 No Content", [])
+        gevent.spawn(handler, received_at, body)
+        return [b""]
+
+    def stop(self):
+        self.server.stop(timeout=1)
+
+
+def listener():
+    global _listener
+    if _listener is None:
+        _listener = _Listener(LISTENER_HOST)
+    return _listener
+
+
+class EventSubscriberUser(User):
+    """Подписчик EventService: SSE-поток или push-подписка на приемник генератора."""
+
+    abstract = True
+    wait_time = constant(1)
+
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        self.mode = _option(self.environment, "event_mode", EVENT_MODE)
+        self.base_url = self.host.rstrip("/")
+        self.http = requests.Session()
+        self.http.verify = False
+        self.http.auth = session_pool.auth_for(self)
+        self.last_seq = triggers.latest_seq(self.base_url)
+        self.subscription = None
+        self.destination = None
+        if self.mode == "push":
+            self.subscribe()
+
+    def on_stop(self):
+        if self.subscription:
+            try:
+                self.http.delete(f"{self.base_url}{self.subscription}", timeout=TIMEOUT)
+            except (requests.RequestException, session_pool.SessionPoolError):
+                pass
+            self.subscription = None
+        if self.destination:
+            listener().unregister(self.destination)
+        self.http.close()
+
+    @task
+    def listen(self):
+        if self.mode == "push":
+            gevent.sleep(TIMEOUT)
+            return
+        session_pool.before_request(self.http)
+        started = time.perf_counter()
+        exception = None
+        try:
+            response = self.http.get(f"{self.base_url}{SSE_PATH}", stream=True, timeout=(TIMEOUT, None))
+            response.raise_for_status()
+        except requests.RequestException as e:
+            exception = e
+            response = None
+        self._fire(STREAM_REQUEST_TYPE, "GET /EventService/SSE", (time.perf_counter() - started) * 1000, exception)
+        if response is None:
+            return
+        try:
+            for data in iter_sse(response):
+                self.on_event(time.time(), data)
+        finally:
+            response.close()
+
+    def subscribe(self):
+        self.destination = listener().register(self.on_event)
+        session_pool.before_request(self.http)
+        started = time.perf_counter()
+        exception = None
+        try:
+            response = self.http.post(
+                f"{self.base_url}{SUBSCRIPTIONS_PATH}",
+                json={
+                    "Destination": self.destination,
+                    "Protocol": "Redfish",
+                    "Context": f"{CONTEXT_PREFIX}{id(self)}",
+                    "EventFormatType": "Event",
+                },
+                timeout=TIMEOUT
+            )
+            response.raise_for_status()
+            self.subscription = response.headers.get("Location") or response.json().get("@odata.id")
+        except (requests.RequestException, ValueError) as e:
+            exception = e
+        self._fire(SUBSCRIBE_REQUEST_TYPE, "POST /EventService/Subscriptions", (time.perf_counter() - started) * 1000, exception)
+
+    def on_event(self, received_at, data):
+        try:
+            records = event_records(data)
+        except (ValueError, AttributeError) as e:
+            self._fire(EVENT_REQUEST_TYPE, "invalid", 0, e)
+            return
+        for record in records:
+            name = event_name(record)
+            match = triggers.match(self.base_url, received_at, self.last_seq)
+            if match is None:
+                self._fire(EVENT_REQUEST_TYPE, f"unsolicited {name}", 0)
+                continue
+            seq, sent_at = match
+            for _ in range(seq - self.last_seq - 1):
+                self._fire(EVENT_REQUEST_TYPE, LOST_NAME, 0, Exception("событие не доставлено"))
+            self.last_seq = seq
+            self._fire(EVENT_REQUEST_TYPE, name, (received_at - sent_at) * 1000)
+
+    def _fire(self, request_type, name, response_time, exception=None):
+        self.environment.events.request.fire(
+            request_type=request_type,
+            name=name,
+            response_time=response_time,
+            response_length=0,
+            response=None,
+            context={},
+            exception=exception,
+        )
+
+
+class Trigger:
+    """Переключает питание BMC по кругу ForceOff/On и рассылает моменты запуска."""
+
+    def __init__(self, environment, hosts, interval):
+        self.environment = environment
+        self.hosts = [host.rstrip("/") for host in hosts]
+        self.interval = interval
+        self.sent = 0
+        self._seq = {host: itertools.count(1) for host in self.hosts}
+        self._greenlet = None
+
+    def start(self):
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def _run(self):
+        http = requests.Session()
+        http.verify = False
+        for reset_type in itertools.cycle(("ForceOff", "On")):
+            gevent.sleep(self.interval)
+            for host in self.hosts:
+                self.fire(http, host, reset_type)
+
+    def fire(self, http, host, reset_type):
+        seq = next(self._seq[host])
+        sent_at = time.time()
+        triggers.add(host, seq, sent_at)
+        runner = self.environment.runner
+        if isinstance(runner, MasterRunner):
+            runner.send_message("event_trigger", {"host": host, "seq": seq, "sent_at": sent_at})
+
+        pool = session_pool.get_pool(self.environment, host)
+        token = pool.token(pool.assign())
+        exception = None
+        started = time.perf_counter()
+        try:
+            response = http.post(
+                f"{host}{RESET_PATH}", json={"ResetType": reset_type},
+                headers={"X-Auth-Token": token}, timeout=TIMEOUT
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            exception = e
+        self.sent += 1
+        self.environment.events.request.fire(
+            request_type=TRIGGER_REQUEST_TYPE,
+            name=f"ComputerSystem.Reset {reset_type}",
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            response=None,
+            context={},
+            exception=exception,
+        )
+
+
+def remove_stale_subscriptions(environment, host):
+    """Удаляет подписки прошлых прогонов (Context locust-*), не удаленные в on_stop."""
+    pool = session_pool.get_pool(environment, host)
+    headers = {"X-Auth-Token": pool.token(pool.assign())}
+    removed = 0
+    with requests.Session() as http:
+        http.verify = False
+        http.headers.update(headers)
+        try:
+            response = http.get(f"{host}{SUBSCRIPTIONS_PATH}", timeout=TIMEOUT)
+            if response.status_code != 200:
+                return 0
+            for member in response.json().get("Members", []):
+                url = f"{host}{member['@odata.id']}"
+                subscription = http.get(url, timeout=TIMEOUT)
+                if subscription.ok and subscription.json().get("Context", "").startswith(CONTEXT_PREFIX):
+                    http.delete(url, timeout=TIMEOUT)
+                    removed += 1
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+    return removed
+
+
+def push_stats(stats):
+    """Доставленные события, потери и BMC-запросы на одно изменение у опроса и у событий."""
+    changes = delivered = lost = push_requests = poll_requests = 0
+    for entry in stats.entries.values():
+        if entry.method == TRIGGER_REQUEST_TYPE:
+            changes += entry.num_requests
+        elif entry.method == EVENT_REQUEST_TYPE:
+            if entry.name == LOST_NAME:
+                lost += entry.num_requests
+            else:
+                delivered += entry.num_requests
+        # Доставленные события не запросы к BMC: считаются только потоки и подписки.
+        elif entry.method in (STREAM_REQUEST_TYPE, SUBSCRIBE_REQUEST_TYPE):
+            push_requests += entry.num_requests
+        elif entry.method == "GET" and entry.name.endswith(POLLED_RESOURCE):
+            poll_requests += entry.num_requests
+    return {
+        "changes": changes,
+        "delivered": delivered,
+        "lost": lost,
+        "poll_per_change": poll_requests / changes if changes else 0.0,
+        "push_per_change": push_requests / changes if changes else 0.0,
+    }
+
+
+def format_push_stats(row):
+    message = (
+        f"изменений {row['changes']}, событий доставлено {row['delivered']}, потеряно {row['lost']}; "
+        f"BMC-запросов на изменение: опрос {row['poll_per_change']:.1f}, события {row['push_per_change']:.1f}"
+    )
+    if row["poll_per_change"] and row["push_per_change"]:
+        message += f", опрос/события {row['poll_per_change'] / row['push_per_change']:.2f}"
+    return message
+
+
+def report(environment, reporter, suite=EVENT_SUITE):
+    row = push_stats(environment.stats)
+    if not row["changes"]:
+        return
+    status = 'failed' if row["lost"] else 'passed'
+    reporter.add_test_result(suite, "event delivery", status, format_push_stats(row), 0)
+
+
+def _option(environment, name, default):
+    value = getattr(environment.parsed_options, name, None)
+    return default if value is None else value
+
+
+def _subscriber_classes(environment):
+    return [cls for cls in environment.user_classes if issubclass(cls, EventSubscriberUser)]
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--event-mode", default=EVENT_MODE, choices=MODES, env_var="OPENBMC_EVENT_MODE",
+        help="sse - поток /EventService/SSE, push - подписка на HTTP-приемник генератора",
+    )
+    parser.add_argument(
+        "--event-trigger-interval", type=float, default=TRIGGER_INTERVAL,
+        env_var="OPENBMC_EVENT_TRIGGER_INTERVAL",
+        help="Интервал переключения питания для генерации событий, с (0 - не переключать)",
+    )
+    parser.add_argument(
+        "--event-listener-host", default=LISTENER_HOST, env_var="OPENBMC_EVENT_LISTENER_HOST",
+        help="Адрес генератора для Destination push-подписок, как его видит BMC",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    global LISTENER_HOST
+    LISTENER_HOST = _option(environment, "event_listener_host", LISTENER_HOST)
+    if isinstance(runner, WorkerRunner):
+        runner.register_message("event_trigger", _on_trigger_message)
+
+
+def _on_trigger_message(environment, msg, **kwargs):
+    triggers.add(msg.data["host"], msg.data["seq"], msg.data["sent_at"])
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    classes = _subscriber_classes(environment)
+    interval = _option(environment, "event_trigger_interval", TRIGGER_INTERVAL)
+    if not classes or interval <= 0:
+        return
+    if os.environ.get(bmc_farm.REGISTRY_ENV):
+        hosts = [target["url"] for target in bmc_farm.load_targets()]
+    else:
+        hosts = [environment.host or classes[0].host]
+    hosts = [host.rstrip("/") for host in hosts]
+    if _option(environment, "event_mode", EVENT_MODE) == "push":
+        for host in hosts:
+            remove_stale_subscriptions(environment, host)
+    environment.event_trigger = Trigger(environment, hosts, interval)
+    environment.event_trigger.start()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    trigger = getattr(environment, "event_trigger", None)
+    if trigger is not None:
+        trigger.stop()
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    row = push_stats(environment.stats)
+    if row["changes"]:
+        print(f"EventService: {format_push_stats(row)}")
+
+
+def measure_delivery(base_url, headers, subscribers=1, timeout=10, reset_type="ForceOff"):
+    """Открывает subscribers SSE-потоков, переключает питание и возвращает задержки доставки, с.
+
+    Для pytest: headers - заголовки авторизации (X-Auth-Token), потоки
+    читаются в отдельных потоках. None в результате - событие не пришло
+    за timeout. Ошибка подключения подписчика пробрасывается вызывающему.
+    reset_type должен менять текущее состояние питания, иначе BMC не
+    пришлет ResourceChanged.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+
+    base_url = base_url.rstrip("/")
+    connected = threading.Barrier(subscribers + 1, timeout=timeout)
+    sent = {}
+
+    def subscriber():
+        with requests.Session() as http:
+            http.verify = False
+            http.headers.update(headers)
+            try:
+                response = http.get(f"{base_url}{SSE_PATH}", stream=True, timeout=(timeout, timeout))
+                response.raise_for_status()
+            except Exception:
+                # Иначе основной поток ждет барьер до timeout.
+                connected.abort()
+                raise
+            connected.wait()
+            try:
+                for data in iter_sse(response):
+                    received_at = time.time()
+                    if "at" in sent and any(r.get("OriginOfCondition", {}).get("@odata.id", "").endswith(POLLED_RESOURCE)
+                           for r in event_records(data)):
+                        return received_at - sent["at"]
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError):
+                return None
+            finally:
+                response.close()
+        return None
+
+    with ThreadPoolExecutor(max_workers=subscribers) as executor:
+        futures = [executor.submit(subscriber) for _ in range(subscribers)]
+        try:
+            connected.wait()
+        except threading.BrokenBarrierError:
+            for future in futures:
+                error = future.exception()
+                if error is not None and not isinstance(error, threading.BrokenBarrierError):
+                    raise error
+            raise
+        with requests.Session() as http:
+            http.verify = False
+            http.headers.update(headers)
+            sent["at"] = time.time()
+            response = http.post(f"{base_url}{RESET_PATH}", json={"ResetType": reset_type}, timeout=timeout)
+            response.raise_for_status()
+        return [future.result() for future in futures]
@@ -0,0 +1,237 @@
+"""FastHttpUser-варианты пользователей OpenBMC и учет TLS-рукопожатий.
+
+На эмулированном ARM BMC полное TLS-рукопожатие стоит дороже самого
+Redfish GET, поэтому при переподключениях нагрузочный тест измеряет
+рукопожатия, а не bmcweb. FastRedfishUser работает на geventhttpclient
+с одним keep-alive соединением на пользователя, а ResumingSSLContext
+возобновляет TLS-сессию по билету из уже открытого соединения к тому
+же BMC вместо полного рукопожатия.
+
+Реализация выбирается переменной OPENBMC_HTTP_CLIENT=fast|requests
+(по умолчанию requests). В обоих вариантах каждое рукопожатие
+записывается в environment.tls_stats ("handshake full" или "handshake
+resumed"), а не в статистику запросов Locust, чтобы Aggregated, SLO и
+история прогонов считали только запросы к Redfish. worker-процессы
+передают гистограммы master в отчетах. Число рукопожатий, их
+латентность и доля переиспользования соединений печатаются в конце
+теста. Сравнение двух реализаций на одном BMC:
+
+    python lab7/tests/bench_http_clients.py --host https://localhost:2443 --users 20 --run-time 60
+"""
+
+from locust import FastHttpUser, events
+from locust.runners import WorkerRunner
+import gevent.ssl
+import os
+import time
+import weakref
+
+import phase_timing
+import response_checks
+import session_pool
+from hdr_histogram import LatencyRecorder
+
+HTTP_CLIENT = os.environ.get("OPENBMC_HTTP_CLIENT", "requests")
+ENABLED = HTTP_CLIENT == "fast"
+CONCURRENCY = int(os.environ.get("OPENBMC_FAST_CONCURRENCY", 1))
+TLS_FULL = "handshake full"
+TLS_RESUMED = "handshake resumed"
+
+_environment = None
+
+
+class ResumingSSLContext(gevent.ssl.SSLContext):
+    """SSLContext без проверки сертификата, считающий рукопожатия.
+
+    При resume=True новое соединение предлагает серверу TLS-сессию из
+    открытого соединения к тому же host:port. Для TLS 1.3 билет
+    приходит после рукопожатия, поэтому сессия берется у живых сокетов,
+    а не запоминается сразу при подключении. Сессию можно передать
+    только сокету того же контекста, поэтому контекст один на процесс
+    (shared_context).
+    """
+
+    resume = True
+
+    def __new__(cls, *args, **kwargs):
+        return super().__new__(cls, gevent.ssl.PROTOCOL_TLS_CLIENT)
+
+    def __init__(self, *args, **kwargs):
+        self.check_hostname = False
+        self.verify_mode = gevent.ssl.CERT_NONE
+        self._sockets = {}
+        self._sessions = {}
+
+    def _session_for(self, key):
+        for sock in list(self._sockets.get(key, ())):
+            try:
+                session = sock.session
+            except (OSError, ValueError):
+                continue
+            if session is not None and session.has_ticket:
+                self._sessions[key] = session
+                return session
+        return self._sessions.get(key)
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        key = None
+        if self.resume and session is None:
+            try:
+                key = (server_hostname, sock.getpeername()[1])
+            except OSError:
+                key = None
+            if key is not None:
+                session = self._session_for(key)
+
+        started = time.perf_counter()
+        ssock = super().wrap_socket(
+            sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+            suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname,
+            session=session
+        )
+        record_handshake(ssock.session_reused, (time.perf_counter() - started) * 1000)
+        if key is not None:
+            self._sockets.setdefault(key, weakref.WeakSet()).add(ssock)
+        return ssock
+
+
+class CountingSSLContext(ResumingSSLContext):
+    """Тот же учет рукопожатий, но без возобновления сессий (как у requests по умолчанию)."""
+
+    resume = False
+
+
+def record_handshake(resumed, elapsed_ms):
+    if _environment is None:
+        return
+    _environment.tls_stats.record(TLS_RESUMED if resumed else TLS_FULL, elapsed_ms)
+
+
+_contexts = {}
+
+
+def shared_context(context_class=ResumingSSLContext):
+    if context_class not in _contexts:
+        _contexts[context_class] = context_class()
+    return _contexts[context_class]
+
+
+def ssl_context_factory(*args, **kwargs):
+    return shared_context(ResumingSSLContext)
+
+
+class CountingAdapter(phase_timing.TimedAdapter):
+    """Адаптер HttpSession с CountingSSLContext: рукопожатия HttpUser попадают в тот же tls_stats."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = shared_context(CountingSSLContext)
+        super().init_poolmanager(*args, **kwargs)
+
+
+def count_handshakes(session):
+    """Подключает учет рукопожатий к HttpSession пользователя (HttpUser.client)."""
+    adapter = CountingAdapter()
+    session.mount("https://", adapter)
+    return adapter
+
+
+class FastRedfishUser(FastHttpUser):
+    """FastHttpUser c keep-alive, возобновлением TLS и токеном из session_pool.
+
+    Запросы делаются через redfish_get(); при 401 токен слота
+    пересоздается, а сам запрос отмечается как failure.
+    """
+
+    abstract = True
+    concurrency = CONCURRENCY
+    connection_timeout = 30.0
+    network_timeout = 30.0
+    insecure = True
+    default_headers = {"Connection": "keep-alive"}
+    ssl_context_factory = staticmethod(ssl_context_factory)
+
+    def on_start(self):
+        self.pool = session_pool.get_pool(self.environment, self.host)
+        self.slot = self.pool.assign()
+
+    def redfish_get(self, path, name, check):
+        token = self.pool.token(self.slot)
+        with self.client.get(path, name=name, headers={"X-Auth-Token": token}, catch_response=True) as response:
+            if response.status_code == 401:
+                self.pool.token(self.slot, stale=token)
+                response.failure("HTTP 401: сессия пересоздана")
+                return None
+            return response_checks.validate(response, check)
+
+
+def connection_stats(environment):
+    """Рукопожатия, их p95 и доля запросов, обслуженных уже открытым соединением."""
+    requests = environment.stats.total.num_requests
+    handshakes = getattr(environment, "tls_stats", None) or LatencyRecorder()
+    full = handshakes.histograms.get(TLS_FULL)
+    resumed = handshakes.histograms.get(TLS_RESUMED)
+    count = sum(h.total_count for h in (full, resumed) if h is not None)
+    reuse = 1 - count / requests if requests else 0.0
+    return {
+        "requests": requests,
+        "handshakes_full": full.total_count if full is not None else 0,
+        "handshakes_resumed": resumed.total_count if resumed is not None else 0,
+        "handshake_full_p95_ms": full.percentile(95) / 1000 if full is not None and full.total_count else None,
+        "handshake_resumed_p95_ms": (
+            resumed.percentile(95) / 1000 if resumed is not None and resumed.total_count else None
+        ),
+        "connection_reuse": max(reuse, 0.0),
+    }
+
+
+def _p95(value):
+    return f" (p95 {value:.1f} мс)" if value is not None else ""
+
+
+def format_connection_stats(stats):
+    return (
+        f"запросов {stats['requests']}, рукопожатий TLS: полных {stats['handshakes_full']}"
+        f"{_p95(stats['handshake_full_p95_ms'])}, "
+        f"возобновленных {stats['handshakes_resumed']}{_p95(stats['handshake_resumed_p95_ms'])}, "
+        f"переиспользование соединений {stats['connection_reuse']:.1%}"
+    )
+
+
+def report(environment, reporter, suite="load"):
+    stats = connection_stats(environment)
+    if stats["requests"]:
+        reporter.add_test_result(suite, "tls connections", 'passed', format_connection_stats(stats), 0)
+
+
+@events.init.add_listener
+def _on_init(environment, **kwargs):
+    global _environment
+    _environment = environment
+    environment.tls_stats = LatencyRecorder()
+
+
+@events.report_to_master.add_listener
+def _on_report_to_master(client_id, data, **kwargs):
+    if _environment is not None:
+        data["tls"] = _environment.tls_stats.drain()
+
+
+@events.worker_report.add_listener
+def _on_worker_report(client_id, data, **kwargs):
+    if _environment is not None and data.get("tls"):
+        _environment.tls_stats.merge(data["tls"])
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    environment.tls_stats = LatencyRecorder()
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    stats = connection_stats(environment)
+    if stats["requests"]:
+        print(f"TLS-соединения: {format_connection_stats(stats)}")
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""HDR-гистограммы латентности с объединением без потери точности.
+
+Locust округляет время ответа до корзин (до 10 мс выше 100 мс, до
+100 мс выше секунды), поэтому p99/p99.9 медленных endpoint BMC
+получаются грубыми, а усреднение между worker и запусками теряет
+точность. HdrHistogram хранит значения с заданным числом значащих
+цифр в массиве фиксированного размера, поэтому память не растет за
+многочасовой прогон, а гистограммы разных worker и запусков
+складываются поиндексно без потерь.
+
+С --hdr-file время ответа каждого запроса записывается в гистограмму
+своего endpoint, worker-процессы передают свои гистограммы master в
+отчетах, а при выходе все сохраняются в JSON (zlib + base64):
+
+    locust -f lab7/tests/locustfile.py --headless --hdr-file results/load_latency.hdr.json
+    python lab7/tests/hdr_histogram.py percentiles results/load_latency.hdr.json
+    python lab7/tests/hdr_histogram.py merge run1.hdr.json run2.hdr.json -o all.hdr.json
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+import argparse
+import base64
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+HDR_FILE = os.environ.get("OPENBMC_HDR_FILE")
+SIGNIFICANT_FIGURES = int(os.environ.get("OPENBMC_HDR_DIGITS", 3))
+LOWEST_VALUE = 1
+HIGHEST_VALUE = 3600 * 1000 * 1000
+UNIT = "us"
+PERCENTILES = (50, 90, 95, 99, 99.9, 99.99)
+HEADER = struct.Struct("<4sBqqqq")
+MAGIC = b"HDR1"
+
+
+class HdrHistogram:
+    """Гистограмма целых значений от lowest до highest с significant_figures цифрами."""
+
+    def __init__(self, lowest=LOWEST_VALUE, highest=HIGHEST_VALUE, significant_figures=SIGNIFICANT_FIGURES):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures должно быть от 1 до 5")
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError("Нужно 1 <= lowest и highest >= 2 * lowest")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        sub_bucket_count_magnitude = math.ceil(math.log2(largest_single_unit))
+        self.sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self.sub_bucket_count = 1 << (self.sub_bucket_half_count_magnitude + 1)
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.unit_magnitude = int(math.floor(math.log2(lowest)))
+        self.sub_bucket_mask = (self.sub_bucket_count - 1) << self.unit_magnitude
+
+        smallest_untrackable = self.sub_bucket_count << self.unit_magnitude
+        self.bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            self.bucket_count += 1
+
+        self.counts = array("q", bytes(8 * (self.bucket_count + 1) * self.sub_bucket_half_count))
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def _index(self, value):
+        bucket = (value | self.sub_bucket_mask).bit_length() - (
+            self.unit_magnitude + self.sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket = value >> (bucket + self.unit_magnitude)
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + sub_bucket - self.sub_bucket_half_count
+
+    def _value_at(self, index):
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self.sub_bucket_half_count
+            bucket = 0
+        return sub_bucket << (bucket + self.unit_magnitude), bucket, sub_bucket
+
+    def highest_equivalent(self, index):
+        value, bucket, sub_bucket = self._value_at(index)
+        shift = self.unit_magnitude + bucket + (1 if sub_bucket >= self.sub_bucket_count else 0)
+        return value + (1 << shift) - 1
+
+    def record(self, value, count=1):
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.total_count += count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def compatible(self, other):
+        return (self.lowest, self.highest, self.significant_figures) == (
+            other.lowest, other.highest, other.significant_figures
+        )
+
+    def add(self, other):
+        """Прибавляет другую гистограмму без потери точности."""
+        if not self.compatible(other):
+            for index, count in other.nonzero():
+                self.record(other.highest_equivalent(index), count)
+            return self
+        counts = self.counts
+        for index, count in other.nonzero():
+            counts[index] += count
+        self.total_count += other.total_count
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+        return self
+
+    def nonzero(self):
+        return ((i, c) for i, c in enumerate(self.counts) if c)
+
+    def percentile(self, percent):
+        if not self.total_count:
+            return 0
+        target = max(1, int(percent / 100 * self.total_count + 0.5))
+        seen = 0
+        for index, count in self.nonzero():
+            seen += count
+            if seen >= target:
+                return min(self.highest_equivalent(index), self.max_value)
+        return self.max_value
+
+    def mean(self):
+        if not self.total_count:
+            return 0.0
+        total = 0
+        for index, count in self.nonzero():
+            value, _, _ = self._value_at(index)
+            total += (value + self.highest_equivalent(index)) / 2 * count
+        return total / self.total_count
+
+    def reset(self):
+        self.counts = array("q", bytes(8 * len(self.counts)))
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def encode(self):
+        """Заголовок и счетчики в zigzag-varint, серии нулей - отрицательной длиной, затем zlib."""
+        out = bytearray(HEADER.pack(
+            MAGIC, self.significant_figures, self.lowest, self.highest,
+            self.min_value or 0, self.max_value
+        ))
+        zeros = 0
+        for count in self.counts:
+            if count == 0:
+                zeros += 1
+                continue
+            if zeros:
+                _write_varint(out, _zigzag(-zeros))
+                zeros = 0
+            _write_varint(out, _zigzag(count))
+        return zlib.compress(bytes(out), 9)
+
+    @classmethod
+    def decode(cls, data):
+        data = zlib.decompress(data)
+        magic, digits, lowest, highest, min_value, max_value = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Неизвестный формат гистограммы")
+        histogram = cls(lowest, highest, digits)
+        position = HEADER.size
+        index = 0
+        while position < len(data):
+            value, position = _read_varint(data, position)
+            value = _unzigzag(value)
+            if value < 0:
+                index += -value
+                continue
+            histogram.counts[index] = value
+            histogram.total_count += value
+            index += 1
+        histogram.min_value = min_value if histogram.total_count else None
+        histogram.max_value = max_value
+        return histogram
+
+    def to_base64(self):
+        return base64.b64encode(self.encode()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, text):
+        return cls.decode(base64.b64decode(text))
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+class LatencyRecorder:
+    """Гистограммы по имени запроса, значения в микросекундах."""
+
+    def __init__(self, significant_figures=SIGNIFICANT_FIGURES):
+        self.significant_figures = significant_figures
+        self.histograms = {}
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = HdrHistogram(significant_figures=self.significant_figures)
+        return histogram
+
+    def record(self, name, response_time_ms):
+        self.histogram(name).record(round(response_time_ms * 1000))
+
+    def merge(self, encoded):
+        for name, text in encoded.items():
+            self.histogram(name).add(HdrHistogram.from_base64(text))
+
+    def drain(self):
+        """Сериализует накопленное и обнуляет гистограммы (для отчета worker)."""
+        encoded = {}
+        for name, histogram in self.histograms.items():
+            if histogram.total_count:
+                encoded[name] = histogram.to_base64()
+                histogram.reset()
+        return encoded
+
+    def total(self):
+        total = HdrHistogram(significant_figures=self.significant_figures)
+        for histogram in self.histograms.values():
+            total.add(histogram)
+        return total
+
+    def summary(self):
+        rows = {}
+        for name, histogram in sorted(self.histograms.items()):
+            rows[name] = _percentiles(histogram)
+        if self.histograms:
+            rows["Aggregated"] = _percentiles(self.total())
+        return rows
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "unit": UNIT,
+            "significant_figures": self.significant_figures,
+            "histograms": {name: h.to_base64() for name, h in sorted(self.histograms.items())},
+            "percentiles_ms": self.summary(),
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        recorder = cls(data.get("significant_figures", SIGNIFICANT_FIGURES))
+        recorder.merge(data["histograms"])
+        return recorder
+
+
+def _percentiles(histogram):
+    row = {"count": histogram.total_count, "mean": histogram.mean() / 1000}
+    for percent in PERCENTILES:
+        row[f"p{percent:g}"] = histogram.percentile(percent) / 1000
+    row["max"] = histogram.max_value / 1000
+    return row
+
+
+def format_summary(summary):
+    header = ["count", "mean"] + [f"p{p:g}" for p in PERCENTILES] + ["max"]
+    width = max([len(name) for name in summary] + [8])
+    lines = [f"{'Name':<{width}} " + " ".join(f"{h:>10}" for h in header)]
+    for name, row in summary.items():
+        values = [f"{row['count']:>10}"] + [f"{row[h]:>10.1f}" for h in header[1:]]
+        lines.append(f"{name:<{width}} " + " ".join(values))
+    return "\n".join(lines)
+
+
+def _request_name(request_type, name):
+    return name if name.startswith(f"{request_type} ") else f"{request_type} {name}"
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--hdr-file", default=HDR_FILE, env_var="OPENBMC_HDR_FILE",
+        help="Куда сохранить HDR-гистограммы латентности по endpoint (JSON)",
+    )
+    parser.add_argument(
+        "--hdr-digits", type=int, default=SIGNIFICANT_FIGURES, env_var="OPENBMC_HDR_DIGITS",
+        help="Число значащих цифр HDR-гистограмм (1-5)",
+    )
+
+
+def _enabled(environment):
+    options = environment.parsed_options
+    return bool(getattr(options, "hdr_file", None) or HDR_FILE)
+
+
+_environment = None
+
+
+@events.init.add_listener
+def _on_init(environment, **kwargs):
+    global _environment
+    _environment = environment
+    options = environment.parsed_options
+    environment.latency_recorder = LatencyRecorder(getattr(options, "hdr_digits", None) or SIGNIFICANT_FIGURES)
+
+
+@events.request.add_listener
+def _on_request(request_type, name, response_time, exception=None, **kwargs):
+    if _environment is not None and _enabled(_environment):
+        _environment.latency_recorder.record(_request_name(request_type, name), response_time)
+
+
+@events.report_to_master.add_listener
+def _on_report_to_master(client_id, data, **kwargs):
+    if _environment is not None and _enabled(_environment):
+        data["hdr"] = _environment.latency_recorder.drain()
+
+
+@events.worker_report.add_listener
+def _on_worker_report(client_id, data, **kwargs):
+    if _environment is not None and data.get("hdr"):
+        _environment.latency_recorder.merge(data["hdr"])
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner) or not _enabled(environment):
+        return
+    path = getattr(environment.parsed_options, "hdr_file", None) or HDR_FILE
+    environment.latency_recorder.save(path)
+    print(format_summary(environment.latency_recorder.summary()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HDR-гистограммы латентности нагрузочных прогонов")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("percentiles", help="перцентили по файлам гистограмм (сумма файлов)")
+    show.add_argument("files", nargs="+")
+    merge = sub.add_parser("merge", help="объединить гистограммы нескольких прогонов")
+    merge.add_argument("files", nargs="+")
+    merge.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+
+    recorder = LatencyRecorder.load(args.files[0])
+    for path in args.files[1:]:
+        with open(path, encoding="utf-8") as f:
+            recorder.merge(json.load(f)["histograms"])
+
+    if args.command == "merge":
+        recorder.save(args.output)
+    print(format_summary(recorder.summary()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""Метаданные сборки romulus: индекс пакетов и переменных образа.
+
+Каталог сборки содержит для каждого образа *.manifest (строки
+"пакет архитектура версия"), *.testdata.json (все переменные bitbake,
+около 2400 ключей) и *.spdx.json (граф SPDX 3.0 на тысячи элементов).
+Файлы JSON читаются потоково, JsonStream разбирает значения по одному,
+из testdata берутся только VARIABLES, а из графа SPDX - пакеты
+install. Версия ядра берется из имен fitImage того же DATETIME, а
+если их нет - из исходника linux-*.tar в SPDX.
+
+Результат разбора - компактный индекс JSON (образ -> переменные,
+ядро, пакет -> версия), который перечитывается за миллисекунды.
+Образ разбирается заново, только если у одного из его файлов
+изменился размер или mtime. Индекс общий для всех каталогов сборки,
+поэтому в нем можно сравнивать пакеты разных прошивок.
+
+    python lab7/tests/image_metadata.py show --image-dir romulus
+    python lab7/tests/image_metadata.py diff obmc-phosphor-image-romulus-20251120104621 /path/to/new/deploy
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+
+INDEX_FILE = os.environ.get(
+    "OPENBMC_IMAGE_INDEX", os.path.join(tempfile.gettempdir(), "openbmc_image_index.json")
+)
+INDEX_VERSION = 1
+SOURCES = {
+    "manifest": ".manifest",
+    "testdata": ".testdata.json",
+    "spdx": ".spdx.json",
+}
+VARIABLES = (
+    "IMAGE_NAME",
+    "IMAGE_BASENAME",
+    "MACHINE",
+    "DISTRO",
+    "DISTRO_VERSION",
+    "DISTRO_CODENAME",
+    "DATETIME",
+    "METADATA_BRANCH",
+    "METADATA_REVISION",
+    "TUNE_PKGARCH",
+    "PREFERRED_PROVIDER_virtual/kernel",
+)
+MAIN_IMAGE = "obmc-phosphor-image-"
+TAG_PACKAGES = ("bmcweb",)
+TAG_PREFIXES = ("phosphor-",)
+BUILD_SUFFIX = re.compile(r"-(\d{14})$")
+KERNEL_ARTIFACT = re.compile(r"^fitImage[\w.-]*?--(?P<version>.+)-(?P<machine>[^-]+)-(?P<datetime>\d{14})\.\w+$")
+KERNEL_SOURCE = re.compile(r"^linux-(\d[\w.]*)\.tar")
+CHUNK = 1 << 16
+WHITESPACE = " \t\r\n"
+NUMBER_TAIL = "0123456789.eE+-"
+
+
+class JsonStream:
+    """Потоковый разбор JSON: элементы массива и ключи объекта по одному.
+
+    В памяти только текущий блок файла и одно значение. После ключа из
+    keys() нужно забрать его значение через value(), array() или keys().
+    """
+
+    def __init__(self, f, chunk=CHUNK):
+        self.f = f
+        self.chunk = chunk
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        data = self.f.read(self.chunk)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON: ожидался {char!r}, найден {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Число на границе блока может продолжаться в следующем.
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] in NUMBER_TAIL) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _separator(self, close):
+        char = self.peek()
+        self.pos += 1
+        if char == close:
+            return False
+        if char != ",":
+            raise ValueError(f"JSON: ожидался ',' или {close!r}, найден {char!r}")
+        return True
+
+    def array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self._separator("]"):
+                return
+
+    def keys(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+
+def read_manifest(path):
+    packages = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 3:
+                packages[fields[0]] = fields[2]
+    return packages
+
+
+def read_testdata(path, variables=VARIABLES):
+    wanted = set(variables)
+    found = {}
+    with open(path, encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.keys():
+            value = stream.value()
+            if key in wanted:
+                found[key] = value
+    return found
+
+
+def read_spdx(path):
+    """(пакеты install {имя: версия}, версия ядра из исходника linux-*.tar или None)."""
+    packages = {}
+    kernel = None
+    with open(path, encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.keys():
+            if key != "@graph":
+                stream.value()
+                continue
+            for element in stream.array():
+                if element.get("type") != "software_Package":
+                    continue
+                purpose = element.get("software_primaryPurpose")
+                if purpose == "install" and element.get("software_packageVersion"):
+                    packages[element["name"]] = element["software_packageVersion"]
+                elif purpose == "source" and kernel is None:
+                    match = KERNEL_SOURCE.match(element.get("name", ""))
+                    if match:
+                        kernel = match.group(1)
+    return packages, kernel
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def scan(image_dir):
+    """{образ: {вид: путь}} по файлам SOURCES каталога сборки; символьные ссылки пропускаются."""
+    images = {}
+    for kind, suffix in SOURCES.items():
+        for path in glob.glob(os.path.join(image_dir, f"*{suffix}")):
+            if os.path.islink(path):
+                continue
+            images.setdefault(os.path.basename(path)[:-len(suffix)], {})[kind] = path
+    return images
+
+
+def kernel_versions(image_dir):
+    """{DATETIME: версия ядра} по именам fitImage."""
+    versions = {}
+    for path in glob.glob(os.path.join(image_dir, "fitImage*--*")):
+        match = KERNEL_ARTIFACT.match(os.path.basename(path))
+        if match:
+            versions.setdefault(match.group("datetime"), match.group("version"))
+    return versions
+
+
+def build_entry(image, files, kernels):
+    variables = read_testdata(files["testdata"]) if "testdata" in files else {}
+    packages = {}
+    kernel = None
+    if "spdx" in files:
+        packages, kernel = read_spdx(files["spdx"])
+    if "manifest" in files:
+        packages.update(read_manifest(files["manifest"]))
+    build = variables.get("DATETIME")
+    if build is None:
+        match = BUILD_SUFFIX.search(image)
+        build = match.group(1) if match else None
+    return {
+        "files": {os.path.basename(path): file_stamp(path) for path in files.values()},
+        "variables": variables,
+        "kernel": kernels.get(build) or kernel,
+        "packages": dict(sorted(packages.items())),
+    }
+
+
+class MetadataIndex:
+    """Индекс {образ: {files, variables, kernel, packages}} с проверкой свежести по файлам."""
+
+    def __init__(self, images=None):
+        self.images = images or {}
+
+    def refresh(self, image_dir):
+        """Разбирает образы каталога, у которых изменились файлы; True, если индекс изменился."""
+        changed = False
+        kernels = None
+        for image, files in scan(image_dir).items():
+            entry = self.images.get(image)
+            stamps = {os.path.basename(path): file_stamp(path) for path in files.values()}
+            if entry is not None and entry["files"] == stamps:
+                continue
+            if kernels is None:
+                kernels = kernel_versions(image_dir)
+            self.images[image] = build_entry(image, files, kernels)
+            changed = True
+        return changed
+
+    def main_image(self, image_dir=None, prefix=MAIN_IMAGE):
+        """Имя самой свежей сборки основного образа (из image_dir, если задан)."""
+        names = scan(image_dir) if image_dir is not None else self.images
+        candidates = [name for name in names if name.startswith(prefix) and name in self.images]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda name: (self.images[name]["variables"].get("DATETIME") or "", name))
+
+    def to_dict(self):
+        return {"version": INDEX_VERSION, "images": self.images}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != INDEX_VERSION:
+            return cls()
+        return cls(data["images"])
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return cls()
+        except ValueError:
+            # Поврежденный индекс просто строится заново.
+            return cls()
+
+
+def load_index(image_dir=None, path=INDEX_FILE):
+    """Индекс из path, дополненный образами image_dir; сохраняется, только если изменился."""
+    index = MetadataIndex.load(path)
+    if image_dir is not None and index.refresh(image_dir):
+        index.save(path)
+    return index
+
+
+def tags(name, entry):
+    """Теги результатов: образ, сборка, ядро и версии bmcweb и phosphor-*."""
+    variables = entry["variables"]
+    packages = entry["packages"]
+    return {
+        "image": variables.get("IMAGE_NAME") or name,
+        "machine": variables.get("MACHINE"),
+        "distro": variables.get("DISTRO"),
+        "revision": (variables.get("METADATA_REVISION") or "")[:12] or None,
+        "kernel": entry["kernel"],
+        "packages": {
+            package: version for package, version in packages.items()
+            if package in TAG_PACKAGES or package.startswith(TAG_PREFIXES)
+        },
+    }
+
+
+def image_tags(image_dir, path=INDEX_FILE):
+    """Теги основного образа каталога сборки или None, если его там нет."""
+    if not image_dir or not os.path.isdir(image_dir):
+        return None
+    index = load_index(image_dir, path)
+    name = index.main_image(image_dir)
+    return tags(name, index.images[name]) if name else None
+
+
+def format_tags(image_tags):
+    parts = [image_tags["image"]]
+    if image_tags["revision"]:
+        parts.append(f"ревизия {image_tags['revision']}")
+    if image_tags["kernel"]:
+        parts.append(f"ядро {image_tags['kernel']}")
+    for package in TAG_PACKAGES:
+        if package in image_tags["packages"]:
+            parts.append(f"{package} {image_tags['packages'][package]}")
+    return ", ".join(parts)
+
+
+def diff_packages(old, new):
+    """{added: {пакет: версия}, removed: {...}, changed: {пакет: [старая, новая]}}."""
+    return {
+        "added": {name: new[name] for name in sorted(new.keys() - old.keys())},
+        "removed": {name: old[name] for name in sorted(old.keys() - new.keys())},
+        "changed": {
+            name: [old[name], new[name]]
+            for name in sorted(old.keys() & new.keys()) if old[name] != new[name]
+        },
+    }
+
+
+def format_diff(diff):
+    lines = [f"+ {name} {version}" for name, version in diff["added"].items()]
+    lines += [f"- {name} {version}" for name, version in diff["removed"].items()]
+    lines += [f"~ {name} {old} -> {new}" for name, (old, new) in diff["changed"].items()]
+    return lines
+
+
+def report(image_tags, reporter, suite="firmware"):
+    packages = "; ".join(
+        f"{name} {version}" for name, version in image_tags["packages"].items() if name not in TAG_PACKAGES
+    )
+    reporter.add_test_result(suite, f"image {image_tags['image']}", 'passed', f"{format_tags(image_tags)}; {packages}", 0)
+
+
+def _resolve(index, image, path):
+    """Имя образа из индекса или основной образ каталога сборки."""
+    if os.path.isdir(image):
+        if index.refresh(image):
+            index.save(path)
+        name = index.main_image(image)
+        if name is None:
+            raise SystemExit(f"{image}: нет метаданных образа")
+        return name
+    if image not in index.images:
+        raise SystemExit(f"{image}: образа нет в индексе {path}")
+    return image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Метаданные сборки OpenBMC")
+    parser.add_argument("--index", default=INDEX_FILE, help="файл индекса")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show_parser = sub.add_parser("show", help="образы каталога сборки и их теги")
+    show_parser.add_argument("--image-dir", help="каталог сборки; без него - все образы индекса")
+    show_parser.add_argument("--packages", action="store_true", help="вывести все пакеты")
+    diff_parser = sub.add_parser("diff", help="разница пакетов двух образов")
+    diff_parser.add_argument("old", help="имя образа в индексе или каталог сборки")
+    diff_parser.add_argument("new", help="имя образа в индексе или каталог сборки")
+    args = parser.parse_args(argv)
+
+    index = load_index(None, args.index)
+    if args.command == "show":
+        names = sorted(index.images)
+        if args.image_dir:
+            if index.refresh(args.image_dir):
+                index.save(args.index)
+            names = sorted(scan(args.image_dir))
+        for name in names:
+            entry = index.images[name]
+            print(f"{format_tags(tags(name, entry))}: пакетов {len(entry['packages'])}")
+            if args.packages:
+                for package, version in entry["packages"].items():
+                    print(f"  {package} {version}")
+        return 0
+
+    old = _resolve(index, args.old, args.index)
+    new = _resolve(index, args.new, args.index)
+    lines = format_diff(diff_packages(index.images[old]["packages"], index.images[new]["packages"]))
+    print(f"{old} -> {new}: изменений {len(lines)}")
+    for line in lines:
+        print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""История нагрузочного теста по интервалам с ограниченной памятью.
+
+На многочасовом soak-прогоне история Locust (stats.history, по которой
+рисуется HTML-отчет) и --csv-full-history растут линейно со временем.
+LoadHistory хранит статистику по endpoint в кольцевых буферах array с
+колонками фиксированной ширины на нескольких разрешениях:
+
+    1 с    последние 15 минут
+    10 с   последние 3 часа
+    60 с   последние 24 часа
+    600 с  последние 7 суток
+
+Каждый уровень считается из накопленной статистики Locust независимо,
+разностью с предыдущим снимком своего уровня, поэтому перцентили
+свертки точные, а не усреднение мелких интервалов. Память не зависит от
+длительности прогона, а stats.history заменяется точками из сверток
+(недавнее - подробно, старое - грубо), так что HTML-отчет остается
+небольшим.
+
+С --history-file все уровни сохраняются в компактный двоичный файл
+(заголовок JSON и колонки array подряд), который читает load() или:
+
+    python lab7/tests/load_history.py show results/load_history.bin
+    python lab7/tests/load_history.py csv results/load_history.bin --level 1 -o history_10s.csv
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+from locust.stats import PERCENTILES_TO_CHART, calculate_response_time_percentile
+from locust.util.date import format_utc_timestamp
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+import gevent
+
+HISTORY_FILE = os.environ.get("OPENBMC_HISTORY_FILE")
+LEVELS = ((1, 900), (10, 1080), (60, 1440), (600, 1008))
+TOTAL_NAME = "Aggregated"
+COLUMNS = (
+    ("time", "d"),
+    ("users", "I"),
+    ("requests", "I"),
+    ("failures", "I"),
+    ("rt_sum", "d"),
+    ("rt_max", "f"),
+    ("p50", "f"),
+    ("p95", "f"),
+    ("p99", "f"),
+)
+RENDER_EVERY = 10
+MAGIC = b"OBMCHIS1"
+HEADER = struct.Struct("<8sI")
+
+
+class Ring:
+    """Кольцевой буфер строк COLUMNS на capacity точек, колонки - array."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = {name: array(code, bytes(array(code).itemsize * capacity)) for name, code in COLUMNS}
+        self.start = 0
+        self.count = 0
+
+    def append(self, row):
+        index = (self.start + self.count) % self.capacity
+        if self.count == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.count += 1
+        for name, _ in COLUMNS:
+            self.columns[name][index] = row[name]
+
+    def column(self, name):
+        """Колонка в хронологическом порядке."""
+        data = self.columns[name]
+        end = self.start + self.count
+        if end <= self.capacity:
+            return data[self.start:end]
+        return data[self.start:] + data[:end - self.capacity]
+
+    def rows(self):
+        columns = [self.column(name) for name, _ in COLUMNS]
+        for values in zip(*columns):
+            yield dict(zip((name for name, _ in COLUMNS), values))
+
+    def first_time(self):
+        return self.columns["time"][self.start] if self.count else None
+
+
+class Level:
+    """Одно разрешение: кольцевые буферы по endpoint и снимок, от которого считается разность."""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.series = {}
+        self.previous = {}
+        self.last_time = None
+
+    def due(self, now):
+        return self.last_time is None or now - self.last_time >= self.resolution - 0.001
+
+    def add(self, now, users, current):
+        for name, (requests, failures, rt_sum, times) in current.items():
+            before = self.previous.get(name, (0, 0, 0.0, {}))
+            delta = {rt: n - before[3].get(rt, 0) for rt, n in times.items() if n > before[3].get(rt, 0)}
+            completed = sum(delta.values())
+            ring = self.series.get(name)
+            if ring is None:
+                ring = self.series[name] = Ring(self.capacity)
+            ring.append({
+                "time": now,
+                "users": users,
+                "requests": max(requests - before[0], 0),
+                "failures": max(failures - before[1], 0),
+                "rt_sum": max(rt_sum - before[2], 0.0),
+                "rt_max": max(delta) if delta else 0,
+                "p50": calculate_response_time_percentile(delta, completed, 0.5) if completed else 0,
+                "p95": calculate_response_time_percentile(delta, completed, 0.95) if completed else 0,
+                "p99": calculate_response_time_percentile(delta, completed, 0.99) if completed else 0,
+            })
+        self.previous = current
+        self.last_time = now
+
+
+class LoadHistory:
+    def __init__(self, levels=LEVELS):
+        self.levels = [Level(resolution, capacity) for resolution, capacity in levels]
+
+    def sample(self, stats, users, now=None, flush=False):
+        """Снимает накопленную статистику и дописывает точки уровням, у которых подошел срок.
+
+        flush=True дописывает неполное окно всем уровням (в конце теста).
+        """
+        now = time.time() if now is None else now
+        due = [level for level in self.levels if flush or level.due(now)]
+        if not due:
+            return
+        current = {}
+        for entry in list(stats.entries.values()) + [stats.total]:
+            if entry is stats.total:
+                name = TOTAL_NAME
+            elif entry.name.startswith(f"{entry.method} "):
+                name = entry.name
+            else:
+                name = f"{entry.method} {entry.name}"
+            current[name] = (entry.num_requests, entry.num_failures, entry.total_response_time, dict(entry.response_times))
+        for level in due:
+            level.add(now, users, current)
+
+    def points(self, name=TOTAL_NAME):
+        """Точки endpoint по всей длительности: старое из грубых уровней, недавнее из подробных."""
+        result = []
+        until = None
+        for level in self.levels:
+            ring = level.series.get(name)
+            if ring is None or not ring.count:
+                continue
+            for row in ring.rows():
+                if until is None or row["time"] < until:
+                    row["resolution"] = level.resolution
+                    result.append(row)
+            until = ring.first_time()
+        result.sort(key=lambda row: row["time"])
+        return result
+
+    def render_history(self):
+        """Список в формате stats.history Locust для HTML-отчета и графиков web UI."""
+        history = []
+        for row in self.points():
+            timestamp = format_utc_timestamp(row["time"])
+            span = row["resolution"]
+            point = {
+                f"response_time_percentile_{percentile}": [timestamp, _percentile_column(row, percentile)]
+                for percentile in PERCENTILES_TO_CHART
+            }
+            point.update({
+                "current_rps": [timestamp, round(row["requests"] / span, 2)],
+                "current_fail_per_sec": [timestamp, round(row["failures"] / span, 2)],
+                "total_avg_response_time": [timestamp, round(row["rt_sum"] / row["requests"], 2) if row["requests"] else 0],
+                "user_count": [timestamp, row["users"]],
+                "time": timestamp,
+            })
+            history.append(point)
+        return history
+
+    def save(self, path):
+        """Двоичный файл: MAGIC, длина и JSON-заголовок, затем колонки каждого ряда (little-endian)."""
+        series = []
+        chunks = []
+        for level in self.levels:
+            for name, ring in sorted(level.series.items()):
+                series.append({"level": level.resolution, "name": name, "count": ring.count})
+                for column, _ in COLUMNS:
+                    data = ring.column(column)
+                    if sys.byteorder != "little":
+                        data.byteswap()
+                    chunks.append(data.tobytes())
+        header = json.dumps({
+            "columns": [[name, code, array(code).itemsize] for name, code in COLUMNS],
+            "levels": [[level.resolution, level.capacity] for level in self.levels],
+            "series": series,
+        }, ensure_ascii=False).encode()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+
+
+def _percentile_column(row, percentile):
+    column = f"p{percentile * 100:g}"
+    return row[column] if column in row else row["p95"]
+
+
+def load(path):
+    """{(уровень, имя): {колонка: array}} из файла save()."""
+    with open(path, "rb") as f:
+        magic, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл истории нагрузки")
+        header = json.loads(f.read(length))
+        result = {}
+        for item in header["series"]:
+            columns = {}
+            for name, code, size in header["columns"]:
+                data = array(code)
+                data.frombytes(f.read(size * item["count"]))
+                if sys.byteorder != "little":
+                    data.byteswap()
+                columns[name] = data
+            result[(item["level"], item["name"])] = columns
+    return result
+
+
+def _rows(columns):
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def show(path):
+    for (level, name), columns in load(path).items():
+        times = columns["time"]
+        if not times:
+            continue
+        requests = sum(columns["requests"])
+        print(
+            f"{level:>5} с {name}: точек {len(times)}, "
+            f"{format_utc_timestamp(times[0])} - {format_utc_timestamp(times[-1])}, "
+            f"запросов {requests}, ошибок {sum(columns['failures'])}, "
+            f"p95 max {max(columns['p95']):.0f} мс"
+        )
+
+
+def export_csv(path, level, output):
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name"] + [name for name, _ in COLUMNS])
+        for (resolution, name), columns in load(path).items():
+            if resolution != level:
+                continue
+            for row in _rows(columns):
+                writer.writerow([name] + [row[column] for column, _ in COLUMNS])
+
+
+class HistorySampler:
+    """Гринлет, раз в секунду пополняющий LoadHistory и подменяющий stats.history."""
+
+    def __init__(self, environment, path=None, history=None):
+        self.environment = environment
+        self.path = path
+        self.history = history or LoadHistory()
+        self._samples = 0
+        self._greenlet = None
+
+    def sample(self, final=False):
+        runner = self.environment.runner
+        self.history.sample(self.environment.stats, runner.user_count if runner is not None else 0, flush=final)
+        # Перерисовка раз в окно второго уровня: между ними stats.history
+        # дополняет сам Locust, а это всего несколько точек.
+        self._samples += 1
+        if final or self._samples % RENDER_EVERY == 0:
+            self.environment.stats.history[:] = self.history.render_history()
+
+    def _run(self):
+        interval = self.history.levels[0].resolution
+        while True:
+            gevent.sleep(interval)
+            self.sample()
+
+    def start(self):
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=True)
+            self._greenlet = None
+            self.sample(final=True)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--history-file", default=HISTORY_FILE, env_var="OPENBMC_HISTORY_FILE",
+        help="Двоичный файл истории по интервалам; включает историю с ограниченной памятью",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    if isinstance(runner, WorkerRunner):
+        return
+    path = getattr(environment.parsed_options, "history_file", None) or HISTORY_FILE
+    if path:
+        environment.load_history = HistorySampler(environment, path)
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    sampler = getattr(environment, "load_history", None)
+    if sampler is not None:
+        sampler.start()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    sampler = getattr(environment, "load_history", None)
+    if sampler is not None:
+        sampler.stop()
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    sampler = getattr(environment, "load_history", None)
+    if sampler is not None:
+        sampler.history.save(sampler.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="История нагрузочного теста OpenBMC")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show_parser = sub.add_parser("show", help="ряды и их диапазоны")
+    show_parser.add_argument("file")
+    csv_parser = sub.add_parser("csv", help="выгрузить один уровень в CSV")
+    csv_parser.add_argument("file")
+    csv_parser.add_argument("--level", type=int, default=LEVELS[0][0], help="разрешение, с")
+    csv_parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        show(args.file)
+    else:
+        export_csv(args.file, args.level, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
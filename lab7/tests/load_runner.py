@@ -0,0 +1,125 @@
+"""Запуск Locust внутри текущего процесса через Environment/LocalRunner.
+
+locust импортируется первым: он делает gevent monkey patching, которое
+должно произойти раньше импорта requests/urllib3/ssl.
+"""
+
+from locust import events
+from locust.env import Environment
+import gevent
+import sys
+
+import load_workers
+
+LOAD_SUITE = "load"
+
+
+def endpoint_name(entry):
+    return f"{entry.method} {entry.name}" if entry.method not in entry.name else entry.name
+
+
+def report_stats(environment, reporter, suite=LOAD_SUITE):
+    """Записывает статистику каждого endpoint отдельным testcase."""
+    for entry in sorted(environment.stats.entries.values(), key=lambda e: (e.name, e.method)):
+        message = (
+            f"requests={entry.num_requests} failures={entry.num_failures} "
+            f"avg={entry.avg_response_time:.1f}ms "
+            f"p50={entry.get_response_time_percentile(0.5):.0f}ms "
+            f"p95={entry.get_response_time_percentile(0.95):.0f}ms "
+            f"p99={entry.get_response_time_percentile(0.99):.0f}ms "
+            f"max={entry.max_response_time or 0:.0f}ms "
+            f"rps={entry.total_rps:.2f}"
+        )
+        status = 'failed' if entry.num_failures else 'passed'
+        reporter.add_test_result(
+            suite, endpoint_name(entry), status, message,
+            entry.total_response_time / 1000
+        )
+
+    for error in environment.stats.errors.values():
+        reporter.add_test_result(
+            suite, f"{error.method} {error.name} error", 'failed',
+            f"{error.occurrences} x {error.error}", 0
+        )
+
+
+def run_load(user_classes, host, users=5, spawn_rate=1, run_time=30, workers=0, shape_class=None):
+    """Выполняет нагрузку и возвращает Environment с собранной статистикой.
+
+    workers > 0 запускает столько локальных worker-процессов под master,
+    -1 - по одному на ядро; статистика собирается на master. С shape_class
+    число пользователей задает LoadTestShape, а users и spawn_rate не
+    используются; тест заканчивается, когда tick() вернет None, но не
+    позже run_time.
+    """
+    shape = None
+    if shape_class is not None:
+        shape = shape_class()
+        shape.run_time = run_time
+    environment = Environment(user_classes=user_classes, host=host, events=events, shape_class=shape)
+    workers = load_workers.worker_count(workers)
+    processes = []
+
+    if workers:
+        port = load_workers.free_port()
+        runner = environment.create_master_runner("127.0.0.1", port)
+        environment.events.init.fire(environment=environment, runner=runner, web_ui=None)
+        locustfile = sys.modules[user_classes[0].__module__].__file__
+        processes = load_workers.spawn_workers(locustfile, workers, port)
+    else:
+        runner = environment.create_local_runner()
+        environment.events.init.fire(environment=environment, runner=runner, web_ui=None)
+
+    error = None
+    try:
+        if workers:
+            load_workers.wait_for_workers(runner, workers)
+        if shape is not None:
+            runner.start_shape()
+            gevent.wait([runner.shape_greenlet], timeout=run_time)
+        else:
+            runner.start(users, spawn_rate=spawn_rate)
+            gevent.sleep(run_time)
+    except Exception as e:
+        error = e
+    finally:
+        runner.quit()
+        environment.events.quitting.fire(environment=environment, reverse=True)
+        environment.worker_exits = load_workers.stop_workers(processes)
+    if error is not None:
+        logs = "\n".join(load_workers.format_exit(worker_exit) for worker_exit in environment.worker_exits)
+        if logs:
+            raise RuntimeError(f"{error}\n{logs}") from error
+        raise error
+    return environment
+
+
+def report_cpu(environment, reporter, suite=LOAD_SUITE):
+    monitor = getattr(environment, "cpu_monitor", None)
+    if monitor is None:
+        return
+    for node, usage in monitor.summary().items():
+        overloaded = usage["max"] > monitor.threshold
+        message = f"max={usage['max']:.0f}% avg={usage['avg']:.0f}% threshold={monitor.threshold:.0f}%"
+        if overloaded:
+            message += " - генератор нагрузки перегружен, латентность завышена"
+        reporter.add_test_result(suite, f"generator cpu {node}", 'passed', message, 0)
+
+
+def report_workers(environment, reporter, failed=False, suite=LOAD_SUITE):
+    """Сбойные worker-процессы с хвостом их лога; при неудачном прогоне - хвосты всех логов."""
+    for worker_exit in getattr(environment, "worker_exits", ()):
+        if load_workers.abnormal(worker_exit) or (failed and load_workers.log_tail(worker_exit["log"])):
+            status = 'failed' if load_workers.abnormal(worker_exit) else 'passed'
+            reporter.add_test_result(
+                suite, f"worker {worker_exit['worker']}", status, load_workers.format_exit(worker_exit), 0
+            )
+
+
+def load_passed(environment):
+    stats = environment.stats
+    return (
+        stats.total.num_requests > 0
+        and stats.total.num_failures == 0
+        and not environment.runner.exceptions
+    )
@@ -0,0 +1,85 @@
+"""Пользователи Locust для нагрузочного теста из run_load_test().
+
+Модуль можно передать и обычному locust через -f, в том числе
+worker-процессам. Сценарий один, а HTTP-клиент выбирается
+OPENBMC_HTTP_CLIENT: requests (OpenBMCLoadTest) или geventhttpclient
+(OpenBMCFastLoadTest); второй класс помечается abstract. Клиенты без
+задач (RedfishHttpUser, RedfishFastUser) используют и другие сценарии.
+"""
+
+from locust import HttpUser, User, task, between
+
+import bmc_farm
+import cassette
+import fast_http
+import hdr_histogram
+import phase_timing
+import response_checks
+import session_pool
+
+BASE_URL = bmc_farm.target_for(0)["url"]
+REDFISH_PATH = "/redfish/v1"
+TIMEOUT = 30
+
+
+class RedfishLoadTasks(User):
+    """Задачи нагрузочного теста; redfish_get() реализует класс клиента."""
+
+    abstract = True
+    wait_time = between(1, 3)
+    host = BASE_URL
+
+    @task(3)
+    def get_system_info(self):
+        self.redfish_get(f"{REDFISH_PATH}/Systems/system", "GET /Systems/system", response_checks.SYSTEM)
+
+    @task(2)
+    def get_thermal_data(self):
+        self.redfish_get(
+            f"{REDFISH_PATH}/Chassis/chassis/ThermalSubSystem",
+            "GET /Chassis/chassis/ThermalSubSystem",
+            response_checks.THERMAL
+        )
+
+    @task(1)
+    def get_session_info(self):
+        self.redfish_get(f"{REDFISH_PATH}/SessionService", "GET /SessionService", response_checks.SESSION_SERVICE)
+
+
+class RedfishHttpUser(HttpUser):
+    """Клиент requests без задач: пул сессий, учет рукопожатий и фаз, кассета."""
+
+    abstract = True
+    host = BASE_URL
+
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        self.client.verify = False
+        self.client.auth = session_pool.auth_for(self)
+        fast_http.count_handshakes(self.client)
+        phase_timing.install(self.client)
+        cassette.install(self.client)
+
+    def redfish_get(self, path, name, check):
+        session_pool.before_request(self.client)
+        with self.client.get(path, name=name, timeout=TIMEOUT, catch_response=True) as response:
+            return response_checks.validate(response, check)
+
+
+class RedfishFastUser(fast_http.FastRedfishUser):
+    """Клиент geventhttpclient без задач."""
+
+    abstract = True
+    host = BASE_URL
+
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        super().on_start()
+
+
+class OpenBMCLoadTest(RedfishLoadTasks, RedfishHttpUser):
+    abstract = fast_http.ENABLED
+
+
+class OpenBMCFastLoadTest(RedfishLoadTasks, RedfishFastUser):
+    abstract = not fast_http.ENABLED
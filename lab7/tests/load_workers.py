@@ -0,0 +1,204 @@
+"""Локальные worker-процессы Locust и контроль их загрузки CPU.
+
+Один gevent-процесс упирается в одно ядро, после чего генератор
+нагрузки сам завышает латентность. spawn_workers() поднимает по
+процессу на ядро под master на loopback, а CpuMonitor следит за
+CPU каждого worker (или единственного процесса) и предупреждает, когда
+он выше порога, то есть узким местом стал генератор, а не BMC.
+stderr каждого worker пишется в LOG_DIR/worker-N.log: читать pipe
+некому, а заполненный pipe остановил бы worker на первом же трейсбеке.
+"""
+
+import logging
+import os
+import socket
+import subprocess
+import sys
+
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+import gevent
+
+CPU_THRESHOLD = float(os.environ.get("OPENBMC_WORKER_CPU_THRESHOLD", 85))
+WORKER_CONNECT_TIMEOUT = 30
+LOG_DIR = os.environ.get("OPENBMC_WORKER_LOG_DIR", "/tmp/results")
+LOG_TAIL_LINES = 20
+LOG_TAIL_BYTES = 16384
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(workers):
+    """-1 означает по одному worker на ядро, 0 - без worker-процессов."""
+    if workers is None or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def free_port(host="127.0.0.1"):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def spawn_workers(locustfile, count, master_port, master_host="127.0.0.1", extra_args=(), log_dir=LOG_DIR):
+    """Запускает count worker; без log_dir их stderr идет в stderr текущего процесса."""
+    cmd = [
+        sys.executable, "-m", "locust",
+        "--worker",
+        "-f", locustfile,
+        "--master-host", master_host,
+        "--master-port", str(master_port),
+        *extra_args,
+    ]
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    processes = []
+    for index in range(count):
+        log_path = os.path.join(log_dir, f"worker-{index}.log") if log_dir else None
+        if log_path is None:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+        else:
+            with open(log_path, "wb") as log:
+                process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=log)
+        process.log_path = log_path
+        processes.append(process)
+    return processes
+
+
+def wait_for_workers(runner, count, timeout=WORKER_CONNECT_TIMEOUT):
+    waited = 0.0
+    while runner.worker_count < count:
+        if waited >= timeout:
+            raise RuntimeError(
+                f"Подключилось {runner.worker_count} из {count} worker-процессов за {timeout} с"
+            )
+        gevent.sleep(0.1)
+        waited += 0.1
+
+
+def stop_workers(processes, timeout=10):
+    """Дожидается worker (зависшие убивает); возвращает [{worker, returncode, killed, log}]."""
+    exits = []
+    for index, process in enumerate(processes):
+        killed = False
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            killed = True
+        exits.append({
+            "worker": index,
+            "returncode": process.returncode,
+            "killed": killed,
+            "log": getattr(process, "log_path", None),
+        })
+    return exits
+
+
+def abnormal(worker_exit):
+    # Код 1 Locust возвращает при ошибках запросов, это не сбой самого worker.
+    return worker_exit["killed"] or worker_exit["returncode"] not in (0, 1)
+
+
+def log_tail(path, lines=LOG_TAIL_LINES):
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        f.seek(max(0, os.fstat(f.fileno()).st_size - LOG_TAIL_BYTES))
+        data = f.read().decode("utf-8", "replace")
+    return "\n".join(data.splitlines()[-lines:])
+
+
+def format_exit(worker_exit):
+    if worker_exit["killed"]:
+        status = "не завершился и убит"
+    else:
+        status = f"код выхода {worker_exit['returncode']}"
+    tail = log_tail(worker_exit["log"])
+    return f"worker {worker_exit['worker']}: {status}" + (f", {worker_exit['log']}:\n{tail}" if tail else "")
+
+
+class CpuMonitor:
+    def __init__(self, environment, threshold=CPU_THRESHOLD, interval=1.0):
+        self.environment = environment
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = {}
+        self.overloaded = set()
+        self._greenlet = None
+
+    def current_usage(self):
+        runner = self.environment.runner
+        if isinstance(runner, MasterRunner):
+            return {f"worker {w.id}": w.cpu_usage for w in runner.clients.values()}
+        return {"local": runner.current_cpu_usage}
+
+    def sample(self):
+        for node, cpu in self.current_usage().items():
+            peak, total, count = self.samples.get(node, (0.0, 0.0, 0))
+            self.samples[node] = (max(peak, cpu), total + cpu, count + 1)
+            if cpu > self.threshold and node not in self.overloaded:
+                self.overloaded.add(node)
+                logger.warning(
+                    f"{node}: загрузка CPU {cpu:.0f}% выше порога {self.threshold:.0f}%, "
+                    f"результаты ограничены генератором нагрузки"
+                )
+
+    def _run(self):
+        while True:
+            gevent.sleep(self.interval)
+            self.sample()
+
+    def start(self):
+        self.samples.clear()
+        self.overloaded.clear()
+        if self._greenlet is None:
+            self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def summary(self):
+        return {
+            node: {"max": peak, "avg": total / count if count else 0.0}
+            for node, (peak, total, count) in sorted(self.samples.items())
+        }
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--worker-cpu-threshold", type=float, default=CPU_THRESHOLD,
+        env_var="OPENBMC_WORKER_CPU_THRESHOLD",
+        help="Порог загрузки CPU генератора нагрузки, %%, выше которого выводится предупреждение",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    if isinstance(runner, WorkerRunner):
+        return
+    options = environment.parsed_options
+    threshold = getattr(options, "worker_cpu_threshold", None) or CPU_THRESHOLD
+    environment.cpu_monitor = CpuMonitor(environment, threshold)
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    monitor = getattr(environment, "cpu_monitor", None)
+    if monitor is not None:
+        monitor.start()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    monitor = getattr(environment, "cpu_monitor", None)
+    if monitor is None:
+        return
+    monitor.stop()
+    for node, usage in monitor.summary().items():
+        print(f"CPU {node}: max {usage['max']:.0f}%, avg {usage['avg']:.0f}%")
@@ -1,65 +1,87 @@
-from locust import HttpUser, task, between
-import json
+from locust import HttpUser, User, task, between
 
+import bmc_farm
+import bmc_monitor
+import cassette
+import fast_http
+import hdr_histogram
+import load_history
+import load_workers
+import phase_timing
+import response_checks
+import sensor_telemetry
+import session_pool
+import slo
 
-OPENBMC_HOST = "https://localhost:2443"
-OPENBMC_AUTH = ("root", "0penBmc")
 
+OPENBMC_HOST = bmc_farm.target_for(0)["url"]
 
-class OpenBMCTest(HttpUser):
+
+class OpenBMCTasks(User):
+    abstract = True
     host = OPENBMC_HOST
     wait_time = between(1, 3)
-    disable_known_hosts = True
-
-    def on_start(self):
-        self.client.auth = OPENBMC_AUTH
-        self.client.verify = False
 
     @task(1)
     def get_system_info_and_power_state(self):
         """Запрос информации о системе и проверка состояния питания."""
-        response = self.client.get(
-            "/redfish/v1/Systems/system", name="GET /Systems/system"
+        self.redfish_get("/redfish/v1/Systems/system", "GET /Systems/system", response_checks.SYSTEM)
+
+    @task(1)
+    def get_thermal_data(self):
+        """Запрос датчиков температуры шасси."""
+        self.redfish_get(
+            "/redfish/v1/Chassis/chassis/ThermalSubSystem",
+            "GET /Chassis/chassis/ThermalSubSystem",
+            response_checks.THERMAL
         )
 
-        response.raise_for_status()
+    @task(1)
+    def get_session_info(self):
+        """Запрос сервиса сессий."""
+        self.redfish_get("/redfish/v1/SessionService", "GET /SessionService", response_checks.SESSION_SERVICE)
+
 
-        try:
-            system_info = response.json()
+class OpenBMCTest(OpenBMCTasks, HttpUser):
+    abstract = fast_http.ENABLED
+    disable_known_hosts = True
 
-            power_state = system_info.get("PowerState", "Unknown")
-            print(f"System info: {response.status_code}. Power state: {power_state}")
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        self.client.verify = False
+        self.client.auth = session_pool.auth_for(self)
+        fast_http.count_handshakes(self.client)
+        phase_timing.install(self.client)
+        cassette.install(self.client)
 
-            valid_power_states = ["On", "Off", "PoweringOn", "PoweringOff", "Unknown"]
+    def redfish_get(self, path, name, check):
+        session_pool.before_request(self.client)
+        with self.client.get(path, name=name, catch_response=True) as response:
+            return response_checks.validate(response, check)
 
-            if power_state not in valid_power_states:
 
-                raise Exception(
-                    f"Получено недопустимое состояние питания: {power_state}"
-                )
+class OpenBMCFastTest(OpenBMCTasks, fast_http.FastRedfishUser):
+    """OpenBMCTest на geventhttpclient, включается OPENBMC_HTTP_CLIENT=fast."""
 
-        except json.JSONDecodeError:
+    abstract = not fast_http.ENABLED
 
-            raise Exception("Ошибка декодирования JSON в ответе OpenBMC.")
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        super().on_start()
 
 
 class WeatherTest(HttpUser):
     host = "https://wttr.in"
     wait_time = between(1, 3)
 
+    def on_start(self):
+        phase_timing.install(self.client)
+        cassette.install(self.client)
+
     @task(1)
     def get_novosibirsk_weather(self):
-        response = self.client.get("/Novosibirsk?format=j1", name="GET /Novosibirsk")
-
-        response.raise_for_status()
-
-        try:
-            weather_data = response.json()
-            current_temp = weather_data["current_condition"][0]["temp_C"]
-            print(f"Weather: {response.status_code}. Temp: {current_temp}°C")
-        except (KeyError, json.JSONDecodeError) as e:
-
-            raise Exception(f"Ошибка парсинга или структуры ответа wttr.in: {e}")
+        with self.client.get("/Novosibirsk?format=j1", name="GET /Novosibirsk", catch_response=True) as response:
+            response_checks.validate(response, response_checks.WEATHER)
 
 
 class MyLoadTest(OpenBMCTest, WeatherTest):
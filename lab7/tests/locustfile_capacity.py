@@ -0,0 +1,30 @@
+"""Поиск максимальной устойчивой пропускной способности OpenBMC.
+
+Сценарий OpenBMCLoadTest без пауз между запросами, так что число
+пользователей равно числу одновременных запросов; уровни задает
+CapacitySearchShape (см. capacity.py). HTTP-клиент, как и в load_users,
+выбирается OPENBMC_HTTP_CLIENT.
+
+    locust -f lab7/tests/locustfile_capacity.py --headless --run-time 20m \
+           --capacity-file results/capacity.json
+"""
+
+from locust import constant
+
+import load_users
+import capacity
+import fast_http
+
+
+class OpenBMCCapacityTest(load_users.OpenBMCLoadTest):
+    abstract = fast_http.ENABLED
+    wait_time = constant(0)
+
+
+class OpenBMCFastCapacityTest(load_users.OpenBMCFastLoadTest):
+    abstract = not fast_http.ENABLED
+    wait_time = constant(0)
+
+
+class OpenBMCCapacityShape(capacity.CapacitySearchShape):
+    pass
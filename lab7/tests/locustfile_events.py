@@ -0,0 +1,16 @@
+"""EventService-сценарий: подписчики событий рядом с опрашивающими пользователями.
+
+    locust -f lab7/tests/locustfile_events.py --headless -u 40 -r 10 -t 2m \
+           --event-mode sse --event-trigger-interval 5
+
+Половина пользователей опрашивает Redfish как OpenBMCLoadTest, половина
+ждет те же изменения событиями; в конце печатается, сколько запросов к
+BMC уходит на одно изменение при опросе и при подписке.
+"""
+
+from load_users import BASE_URL, OpenBMCFastLoadTest, OpenBMCLoadTest
+import event_service
+
+
+class OpenBMCEventSubscriber(event_service.EventSubscriberUser):
+    host = BASE_URL
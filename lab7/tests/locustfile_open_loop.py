@@ -0,0 +1,49 @@
+"""Open-loop сценарий OpenBMC: постоянная частота запросов к каждому endpoint.
+
+    locust -f lab7/tests/locustfile_open_loop.py --headless --run-time 2m \
+           --arrival-users 20 --arrival-rate 12
+
+Частоты по умолчанию повторяют веса задач OpenBMCLoadTest (3:2:1).
+"""
+
+from load_users import BASE_URL, REDFISH_PATH
+import open_loop
+
+import bmc_farm
+import cassette
+import phase_timing
+import response_checks
+import session_pool
+
+
+class OpenBMCOpenLoopTest(open_loop.OpenLoopUser):
+    host = BASE_URL
+    endpoints = [
+        ("GET /Systems/system", "GET", f"{REDFISH_PATH}/Systems/system", 3.0),
+        ("GET /Chassis/chassis/ThermalSubSystem", "GET", f"{REDFISH_PATH}/Chassis/chassis/ThermalSubSystem", 2.0),
+        ("GET /SessionService", "GET", f"{REDFISH_PATH}/SessionService", 1.0),
+    ]
+    checks = {
+        "GET /Systems/system": response_checks.SYSTEM,
+        "GET /Chassis/chassis/ThermalSubSystem": response_checks.THERMAL,
+        "GET /SessionService": response_checks.SESSION_SERVICE,
+    }
+
+    def on_start(self):
+        bmc_farm.assign_target(self)
+        self.client.verify = False
+        self.client.auth = session_pool.auth_for(self)
+        phase_timing.install(self.client)
+        cassette.install(self.client)
+        super().on_start()
+
+    def send(self, name, method, path, scheduled):
+        session_pool.before_request(self.client)
+        return super().send(name, method, path, scheduled)
+
+    def check_response(self, name, response):
+        response_checks.validate(response, self.checks[name])
+
+
+class OpenBMCArrivalShape(open_loop.ConstantArrivalShape):
+    pass
@@ -0,0 +1,38 @@
+"""Нагрузка по всему дереву Redfish OpenBMC.
+
+Каждый запрос идет к случайному ресурсу из общего индекса
+redfish_crawler.UrlIndex, который строится обходом /redfish/v1 в
+начале прогона. В конце теста печатается таблица латентности по
+каждому ресурсу. HTTP-клиент, как и в load_users, выбирается
+OPENBMC_HTTP_CLIENT.
+
+    locust -f lab7/tests/locustfile_tree.py --headless -u 20 -r 5 --run-time 5m \
+           --tree-index results/redfish_index.json --tree-weights /Managers=2
+"""
+
+from locust import User, between, task
+
+from load_users import BASE_URL, RedfishFastUser, RedfishHttpUser
+import fast_http
+import redfish_crawler
+import response_checks
+
+
+class RedfishTreeTasks(User):
+    abstract = True
+    wait_time = between(1, 3)
+    host = BASE_URL
+    tree_index = True
+
+    @task
+    def get_tree_resource(self):
+        path, name = redfish_crawler.shared_index(self.environment).choose()
+        self.redfish_get(path, name, response_checks.RESOURCE)
+
+
+class OpenBMCTreeTest(RedfishTreeTasks, RedfishHttpUser):
+    abstract = fast_http.ENABLED
+
+
+class OpenBMCFastTreeTest(RedfishTreeTasks, RedfishFastUser):
+    abstract = not fast_http.ENABLED
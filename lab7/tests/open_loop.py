@@ -0,0 +1,197 @@
+"""Нагрузка с постоянной интенсивностью запросов (open-loop).
+
+С wait_time = between(1, 3) пользователь отправляет следующий запрос
+только после ответа на предыдущий, поэтому при замедлении bmcweb падает
+и подаваемая нагрузка, а очередь, которую увидели бы реальные клиенты,
+в латентности не попадает. OpenLoopUser отправляет запросы каждого
+endpoint по расписанию с заданной частотой независимо от времени ответа:
+
+    class RedfishOpenLoop(OpenLoopUser):
+        endpoints = [("GET /Systems/system", "GET", "/redfish/v1/Systems/system", 3.0)]
+
+Время ответа считается от запланированного момента отправки, а не от
+фактического (поправка на coordinated omission). Если пользователь
+отстал от расписания больше чем на интервал, отправка считается
+пропущенной: значит, генератору не хватило пользователей или CPU.
+ConstantArrivalShape держит --arrival-users пользователей до конца
+--run-time.
+"""
+
+from locust import HttpUser, LoadTestShape, constant, events, task
+from locust.runners import WorkerRunner
+import gevent
+import heapq
+import os
+import random
+import time
+
+ARRIVAL_RATE = float(os.environ.get("OPENBMC_ARRIVAL_RATE", 0))
+ARRIVAL_USERS = int(os.environ.get("OPENBMC_ARRIVAL_USERS", 20))
+TIMEOUT = 30
+OPEN_LOOP_SUITE = "load"
+
+_environment = None
+
+
+class ScheduleStats:
+    """Счетчики расписания по endpoint: отправлено, пропущено, максимальное отставание."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def record(self, name, lag, missed):
+        sent, total_missed, max_lag = self.entries.get(name, (0, 0, 0.0))
+        self.entries[name] = (sent + 1, total_missed + int(missed), max(max_lag, lag))
+
+    def merge(self, entries):
+        for name, (sent, missed, max_lag) in entries.items():
+            own_sent, own_missed, own_lag = self.entries.get(name, (0, 0, 0.0))
+            self.entries[name] = (own_sent + sent, own_missed + missed, max(own_lag, max_lag))
+
+    def reset(self):
+        entries, self.entries = self.entries, {}
+        return entries
+
+    def summary(self):
+        return {
+            name: {"sent": sent, "missed": missed, "max_lag_ms": max_lag * 1000}
+            for name, (sent, missed, max_lag) in sorted(self.entries.items())
+        }
+
+
+def _options(environment):
+    options = environment.parsed_options
+    rate = getattr(options, "arrival_rate", None)
+    users = getattr(options, "arrival_users", None) or ARRIVAL_USERS
+    return (ARRIVAL_RATE if rate is None else rate), users
+
+
+class OpenLoopUser(HttpUser):
+    """Пользователь, отправляющий endpoints по расписанию.
+
+    endpoints - список (name, method, path, rps), где rps - частота
+    endpoint на все --arrival-users пользователей. Ненулевой
+    --arrival-rate задает общую частоту, которая делится между
+    endpoint пропорционально rps.
+    """
+
+    abstract = True
+    wait_time = constant(0)
+    endpoints = []
+
+    def on_start(self):
+        rate, users = _options(self.environment)
+        total = sum(rps for _, _, _, rps in self.endpoints)
+        scale = rate / total if rate and total else 1.0
+
+        now = time.perf_counter()
+        self._intervals = []
+        self._schedule = []
+        for i, (_, _, _, rps) in enumerate(self.endpoints):
+            interval = users / (rps * scale)
+            self._intervals.append(interval)
+            self._schedule.append((now + random.uniform(0, interval), i))
+        heapq.heapify(self._schedule)
+
+    @task
+    def send_next(self):
+        scheduled, i = heapq.heappop(self._schedule)
+        interval = self._intervals[i]
+        heapq.heappush(self._schedule, (scheduled + interval, i))
+
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            gevent.sleep(delay)
+        name, method, path, _ = self.endpoints[i]
+        lag = max(0.0, time.perf_counter() - scheduled)
+        self.environment.open_loop.record(name, lag, lag > interval)
+        self.send(name, method, path, scheduled)
+
+    def send(self, name, method, path, scheduled):
+        """Запрос, время ответа которого записывается от scheduled."""
+        with self.client.request(method, path, name=name, timeout=TIMEOUT, catch_response=True) as response:
+            finished = time.perf_counter()
+            meta = response.request_meta
+            meta["context"] = dict(meta["context"], service_time=meta["response_time"])
+            meta["response_time"] = (finished - scheduled) * 1000
+            self.check_response(name, response)
+        return response
+
+    def check_response(self, name, response):
+        """Переопределяется для проверки тела; response - из with-блока catch_response."""
+
+
+class ConstantArrivalShape(LoadTestShape):
+    """--arrival-users пользователей сразу и до конца --run-time."""
+
+    use_common_options = True
+    run_time = None
+
+    def tick(self):
+        options = self.runner.environment.parsed_options
+        run_time = getattr(options, "run_time", None) or self.run_time
+        if run_time and self.get_run_time() > run_time:
+            return None
+        _, users = _options(self.runner.environment)
+        return users, users
+
+
+def report(environment, reporter, suite=OPEN_LOOP_SUITE):
+    stats = getattr(environment, "open_loop", None)
+    if stats is None:
+        return
+    for name, entry in stats.summary().items():
+        message = (
+            f"sent={entry['sent']} missed={entry['missed']} "
+            f"max_lag={entry['max_lag_ms']:.0f}ms"
+        )
+        status = 'failed' if entry['missed'] else 'passed'
+        reporter.add_test_result(suite, f"schedule {name}", status, message, 0)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--arrival-rate", type=float, default=ARRIVAL_RATE, env_var="OPENBMC_ARRIVAL_RATE",
+        help="Общая частота запросов open-loop пользователей, запросов/с (0 - из endpoints)",
+    )
+    parser.add_argument(
+        "--arrival-users", type=int, default=ARRIVAL_USERS, env_var="OPENBMC_ARRIVAL_USERS",
+        help="Число open-loop пользователей, между которыми делится расписание",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    global _environment
+    _environment = environment
+    environment.open_loop = ScheduleStats()
+
+
+@events.report_to_master.add_listener
+def _on_report_to_master(client_id, data, **kwargs):
+    if _environment is not None:
+        data["open_loop"] = _environment.open_loop.reset()
+
+
+@events.worker_report.add_listener
+def _on_worker_report(client_id, data, **kwargs):
+    if _environment is not None:
+        _environment.open_loop.merge(data.get("open_loop", {}))
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    environment.open_loop.reset()
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    for name, entry in environment.open_loop.summary().items():
+        if entry["missed"]:
+            print(
+                f"Open-loop {name}: пропущено {entry['missed']} из {entry['sent']} отправок по расписанию, "
+                f"отставание до {entry['max_lag_ms']:.0f} мс"
+            )
@@ -0,0 +1,411 @@
+"""Разбивка времени запроса на фазы DNS/connect/TLS/send/TTFB/download.
+
+Locust видит только полное время запроса, и по росту GET /Systems/system
+не понять, что замедлилось: установка TCP, TLS, обработка в bmcweb или
+передача тела. TimedAdapter подключается к requests.Session (HttpSession
+пользователей Locust и api_session в pytest) и через свой класс
+соединения urllib3 засекает фазы:
+
+    dns       разрешение имени
+    connect   установка TCP
+    tls       TLS-рукопожатие
+    send      отправка запроса
+    ttfb      от отправки до заголовков ответа (время bmcweb)
+    download  чтение тела
+
+Фазы установки соединения есть только у запросов, открывших новое
+соединение. Каждая фаза пишется в HDR-гистограмму своего endpoint,
+worker-процессы передают их master, в конце печатается таблица p50/p95.
+С --trace-file доля --trace-sample запросов записывается спанами в
+формате OTLP/JSON (строка на пакет, как у file exporter OpenTelemetry
+Collector): спан запроса и дочерние спаны фаз. worker-процессы пишут
+каждый в <путь>.<worker>.
+
+    locust -f lab7/tests/locustfile.py --headless --trace-file results/traces.jsonl --trace-sample 0.05
+"""
+
+from locust import events
+from locust.clients import LocustHttpAdapter
+from locust.runners import WorkerRunner
+import json
+import os
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from hdr_histogram import LatencyRecorder
+
+PHASE_TIMING = os.environ.get("OPENBMC_PHASE_TIMING", "1") != "0"
+TRACE_FILE = os.environ.get("OPENBMC_TRACE_FILE")
+TRACE_SAMPLE = float(os.environ.get("OPENBMC_TRACE_SAMPLE", 0.01))
+PHASES = ("dns", "connect", "tls", "send", "ttfb", "download")
+SERVICE_NAME = "openbmc-tests"
+SCOPE_NAME = "openbmc.phase_timing"
+TRACE_BATCH = 512
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+PHASE_SUITE = "load"
+
+
+class _TimedConnectionMixin:
+    """Засекает фазы установки соединения и запроса; результат в self.phase_timings."""
+
+    phase_timings = None
+    _pending = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            address = host
+        resolved = time.perf_counter()
+        self._dns_host = address
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        self._pending = {"dns": resolved - started, "connect": time.perf_counter() - resolved}
+        self._connect_started = started
+        return sock
+
+    def connect(self):
+        super().connect()
+        if self._pending is not None and "tls" not in self._pending and isinstance(self, HTTPSConnection):
+            elapsed = time.perf_counter() - self._connect_started
+            self._pending["tls"] = elapsed - self._pending["dns"] - self._pending["connect"]
+
+    def request(self, *args, **kwargs):
+        self.phase_timings = self._pending or {}
+        self._pending = None
+        started = time.perf_counter()
+        super().request(*args, **kwargs)
+        self._sent = time.perf_counter()
+        self.phase_timings["send"] = self._sent - started
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        if self.phase_timings is not None:
+            self.phase_timings["ttfb"] = time.perf_counter() - self._sent
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(LocustHttpAdapter):
+    """Адаптер requests, добавляющий к ответу phase_timings (мс) и phase_started (нс)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        started_ns = time.time_ns()
+        response = super().send(request, stream=stream, **kwargs)
+        connection = getattr(response.raw, "connection", None)
+        timings = dict(getattr(connection, "phase_timings", None) or {})
+        if not stream:
+            started = time.perf_counter()
+            response.content
+            timings["download"] = time.perf_counter() - started
+        response.phase_timings = {phase: seconds * 1000 for phase, seconds in timings.items()}
+        response.phase_started = started_ns
+        return response
+
+
+class PhaseRecorder:
+    """LatencyRecorder на каждую фазу; ключ гистограммы - имя endpoint."""
+
+    def __init__(self):
+        self.phases = {phase: LatencyRecorder() for phase in PHASES}
+
+    def record(self, name, timings):
+        for phase, elapsed in timings.items():
+            recorder = self.phases.get(phase)
+            if recorder is not None:
+                recorder.record(name, elapsed)
+
+    def drain(self):
+        return {phase: recorder.drain() for phase, recorder in self.phases.items()}
+
+    def merge(self, data):
+        for phase, encoded in data.items():
+            if phase in self.phases:
+                self.phases[phase].merge(encoded)
+
+    def names(self):
+        return sorted({name for recorder in self.phases.values() for name in recorder.histograms})
+
+    def summary(self):
+        """{endpoint: {phase: {count, p50, p95}}} в миллисекундах."""
+        rows = {}
+        for name in self.names():
+            row = {}
+            for phase, recorder in self.phases.items():
+                histogram = recorder.histograms.get(name)
+                if histogram is not None and histogram.total_count:
+                    row[phase] = {
+                        "count": histogram.total_count,
+                        "p50": histogram.percentile(50) / 1000,
+                        "p95": histogram.percentile(95) / 1000,
+                    }
+            rows[name] = row
+        return rows
+
+
+def format_summary(summary):
+    width = max([len(name) for name in summary] + [8])
+    lines = [f"{'Name':<{width}} " + " ".join(f"{phase:>15}" for phase in PHASES)]
+    for name, row in summary.items():
+        cells = []
+        for phase in PHASES:
+            entry = row.get(phase)
+            cells.append(f"{entry['p50']:>7.1f}/{entry['p95']:<7.1f}" if entry else f"{'-':>15}")
+        lines.append(f"{name:<{width}} " + " ".join(cells))
+    return "Фазы запросов, p50/p95 мс:\n" + "\n".join(lines)
+
+
+def report(reporter, recorder=None, suite=PHASE_SUITE):
+    summary = (recorder or _state.recorder).summary()
+    for name, row in summary.items():
+        message = " ".join(
+            f"{phase}={entry['p50']:.1f}/{entry['p95']:.1f}ms(n={entry['count']})"
+            for phase, entry in row.items()
+        )
+        reporter.add_test_result(suite, f"phases {name}", 'passed', message, 0)
+
+
+class TraceWriter:
+    """Спаны OTLP/JSON пакетами: одна строка ExportTraceServiceRequest на пакет."""
+
+    def __init__(self, path, service=SERVICE_NAME):
+        self.path = path
+        self.service = service
+        self.spans = []
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def add(self, name, method, url, status, started_ns, timings, error=None):
+        trace_id = random.getrandbits(128).to_bytes(16, "big").hex()
+        root_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        total_ns = int(sum(timings.values()) * 1000000)
+        parts = urlsplit(url)
+        attributes = [
+            _attribute("http.request.method", method),
+            _attribute("url.full", url),
+            _attribute("server.address", parts.hostname or ""),
+        ]
+        if parts.port:
+            attributes.append(_attribute("server.port", parts.port))
+        if status:
+            attributes.append(_attribute("http.response.status_code", status))
+        spans = [_span(
+            trace_id, root_id, "", name, started_ns, started_ns + total_ns, attributes,
+            STATUS_ERROR if error or (status or 0) >= 400 else STATUS_OK, error
+        )]
+        offset = started_ns
+        for phase in PHASES:
+            if phase not in timings:
+                continue
+            duration = int(timings[phase] * 1000000)
+            spans.append(_span(
+                trace_id, random.getrandbits(64).to_bytes(8, "big").hex(), root_id,
+                phase, offset, offset + duration, [_attribute("openbmc.phase", phase)], STATUS_OK
+            ))
+            offset += duration
+        with self._lock:
+            self.spans.extend(spans)
+            full = len(self.spans) >= TRACE_BATCH
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        batch = {"resourceSpans": [{
+            "resource": {"attributes": [
+                _attribute("service.name", self.service),
+                _attribute("host.name", socket.gethostname()),
+                _attribute("process.pid", os.getpid()),
+            ]},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": spans}],
+        }]}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(batch, separators=(",", ":")) + "\n")
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _span(trace_id, span_id, parent_id, name, start_ns, end_ns, attributes, status, error=None):
+    kind = SPAN_KIND_INTERNAL if parent_id else SPAN_KIND_CLIENT
+    span = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentSpanId": parent_id,
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": attributes,
+        "status": {"code": status},
+    }
+    if error:
+        span["status"]["message"] = str(error)
+    return span
+
+
+class _State:
+    def __init__(self, enabled=PHASE_TIMING, trace_file=TRACE_FILE, sample=TRACE_SAMPLE, worker=None):
+        self.enabled = enabled
+        self.recorder = PhaseRecorder()
+        self.sample = sample
+        self.tracer = None
+        if enabled and trace_file:
+            self.tracer = TraceWriter(f"{trace_file}.{worker}" if worker else trace_file)
+
+
+_state = _State(worker=os.environ.get("PYTEST_XDIST_WORKER"))
+
+
+def install(session):
+    """Подключает TimedAdapter к requests.Session; уже подключенный не заменяется."""
+    if not _state.enabled:
+        return None
+    for prefix in ("https://", "http://"):
+        if not isinstance(session.get_adapter(prefix), TimedAdapter):
+            session.mount(prefix, TimedAdapter())
+    return session.get_adapter("https://")
+
+
+def record(name, response, exception=None, recorder=None):
+    """Записывает фазы ответа, прошедшего через TimedAdapter, и при выборке - спаны."""
+    timings = getattr(response, "phase_timings", None)
+    if not _state.enabled or not timings:
+        return
+    (recorder or _state.recorder).record(name, timings)
+    tracer = _state.tracer
+    if tracer is not None and _state.sample > 0 and random.random() < _state.sample:
+        request = response.request
+        tracer.add(name, request.method, request.url, response.status_code,
+                   response.phase_started, timings, exception)
+
+
+def response_hook(recorder):
+    """Hook requests.Session (hooks["response"]) для кода без Locust: имя - метод и путь."""
+    def hook(response, *args, **kwargs):
+        path = urlsplit(response.request.url).path
+        record(f"{response.request.method} {path}", response, recorder=recorder)
+        return response
+    return hook
+
+
+def flush():
+    if _state.tracer is not None:
+        _state.tracer.flush()
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--phase-timing", type=int, default=int(PHASE_TIMING), choices=(0, 1), env_var="OPENBMC_PHASE_TIMING",
+        help="Засекать фазы DNS/connect/TLS/send/TTFB/download (1) или нет (0)",
+    )
+    parser.add_argument(
+        "--trace-file", default=TRACE_FILE, env_var="OPENBMC_TRACE_FILE",
+        help="Файл для спанов запросов в формате OTLP/JSON",
+    )
+    parser.add_argument(
+        "--trace-sample", type=float, default=TRACE_SAMPLE, env_var="OPENBMC_TRACE_SAMPLE",
+        help="Доля запросов, записываемых в --trace-file (0-1)",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    global _state
+    flush()
+    options = environment.parsed_options
+    enabled = getattr(options, "phase_timing", None)
+    sample = getattr(options, "trace_sample", None)
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if isinstance(runner, WorkerRunner):
+        worker = f"worker{runner.worker_index}"
+    _state = _State(
+        PHASE_TIMING if enabled is None else bool(enabled),
+        getattr(options, "trace_file", None) or TRACE_FILE,
+        TRACE_SAMPLE if sample is None else sample,
+        worker,
+    )
+
+
+@events.request.add_listener
+def _on_request(request_type, name, response=None, exception=None, **kwargs):
+    if response is not None:
+        record(name if name.startswith(f"{request_type} ") else f"{request_type} {name}", response, exception)
+
+
+@events.report_to_master.add_listener
+def _on_report_to_master(client_id, data, **kwargs):
+    if _state.enabled:
+        data["phases"] = _state.recorder.drain()
+
+
+@events.worker_report.add_listener
+def _on_worker_report(client_id, data, **kwargs):
+    if data.get("phases"):
+        _state.recorder.merge(data["phases"])
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    _state.recorder = PhaseRecorder()
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    flush()
+    if isinstance(environment.runner, WorkerRunner) or not _state.enabled:
+        return
+    summary = _state.recorder.summary()
+    if summary:
+        print(format_summary(summary))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Латентность Reset -> PowerState с адаптивным опросом.
+
+PowerTransitionTracker отправляет #ComputerSystem.Reset и следит за
+PowerState на Systems/system (и за задачей, если BMC ответил 202 с
+Location на TaskService), пока система не придет в целевое состояние.
+Время в каждом состоянии (On -> PoweringOff -> Off -> PoweringOn -> On)
+и общая латентность записываются в Transition.
+
+Опрос не идет с фиксированным интервалом: пока состояние не меняется,
+интервал растет от --min-interval до --max-interval, а когда по прошлым
+переходам того же ResetType ожидается смена состояния, опрос снова
+учащается до --min-interval. Перезагрузку, прошедшую между опросами,
+видно по изменившемуся LastResetTime.
+
+Бенчмарк повторяет перезагрузки и печатает распределение латентности:
+
+    python lab7/tests/power_tracker.py --url https://localhost:2443 --reset ForceRestart --repeats 10 --output results/power.json
+"""
+
+from hdr_histogram import LatencyRecorder, format_summary
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+import urllib3
+
+SYSTEM_PATH = "/redfish/v1/Systems/system"
+RESET_PATH = f"{SYSTEM_PATH}/Actions/ComputerSystem.Reset"
+POWER_TIMEOUT = float(os.environ.get("OPENBMC_POWER_TIMEOUT", 300))
+MIN_INTERVAL = 0.2
+MAX_INTERVAL = 5.0
+BACKOFF = 1.5
+TIGHT_WINDOW = 0.2
+EXPECTED_WEIGHT = 0.3
+REQUEST_TIMEOUT = 30
+TARGET_STATE = {
+    "On": "On",
+    "ForceOn": "On",
+    "ForceOff": "Off",
+    "GracefulShutdown": "Off",
+    "GracefulRestart": "On",
+    "ForceRestart": "On",
+    "PowerCycle": "On",
+}
+RESTARTS = ("GracefulRestart", "ForceRestart", "PowerCycle")
+TASK_DONE = ("Completed", "Exception", "Killed", "Cancelled")
+ACCEPTED = (200, 202, 204)
+
+
+class PowerError(Exception):
+    pass
+
+
+class Transition:
+    """Результат одного Reset: состояния с длительностью, латентность, число опросов."""
+
+    def __init__(self, reset_type, status):
+        self.reset_type = reset_type
+        self.status = status
+        self.states = []
+        self.latency = None
+        self.polls = 0
+        self.error = None
+
+    @property
+    def accepted(self):
+        return self.status in ACCEPTED
+
+    @property
+    def completed(self):
+        return self.latency is not None
+
+    def describe(self):
+        if not self.accepted:
+            return f"{self.reset_type}: HTTP {self.status}"
+        if not self.completed:
+            return f"{self.reset_type}: {self.error}"
+        path = " -> ".join(f"{state} {seconds:.1f} с" for state, seconds in self.states)
+        return f"{self.reset_type}: {self.latency:.1f} с ({path}), опросов {self.polls}"
+
+    def to_dict(self):
+        return {
+            "reset_type": self.reset_type,
+            "status": self.status,
+            "latency": self.latency,
+            "states": self.states,
+            "polls": self.polls,
+            "error": self.error,
+        }
+
+
+class PowerTransitionTracker:
+    def __init__(self, session, base_url, timeout=POWER_TIMEOUT,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, backoff=BACKOFF):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.expected = {}
+
+    def power_state(self):
+        response = self.session.get(f"{self.base_url}{SYSTEM_PATH}", timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            raise PowerError(f"GET {SYSTEM_PATH}: HTTP {response.status_code}")
+        data = response.json()
+        return data.get("PowerState"), data.get("LastResetTime")
+
+    def task_done(self, location):
+        response = self.session.get(f"{self.base_url}{location}", timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return False
+        state = response.json().get("TaskState")
+        if state in TASK_DONE and state != "Completed":
+            raise PowerError(f"Задача {location}: {state}")
+        return state == "Completed"
+
+    def reset(self, reset_type):
+        """Отправляет Reset и ждет целевого PowerState; Transition без исключений по таймауту."""
+        if reset_type not in TARGET_STATE:
+            raise PowerError(f"Неизвестный ResetType: {reset_type}")
+        state, last_reset = self.power_state()
+        started = time.monotonic()
+        response = self.session.post(
+            f"{self.base_url}{RESET_PATH}", json={"ResetType": reset_type}, timeout=REQUEST_TIMEOUT
+        )
+        transition = Transition(reset_type, response.status_code)
+        if not transition.accepted:
+            transition.error = response.text[:200]
+            return transition
+        task = None
+        location = response.headers.get("Location", "")
+        if response.status_code == 202 and "/TaskService/" in location:
+            task = location
+        self.follow(transition, state, last_reset, started, task)
+        return transition
+
+    def next_delay(self, key, in_state, backoff_delay):
+        """Пауза до следующего опроса: backoff, а около ожидаемой смены состояния - min_interval."""
+        expected = self.expected.get(key)
+        if expected is None:
+            return backoff_delay
+        window = max(expected * TIGHT_WINDOW, self.min_interval * 2)
+        remaining = expected - in_state
+        if remaining > window:
+            return max(min(backoff_delay, remaining - window), self.min_interval)
+        if remaining >= -window:
+            return self.min_interval
+        return backoff_delay
+
+    def follow(self, transition, state, last_reset, started, task=None):
+        target = TARGET_STATE[transition.reset_type]
+        restart = transition.reset_type in RESTARTS
+        current, entered = state, started
+        left_initial = False
+        backoff_delay = self.min_interval
+        task_completed = task is None
+
+        while True:
+            now = time.monotonic()
+            if now - started > self.timeout:
+                transition.error = f"PowerState {current} через {self.timeout:.0f} с, ожидалось {target}"
+                return transition
+            time.sleep(self.next_delay((transition.reset_type, current), now - entered, backoff_delay))
+            state, reset_time = self.power_state()
+            if task is not None and not task_completed:
+                task_completed = self.task_done(task)
+            transition.polls += 1
+            now = time.monotonic()
+
+            if state != current:
+                transition.states.append([current, now - entered])
+                current, entered = state, now
+                left_initial = True
+                backoff_delay = self.min_interval
+            else:
+                backoff_delay = min(backoff_delay * self.backoff, self.max_interval)
+
+            if restart:
+                done = state == target and (left_initial or reset_time != last_reset)
+            else:
+                done = state == target
+            if done and task_completed:
+                transition.latency = now - started
+                break
+
+        for name, seconds in transition.states:
+            key = (transition.reset_type, name)
+            previous = self.expected.get(key)
+            self.expected[key] = seconds if previous is None else previous + EXPECTED_WEIGHT * (seconds - previous)
+        return transition
+
+    def ensure(self, state):
+        """Приводит систему в state (On/Off) перед замером; None, если уже там."""
+        current, _ = self.power_state()
+        if current == state:
+            return None
+        transition = self.reset("On" if state == "On" else "ForceOff")
+        if not transition.completed:
+            raise PowerError(f"Не удалось перевести систему в {state}: {transition.describe()}")
+        return transition
+
+
+class PowerStats:
+    """Распределение латентности по ResetType и времени в каждом состоянии (HDR, мс)."""
+
+    def __init__(self):
+        self.recorder = LatencyRecorder()
+        self.failed = {}
+
+    def record(self, transition):
+        if not transition.completed:
+            self.failed[transition.reset_type] = self.failed.get(transition.reset_type, 0) + 1
+            return
+        self.recorder.record(f"{transition.reset_type} total", transition.latency * 1000)
+        for state, seconds in transition.states:
+            self.recorder.record(f"{transition.reset_type} {state}", seconds * 1000)
+
+    def summary(self):
+        return self.recorder.summary()
+
+
+def benchmark(tracker, reset_types, repeats, stats=None, progress=None):
+    """Повторяет каждый ResetType repeats раз из его исходного состояния."""
+    stats = stats or PowerStats()
+    transitions = []
+    for _ in range(repeats):
+        for reset_type in reset_types:
+            tracker.ensure("Off" if TARGET_STATE[reset_type] == "On" and reset_type not in RESTARTS else "On")
+            transition = tracker.reset(reset_type)
+            stats.record(transition)
+            transitions.append(transition)
+            if progress is not None:
+                progress(transition)
+    return transitions, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Латентность Reset -> PowerState OpenBMC")
+    parser.add_argument("--url", default=os.environ.get("OPENBMC_URL", "https://localhost:2443"))
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="0penBmc")
+    parser.add_argument("--reset", action="append", choices=sorted(TARGET_STATE),
+                        help="ResetType, можно повторять (по умолчанию ForceRestart)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=POWER_TIMEOUT, help="предел одного перехода, с")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL, help="минимальный интервал опроса, с")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL, help="максимальный интервал опроса, с")
+    parser.add_argument("--output", help="JSON с переходами и перцентилями")
+    args = parser.parse_args(argv)
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    session = requests.Session()
+    session.verify = False
+    session.auth = (args.user, args.password)
+    tracker = PowerTransitionTracker(
+        session, args.url, args.timeout, min_interval=args.min_interval, max_interval=args.max_interval
+    )
+    try:
+        transitions, stats = benchmark(
+            tracker, args.reset or ["ForceRestart"], args.repeats,
+            progress=lambda t: print(t.describe(), flush=True)
+        )
+    except (PowerError, requests.RequestException) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    summary = stats.summary()
+    if summary:
+        print(format_summary(summary))
+    for reset_type, count in stats.failed.items():
+        print(f"{reset_type}: не завершено переходов {count}")
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "url": args.url,
+                "transitions": [t.to_dict() for t in transitions],
+                "percentiles_ms": summary,
+                "failed": stats.failed,
+            }, f, indent=2)
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
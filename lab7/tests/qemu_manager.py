@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Запуск OpenBMC romulus в QEMU по qemuboot.conf с теплым стартом из снапшота.
+
+Параметры машины (qemu-system-*, -machine, -m, -smp, способ подключения
+образа) берутся из qemuboot.conf сборки, а не задаются вручную. Образ
+подключается через qcow2-overlay в каталоге состояния, поэтому после
+первой холодной загрузки состояние готового BMC сохраняется через QMP
+savevm, и следующие запуски поднимаются из него через -loadvm за
+секунды. Готовность определяется по приглашению login: на консоли и
+ответу Redfish, без фиксированных пауз; время до готовности пишется в
+boot.json.
+
+    python lab7/tests/qemu_manager.py start --image-dir romulus --state-dir ~/qemu-state --snapshot
+    python lab7/tests/qemu_manager.py stop --state-dir ~/qemu-state
+
+Без --image (или OPENBMC_QEMU_IMAGE) образ static.mtd берется рядом с
+qemuboot.conf по image_name или image_link_name из него, то есть
+всегда той же сборки, что и qemuboot.conf.
+"""
+
+import argparse
+import configparser
+import glob
+import json
+import os
+import shlex
+import signal
+import socket
+import ssl
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SNAPSHOT_TAG = "ready"
+CONSOLE_READY = b"login:"
+BOOT_TIMEOUT = 300
+DEFAULT_PORTS = {"ssh": 2222, "https": 2443, "ipmi": 2623}
+IMAGE_ENV = "OPENBMC_QEMU_IMAGE"
+
+
+class QemuError(Exception):
+    pass
+
+
+def load_qemuboot(path):
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(path)
+    conf = dict(parser["config_bsp"])
+    conf["_dir"] = os.path.dirname(os.path.abspath(path))
+    return conf
+
+
+def find_qemuboot(image_dir, image="obmc-phosphor-image"):
+    paths = sorted(glob.glob(os.path.join(image_dir, f"{image}-*.qemuboot.conf")))
+    if not paths:
+        raise QemuError(f"В {image_dir} нет {image}-*.qemuboot.conf")
+    return paths[-1]
+
+
+def rootfs_path(conf, image=None):
+    image = image or os.environ.get(IMAGE_ENV)
+    if image:
+        if not os.path.exists(image):
+            raise QemuError(f"Не найден образ {image}")
+        return os.path.abspath(image)
+    directory = os.path.join(conf["_dir"], conf.get("deploy_dir_image", "."))
+    fstype = conf.get("qb_default_fstype", "static.mtd")
+    candidates = [
+        os.path.join(directory, f"{conf['image_name']}.{fstype}"),
+        os.path.join(directory, f"{conf['image_link_name']}.{fstype}"),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return os.path.abspath(path)
+    raise QemuError(
+        f"Не найден образ {fstype}: {', '.join(candidates)}; "
+        f"укажите --image или {IMAGE_ENV}"
+    )
+
+
+def redfish_ready(base_url, timeout=5):
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    try:
+        with urllib.request.urlopen(f"{base_url}/redfish/v1", timeout=timeout, context=context) as r:
+            return r.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+class QMP:
+    def __init__(self, path, timeout=60):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rwb")
+        self._read()
+        self.execute("qmp_capabilities")
+
+    def _read(self):
+        while True:
+            line = self.file.readline()
+            if not line:
+                raise QemuError("QMP закрыл соединение")
+            message = json.loads(line)
+            if "event" not in message:
+                return message
+
+    def execute(self, command, **arguments):
+        request = {"execute": command}
+        if arguments:
+            request["arguments"] = arguments
+        self.file.write(json.dumps(request).encode() + b"\n")
+        self.file.flush()
+        reply = self._read()
+        if "error" in reply:
+            raise QemuError(f"{command}: {reply['error'].get('desc')}")
+        return reply.get("return")
+
+    def hmp(self, command_line):
+        output = self.execute("human-monitor-command", **{"command-line": command_line})
+        if output and output.strip():
+            raise QemuError(f"{command_line}: {output.strip()}")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+class QemuManager:
+    def __init__(self, qemuboot, state_dir, image=None, ports=None, host="localhost",
+                 snapshot=False, boot_timeout=BOOT_TIMEOUT):
+        self.conf = load_qemuboot(qemuboot)
+        self.state_dir = os.path.abspath(state_dir)
+        self.image = rootfs_path(self.conf, image)
+        self.ports = dict(DEFAULT_PORTS, **(ports or {}))
+        self.host = host
+        self.snapshot = snapshot
+        self.boot_timeout = boot_timeout
+        self.process = None
+        self.metrics = {}
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.overlay = os.path.join(self.state_dir, "overlay.qcow2")
+        self.qmp_path = os.path.join(self.state_dir, "qmp.sock")
+        self.console_log = os.path.join(self.state_dir, "console.log")
+        self.qemu_log = os.path.join(self.state_dir, "qemu.log")
+        self.pid_file = os.path.join(self.state_dir, "qemu.pid")
+        self.meta_file = os.path.join(self.state_dir, "overlay.json")
+        self.metrics_file = os.path.join(self.state_dir, "boot.json")
+
+    @property
+    def base_url(self):
+        return f"https://{self.host}:{self.ports['https']}"
+
+    def _image_signature(self):
+        stat = os.stat(self.image)
+        return {"image": self.image, "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def prepare_overlay(self):
+        """Создает overlay заново, если образ сменился. Возвращает True, если есть снапшот."""
+        signature = self._image_signature()
+        try:
+            with open(self.meta_file, encoding="utf-8") as f:
+                fresh = json.load(f) == signature and os.path.exists(self.overlay)
+        except (OSError, ValueError):
+            fresh = False
+
+        if not fresh:
+            if os.path.exists(self.overlay):
+                os.remove(self.overlay)
+            subprocess.run(
+                ["qemu-img", "create", "-q", "-f", "qcow2", "-F", "raw", "-b", self.image, self.overlay],
+                check=True
+            )
+            with open(self.meta_file, "w", encoding="utf-8") as f:
+                json.dump(signature, f)
+            return False
+
+        listing = subprocess.run(
+            ["qemu-img", "snapshot", "-l", self.overlay],
+            capture_output=True, text=True, check=True
+        ).stdout
+        return any(line.split()[1:2] == [SNAPSHOT_TAG] for line in listing.splitlines())
+
+    def command(self, loadvm=False):
+        conf = self.conf
+        hostfwd = (
+            f"hostfwd=tcp::{self.ports['ssh']}-:22,"
+            f"hostfwd=tcp::{self.ports['https']}-:443,"
+            f"hostfwd=udp::{self.ports['ipmi']}-:623"
+        )
+        rootfs = conf.get("qb_rootfs_opt", "-drive file=@ROOTFS@,if=mtd,format=raw")
+        rootfs = rootfs.replace("@ROOTFS@", self.overlay).replace("format=raw", "format=qcow2")
+
+        cmd = [conf.get("qb_system_name", "qemu-system-arm")]
+        for key in ("qb_machine", "qb_mem", "qb_smp", "qb_opt_append"):
+            cmd += shlex.split(conf.get(key, ""))
+        cmd += shlex.split(rootfs)
+        cmd += [
+            "-netdev", f"user,id=net0,hostname=qemu,{hostfwd}",
+            *shlex.split(conf.get("qb_network_device", "-net nic,netdev=net0")),
+            "-display", "none",
+            "-monitor", "none",
+            "-serial", f"file:{self.console_log}",
+            "-serial", "null",
+            "-qmp", f"unix:{self.qmp_path},server=on,wait=off",
+        ]
+        if loadvm:
+            cmd += ["-loadvm", SNAPSHOT_TAG]
+        return cmd
+
+    def start(self):
+        self.stop()
+        warm = self.prepare_overlay() and self.snapshot
+
+        for path in (self.console_log, self.qmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        started = time.monotonic()
+        with open(self.qemu_log, "wb") as log:
+            self.process = subprocess.Popen(
+                self.command(loadvm=warm),
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+        with open(self.pid_file, "w") as f:
+            f.write(str(self.process.pid))
+
+        self.metrics = {"mode": "warm" if warm else "cold", "image": self.image}
+        try:
+            if not warm:
+                self.wait_console(started)
+                self.metrics["boot_to_console"] = time.monotonic() - started
+            self.wait_redfish(started)
+            self.metrics["boot_to_ready"] = time.monotonic() - started
+            if self.snapshot and not warm:
+                self.save_snapshot()
+        except Exception:
+            self.stop()
+            raise
+
+        with open(self.metrics_file, "w", encoding="utf-8") as f:
+            json.dump(self.metrics, f, indent=2)
+        return self.metrics
+
+    def _check_alive(self):
+        if self.process is not None and self.process.poll() is not None:
+            with open(self.qemu_log, "rb") as f:
+                tail = f.read()[-2000:].decode(errors="replace")
+            raise QemuError(f"QEMU завершился с кодом {self.process.returncode}:\n{tail}")
+
+    def _deadline(self, started):
+        remaining = self.boot_timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            raise QemuError(f"OpenBMC не поднялся за {self.boot_timeout} секунд")
+        return remaining
+
+    def wait_console(self, started):
+        """Следит за консолью, пока не появится приглашение login:."""
+        offset = 0
+        tail = b""
+        while True:
+            self._deadline(started)
+            self._check_alive()
+            try:
+                with open(self.console_log, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                chunk = b""
+            if chunk:
+                offset += len(chunk)
+                tail = (tail + chunk)[-256:]
+                if CONSOLE_READY in tail:
+                    return
+            else:
+                time.sleep(0.2)
+
+    def redfish_ready(self, timeout=5):
+        return redfish_ready(self.base_url, timeout)
+
+    def wait_redfish(self, started):
+        delay = 0.2
+        while True:
+            self._check_alive()
+            remaining = self._deadline(started)
+            if self.redfish_ready(timeout=min(5, remaining)):
+                return
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 5)
+
+    def save_snapshot(self):
+        started = time.monotonic()
+        qmp = QMP(self.qmp_path)
+        try:
+            qmp.hmp(f"savevm {SNAPSHOT_TAG}")
+        finally:
+            qmp.close()
+        self.metrics["savevm"] = time.monotonic() - started
+
+    def stop(self):
+        process, self.process = self.process, None
+        if process is not None:
+            terminate(process.pid, process.poll)
+            process.wait()
+        stop_from_pid_file(self.pid_file)
+
+
+def terminate(pid, exited=None, timeout=5):
+    """SIGTERM группе процессов QEMU, через timeout секунд - SIGKILL."""
+    try:
+        os.killpg(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if exited is not None and exited() is not None:
+                return
+            os.kill(pid, 0)
+            time.sleep(0.1)
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def stop_from_pid_file(pid_file):
+    if not os.path.exists(pid_file):
+        return
+    with open(pid_file) as f:
+        pid = int(f.read().strip() or 0)
+    if pid:
+        terminate(pid)
+    os.remove(pid_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenBMC romulus в QEMU")
+    parser.add_argument("command", choices=["start", "stop", "command"])
+    parser.add_argument("--image-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "romulus"))
+    parser.add_argument("--qemuboot", help="qemuboot.conf, по умолчанию из --image-dir")
+    parser.add_argument("--image", help=f"образ static.mtd, по умолчанию ${IMAGE_ENV} или образ из qemuboot.conf")
+    parser.add_argument("--state-dir", required=True)
+    parser.add_argument("--snapshot", action="store_true", help="теплый старт через savevm/loadvm")
+    parser.add_argument("--ssh-port", type=int, default=DEFAULT_PORTS["ssh"])
+    parser.add_argument("--https-port", type=int, default=DEFAULT_PORTS["https"])
+    parser.add_argument("--ipmi-port", type=int, default=DEFAULT_PORTS["ipmi"])
+    parser.add_argument("--timeout", type=int, default=BOOT_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    if args.command == "stop":
+        stop_from_pid_file(os.path.join(args.state_dir, "qemu.pid"))
+        return 0
+
+    try:
+        manager = QemuManager(
+            args.qemuboot or find_qemuboot(args.image_dir),
+            args.state_dir,
+            image=args.image,
+            ports={"ssh": args.ssh_port, "https": args.https_port, "ipmi": args.ipmi_port},
+            snapshot=args.snapshot,
+            boot_timeout=args.timeout,
+        )
+        if args.command == "command":
+            print(shlex.join(manager.command()))
+            return 0
+        metrics = manager.start()
+    except QemuError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"OpenBMC готов ({metrics['mode']} start) за {metrics['boot_to_ready']:.1f} с: {manager.base_url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""Обход дерева Redfish и общий индекс URL для нагрузки по всему дереву.
+
+Нагрузочные сценарии и TestRedfishAPI трогают несколько ресурсов, и
+медленные обработчики в остальном дереве (LogServices, Managers,
+UpdateService) не измеряются. RedfishCrawler обходит /redfish/v1 по
+ссылкам @odata.id в несколько потоков. Если служба объявляет
+ExpandQuery в ProtocolFeaturesSupported, ресурсы запрашиваются с
+$expand=.($levels=1), и раскрытые дочерние ресурсы (как и записи
+журналов, которые bmcweb целиком кладет в Members) попадают в индекс
+без отдельного запроса. $select не используется: для поиска ссылок
+нужен весь ресурс. Ответы кэшируются вместе с ETag, повторный обход
+отправляет If-None-Match и на 304 берет ссылки из кэша.
+
+UrlIndex - компактный итог обхода: тип, ETag, размер и ссылки каждого
+ресурса. Для locustfile_tree.py он строится один раз за прогон на
+master (или LocalRunner) по test_start и рассылается worker-процессам
+сообщением. Каждое имя в статистике (ресурс или группа членов большой
+коллекции, например Entries/{id}) получает равную долю запросов,
+--tree-weights меняет доли по префиксу пути. В конце теста печатается
+таблица латентности по каждому ресурсу. С --tree-index индекс
+сохраняется в файл, и следующий прогон только перепроверяет его по ETag.
+
+    python lab7/tests/redfish_crawler.py --url https://localhost:2443 --index results/redfish_index.json --repeat 2
+"""
+
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+import urllib3
+
+import bmc_farm
+
+ROOT = "/redfish/v1"
+USERNAME = "root"
+PASSWORD = "0penBmc"
+TIMEOUT = 30
+WORKERS = int(os.environ.get("OPENBMC_CRAWL_WORKERS", 8))
+MAX_MEMBERS = int(os.environ.get("OPENBMC_CRAWL_MAX_MEMBERS", 50))
+MAX_RESOURCES = 2000
+GROUP_MEMBERS = 8
+INDEX_FILE = os.environ.get("OPENBMC_TREE_INDEX")
+TREE_WEIGHTS = os.environ.get("OPENBMC_TREE_WEIGHTS", "")
+TREE_LOAD = os.environ.get("OPENBMC_TREE_LOAD") == "1"
+EXPAND = ".($levels=1)"
+REQUIRED = ("@odata.id", "@odata.type")
+EXCLUDE = (
+    "/redfish/v1/JsonSchemas",
+    "/redfish/v1/EventService/SSE",
+    "/redfish/v1/SessionService/Sessions/",
+    "/redfish/v1/TaskService/Tasks/",
+)
+INDEX_MESSAGE = "redfish_tree:index"
+TABLE_TOP = 30
+
+
+class CrawlError(Exception):
+    pass
+
+
+def short_name(path):
+    return f"GET {path[len(ROOT):] or '/'}"
+
+
+def supports_expand(root):
+    expand = root.get("ProtocolFeaturesSupported", {}).get("ExpandQuery") or {}
+    return bool(expand.get("Levels") and expand.get("NoLinks") and expand.get("MaxLevels", 0) >= 1)
+
+
+class RedfishCrawler:
+    """Параллельный обход дерева; cache {url: (etag, сводка)} переживает повторные обходы."""
+
+    def __init__(self, session, base_url, workers=WORKERS, max_members=MAX_MEMBERS,
+                 max_resources=MAX_RESOURCES, exclude=EXCLUDE, use_expand=True):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.max_members = max_members
+        self.max_resources = max_resources
+        self.exclude = exclude
+        self.use_expand = use_expand
+        self.expand = False
+        self.cache = {}
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.timings = {}
+        self.errors = {}
+        self.invalid = {}
+
+    def url_for(self, path):
+        if self.expand and path != ROOT:
+            return f"{self.base_url}{path}?$expand={EXPAND}"
+        return f"{self.base_url}{path}"
+
+    def normalize(self, link):
+        path = link.split("?", 1)[0]
+        if "#" in path:
+            return None
+        path = path.rstrip("/")
+        if not path.startswith(ROOT) or any(path.startswith(prefix) for prefix in self.exclude):
+            return None
+        return path
+
+    def fetch(self, path):
+        url = self.url_for(path)
+        cached = self.cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached and cached[0] else {}
+        started = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=TIMEOUT)
+        content = response.content
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.requests += 1
+            self.bytes += len(content)
+            self.timings[path] = elapsed
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.not_modified += 1
+            return cached[1]
+        if response.status_code != 200:
+            raise CrawlError(f"HTTP {response.status_code}")
+        try:
+            data = json.loads(content)
+        except ValueError:
+            raise CrawlError("ответ не JSON")
+        summary = self.summarize(path, data, len(content))
+        summary["etag"] = response.headers.get("ETag")
+        self.cache[url] = (summary["etag"], summary)
+        return summary
+
+    def summarize(self, path, data, size=0):
+        """Сводка ресурса: тип, размер, число членов, ссылки и раскрытые в нем ресурсы."""
+        refs = []
+        inline = {}
+        self._collect(data, refs, inline, top=True)
+        members = data.get("Members")
+        summary = {
+            "type": data.get("@odata.type"),
+            "etag": None,
+            "size": size,
+            "members": len(members) if isinstance(members, list) else None,
+            "refs": refs,
+            "inline": inline,
+            "missing": [field for field in REQUIRED if field not in data],
+        }
+        if path == ROOT:
+            summary["expand"] = supports_expand(data)
+        return summary
+
+    def _collect(self, node, refs, inline, top=False):
+        if isinstance(node, list):
+            for item in node:
+                self._collect(item, refs, inline)
+            return
+        if not isinstance(node, dict):
+            return
+        link = node.get("@odata.id")
+        if not top and isinstance(link, str):
+            path = self.normalize(link)
+            if path is not None:
+                if len(node) > 1:
+                    inline[path] = self.summarize(path, node)
+                refs.append(path)
+            return
+        for key, value in node.items():
+            if key == "Members" and isinstance(value, list):
+                value = value[:self.max_members]
+            self._collect(value, refs, inline)
+
+    def crawl(self, root=ROOT):
+        """Обходит дерево от root; возвращает {путь: ресурс} всех найденных ресурсов."""
+        self.reset_counters()
+        started = time.perf_counter()
+        resources = {}
+        seen = {root}
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def add(path, summary, fetched):
+                if summary["missing"]:
+                    self.invalid[path] = summary["missing"]
+                resources[path] = {
+                    "type": summary["type"],
+                    "etag": summary["etag"] if fetched else None,
+                    "size": summary["size"],
+                    "members": summary["members"],
+                    "fetched": fetched,
+                    "refs": summary["refs"],
+                }
+                for child, child_summary in summary["inline"].items():
+                    if child not in seen:
+                        seen.add(child)
+                        add(child, child_summary, False)
+                for child in summary["refs"]:
+                    if child not in seen and len(seen) < self.max_resources:
+                        seen.add(child)
+                        futures[pool.submit(self.fetch, child)] = child
+
+            summary = self.fetch(root)
+            self.expand = self.use_expand and summary.get("expand", False)
+            add(root, summary, True)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = futures.pop(future)
+                    try:
+                        summary = future.result()
+                    except (CrawlError, requests.RequestException) as e:
+                        self.errors[path] = str(e)
+                        continue
+                    add(path, summary, True)
+
+        self.elapsed = time.perf_counter() - started
+        return resources
+
+    def seed(self, index):
+        """Заполняет кэш сохраненным индексом, чтобы обход только перепроверял ETag."""
+        self.expand = index.expand
+        for path, resource in index.resources.items():
+            if resource["fetched"] and resource["etag"]:
+                self.cache[self.url_for(path)] = (resource["etag"], index.summary(path))
+        self.expand = False
+
+
+class UrlIndex:
+    """Итог обхода: ресурсы, имена для статистики Locust и веса для выбора ресурса."""
+
+    def __init__(self, resources, url=None, expand=False, weights=None):
+        self.resources = resources
+        self.url = url
+        self.expand = expand
+        self.names = self._names()
+        self.set_weights(weights or {})
+
+    def _names(self):
+        names = {path: short_name(path) for path in self.resources}
+        for path, resource in self.resources.items():
+            if resource["members"] is None:
+                continue
+            members = [ref for ref in resource["refs"] if ref.rsplit("/", 1)[0] == path]
+            if len(members) > GROUP_MEMBERS:
+                for member in members:
+                    names[member] = f"{short_name(path)}/{{id}}"
+        return names
+
+    def set_weights(self, weights):
+        """Равные доли на каждое имя, умноженные на weights {префикс пути: множитель}."""
+        self.weights = weights
+        prefixes = {
+            prefix if prefix.startswith(ROOT) else f"{ROOT}{prefix}": factor
+            for prefix, factor in weights.items()
+        }
+        paths_by_name = {}
+        for path, name in self.names.items():
+            paths_by_name.setdefault(name, []).append(path)
+        self.paths = []
+        self._cumulative = []
+        total = 0.0
+        for name, paths in sorted(paths_by_name.items()):
+            for path in sorted(paths):
+                weight = 1 / len(paths)
+                for prefix, factor in prefixes.items():
+                    if path.startswith(prefix):
+                        weight *= factor
+                if weight > 0:
+                    total += weight
+                    self.paths.append(path)
+                    self._cumulative.append(total)
+
+    def choose(self):
+        """(путь, имя) случайного ресурса по весам."""
+        if not self.paths:
+            raise CrawlError("Индекс ресурсов пуст")
+        path = self.paths[bisect(self._cumulative, random.random() * self._cumulative[-1])]
+        return path, self.names[path]
+
+    def summary(self, path, _seen=None):
+        """Сводка ресурса в формате RedfishCrawler.summarize (для кэша ETag)."""
+        seen = _seen or {path}
+        resource = self.resources[path]
+        inline = {}
+        for ref in resource["refs"]:
+            child = self.resources.get(ref)
+            if child is not None and not child["fetched"] and ref not in seen:
+                seen.add(ref)
+                inline[ref] = self.summary(ref, seen)
+        summary = {
+            "type": resource["type"],
+            "etag": resource["etag"],
+            "size": resource["size"],
+            "members": resource["members"],
+            "refs": resource["refs"],
+            "inline": inline,
+            "missing": [],
+        }
+        if path == ROOT:
+            summary["expand"] = self.expand
+        return summary
+
+    def to_dict(self):
+        return {
+            "url": self.url,
+            "expand": self.expand,
+            "weights": self.weights,
+            "resources": {
+                path: [r["type"], r["etag"], r["size"], r["members"], r["fetched"], r["refs"]]
+                for path, r in self.resources.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data, weights=None):
+        resources = {
+            path: dict(zip(("type", "etag", "size", "members", "fetched", "refs"), values))
+            for path, values in data["resources"].items()
+        }
+        return cls(resources, data.get("url"), data.get("expand", False),
+                   data.get("weights") if weights is None else weights)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path, weights=None):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), weights)
+
+
+def parse_weights(text):
+    """"/Managers=2,/Systems/system/LogServices=0.5" -> {префикс: множитель}."""
+    weights = {}
+    for item in (text or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        prefix, _, factor = item.rpartition("=")
+        if not prefix:
+            raise ValueError(f"Ожидается PREFIX=WEIGHT: {item}")
+        weights[prefix.rstrip("/")] = float(factor)
+    return weights
+
+
+def new_session(username=USERNAME, password=PASSWORD):
+    session = requests.Session()
+    session.verify = False
+    session.auth = (username, password)
+    return session
+
+
+def build_index(url, path=None, weights=None, session=None, **kwargs):
+    """Обходит дерево url; с path перепроверяет сохраненный индекс по ETag и сохраняет новый."""
+    crawler = RedfishCrawler(session or new_session(), url, **kwargs)
+    if path and os.path.exists(path):
+        crawler.seed(UrlIndex.load(path))
+    resources = crawler.crawl()
+    index = UrlIndex(resources, url, crawler.expand, weights)
+    if path:
+        index.save(path)
+    return index, crawler
+
+
+def format_crawl(crawler, resources):
+    fetched = sum(1 for resource in resources.values() if resource["fetched"])
+    message = (
+        f"ресурсов {len(resources)} (запрошено {fetched}), запросов {crawler.requests}, "
+        f"304: {crawler.not_modified}, {crawler.bytes / 1024:.0f} КиБ за {crawler.elapsed:.1f} с, "
+        f"$expand: {'да' if crawler.expand else 'нет'}, ошибок {len(crawler.errors)}"
+    )
+    if crawler.timings:
+        path, elapsed = max(crawler.timings.items(), key=lambda item: item[1])
+        message += f", самый медленный {path} {elapsed:.0f} мс"
+    return message
+
+
+def latency_rows(stats, index):
+    """Строки таблицы по каждому имени индекса, самые медленные по p95 первыми."""
+    rows = []
+    for name in sorted(set(index.names.values())):
+        entry = stats.entries.get((name, "GET"))
+        if entry is None or not entry.num_requests:
+            continue
+        rows.append({
+            "name": name,
+            "requests": entry.num_requests,
+            "failures": entry.num_failures,
+            "p50": entry.get_response_time_percentile(0.5),
+            "p95": entry.get_response_time_percentile(0.95),
+            "max": entry.max_response_time or 0,
+            "size": entry.avg_content_length,
+        })
+    rows.sort(key=lambda row: (-row["p95"], row["name"]))
+    return rows
+
+
+def format_table(rows, top=None):
+    width = max([len(row["name"]) for row in rows] + [len("Ресурс")])
+    lines = [f"{'Ресурс':<{width}} {'запросов':>9} {'ошибок':>7} {'p50':>7} {'p95':>7} {'max':>7} {'байт':>8}"]
+    for row in rows[:top]:
+        lines.append(
+            f"{row['name']:<{width}} {row['requests']:>9} {row['failures']:>7} "
+            f"{row['p50']:>7.0f} {row['p95']:>7.0f} {row['max']:>7.0f} {row['size']:>8.0f}"
+        )
+    return "\n".join(lines)
+
+
+def report(environment, reporter, suite="load"):
+    if _index is None:
+        return
+    rows = latency_rows(environment.stats, _index)
+    for row in rows:
+        reporter.add_test_result(
+            suite, f"tree {row['name']}", 'failed' if row["failures"] else 'passed',
+            f"requests={row['requests']} failures={row['failures']} p50={row['p50']:.0f}ms "
+            f"p95={row['p95']:.0f}ms max={row['max']:.0f}ms size={row['size']:.0f}", 0
+        )
+    names = len(set(_index.names.values()))
+    reporter.add_test_result(
+        suite, "tree coverage", 'passed',
+        f"ресурсов в индексе {len(_index.resources)}, имен {names}, под нагрузкой {len(rows)}", 0
+    )
+
+
+_index = None
+_index_ready = threading.Event()
+_index_lock = threading.Lock()
+
+
+def _weights(environment):
+    return parse_weights(getattr(environment.parsed_options, "tree_weights", None) or TREE_WEIGHTS)
+
+
+def shared_index(environment):
+    """Индекс прогона: worker ждет рассылки от master, остальные обходят дерево один раз."""
+    global _index
+    if _index is None:
+        if isinstance(environment.runner, WorkerRunner):
+            if not _index_ready.wait(TIMEOUT):
+                raise CrawlError("Master не прислал индекс ресурсов")
+        else:
+            with _index_lock:
+                if _index is None:
+                    options = environment.parsed_options
+                    url = environment.host or bmc_farm.target_for(0)["url"]
+                    _index, crawler = build_index(
+                        url, getattr(options, "tree_index", None) or INDEX_FILE, _weights(environment)
+                    )
+                    print(f"Индекс Redfish {url}: {format_crawl(crawler, _index.resources)}")
+    return _index
+
+
+def _uses_tree(environment):
+    return any(getattr(user_class, "tree_index", False) for user_class in environment.user_classes or ())
+
+
+def _receive_index(environment, msg, **kwargs):
+    global _index
+    _index = UrlIndex.from_dict(msg.data)
+    _index_ready.set()
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--tree-index", default=INDEX_FILE, env_var="OPENBMC_TREE_INDEX",
+        help="JSON-индекс ресурсов Redfish: перепроверяется по ETag и перезаписывается",
+    )
+    parser.add_argument(
+        "--tree-weights", default=TREE_WEIGHTS, env_var="OPENBMC_TREE_WEIGHTS",
+        help="Множители долей запросов по префиксу пути, например /Managers=2,/UpdateService=0",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    if isinstance(runner, WorkerRunner):
+        runner.register_message(INDEX_MESSAGE, _receive_index)
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    global _index
+    if isinstance(environment.runner, WorkerRunner) or not _uses_tree(environment):
+        return
+    _index = None
+    index = shared_index(environment)
+    if isinstance(environment.runner, MasterRunner):
+        environment.runner.send_message(INDEX_MESSAGE, index.to_dict())
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner) or _index is None:
+        return
+    rows = latency_rows(environment.stats, _index)
+    if rows:
+        print(format_table(rows, TABLE_TOP))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обход дерева Redfish OpenBMC")
+    parser.add_argument("--url", default=os.environ.get("OPENBMC_URL", "https://localhost:2443"))
+    parser.add_argument("--user", default=USERNAME)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--index", help="JSON-индекс: перепроверяется по ETag, если есть, и сохраняется")
+    parser.add_argument("--repeat", type=int, default=1, help="число обходов (повторные - с If-None-Match)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="одновременных запросов")
+    parser.add_argument("--max-members", type=int, default=MAX_MEMBERS, help="членов коллекции на обход")
+    parser.add_argument("--no-expand", action="store_true", help="не использовать $expand")
+    parser.add_argument("--top", type=int, default=15, help="строк в списке самых медленных ресурсов")
+    args = parser.parse_args(argv)
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    crawler = RedfishCrawler(
+        new_session(args.user, args.password), args.url,
+        workers=args.workers, max_members=args.max_members, use_expand=not args.no_expand
+    )
+    if args.index and os.path.exists(args.index):
+        crawler.seed(UrlIndex.load(args.index))
+    try:
+        for _ in range(args.repeat):
+            resources = crawler.crawl()
+            print(format_crawl(crawler, resources), flush=True)
+    except (CrawlError, requests.RequestException) as e:
+        print(f"{args.url}{ROOT}: {e}", file=sys.stderr)
+        return 1
+
+    for path, elapsed in sorted(crawler.timings.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{elapsed:>8.0f} мс  {path}")
+    for path, error in sorted(crawler.errors.items()):
+        print(f"{path}: {error}")
+    for path, missing in sorted(crawler.invalid.items()):
+        print(f"{path}: нет {', '.join(missing)}")
+    if args.index:
+        UrlIndex(resources, args.url, crawler.expand).save(args.index)
+    return 1 if crawler.errors or crawler.invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
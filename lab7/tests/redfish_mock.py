@@ -0,0 +1,1042 @@
+#!/usr/bin/env python3
+"""Локальный Redfish-стенд на asyncio вместо OpenBMC в QEMU.
+
+Отдает ресурсы, которые используют тесты и locustfile:
+служебный корень, SessionService с X-Auth-Token, Systems/system
+с PowerState и действием #ComputerSystem.Reset, Chassis/chassis
+ThermalSubSystem/Thermal, Sensors, Managers/bmc, LogServices,
+UpdateService, AccountService и EventService. Показания датчиков
+обновляются раз в секунду, --sensors задает их число, а
+--sensor-fault-rate - долю ответов с выбросом. Смена PowerState
+рассылается событием ResourceChanged в SSE-потоки и по подпискам (POST
+на Destination). GET отдает ETag и 304 на If-None-Match, поддержаны
+$select и $expand=.($levels=N) (--no-expand отключает $expand, как в
+bmcweb по умолчанию). Задержку ответа можно задать с разбросом. С
+--power-off-delay/--power-on-delay Reset проходит через PoweringOff и
+PoweringOn, как на настоящем BMC, иначе PowerState меняется сразу.
+
+Запуск:
+    python lab7/tests/redfish_mock.py --port 2443 --tls --latency 5 --jitter 2
+    OPENBMC_URL=https://localhost:2443 python -m pytest lab7/tests/unified_openbmc_tests.py::TestRedfishAPI
+"""
+
+import argparse
+import asyncio
+import base64
+import functools
+import json
+import math
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+USERNAME = "root"
+PASSWORD = "0penBmc"
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+}
+
+RESET_TYPES = [
+    "On", "ForceOff", "GracefulShutdown", "GracefulRestart",
+    "ForceRestart", "ForceOn", "PowerCycle",
+]
+
+POWER_JITTER = 0.2
+SENSOR_UPDATE = 1.0
+SENSOR_PERIOD = 30
+SENSOR_KINDS = {
+    # ReadingType, единицы, база, амплитуда, нижний и верхний критические пороги
+    "temperature": ("Temperature", "Cel", 25.0, 2.0, None, 95.0),
+    "fan_tach": ("Rotational", "RPM", 4200.0, 300.0, 500.0, None),
+    "voltage": ("Voltage", "V", 12.0, 0.1, 10.8, 13.2),
+}
+BASE_SENSORS = (
+    "temperature_ambient", "temperature_cpu0", "temperature_cpu1", "temperature_dimm0",
+    "fan_tach_fan0", "fan_tach_fan1", "fan_tach_fan2", "fan_tach_fan3",
+)
+LOG_ENTRIES = 40
+JOURNAL_ENTRIES = 120
+MAX_EXPAND_LEVELS = 3
+SELECT_ALWAYS = ("@odata.id", "@odata.type", "@odata.context")
+MAX_BODY = 1024 * 1024
+SSE_KEEPALIVE = 15
+EVENT_QUEUE_SIZE = 256
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def sensor_specs(count):
+    """[(имя, вид)] для count датчиков: сначала BASE_SENSORS, затем сгенерированные."""
+    specs = []
+    for index in range(count):
+        if index < len(BASE_SENSORS):
+            name = BASE_SENSORS[index]
+            kind = "temperature" if name.startswith("temperature") else "fan_tach"
+        else:
+            kind = ("temperature", "voltage", "fan_tach")[index % 3]
+            name = f"{kind}_{index}"
+        specs.append((name, kind))
+    return specs
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(message)
+        self.status = status
+        self.message = message or REASONS.get(status, "")
+
+
+class EventStream:
+    """Ответ SSE: очередь событий одного клиента /EventService/SSE."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+
+
+class RedfishMock:
+    """Минимальный HTTP/1.1 сервер с keep-alive и дерево Redfish в памяти."""
+
+    def __init__(self, host="127.0.0.1", port=2443, latency=0.0, jitter=0.0,
+                 route_latency=None, ssl_context=None,
+                 username=USERNAME, password=PASSWORD,
+                 power_off_delay=0.0, power_on_delay=0.0, expand=True,
+                 sensors=len(BASE_SENSORS), sensor_fault_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.route_latency = route_latency or {}
+        self.ssl_context = ssl_context
+        self.credentials = (username, password)
+        self.basic_auth = "Basic " + base64.b64encode(
+            f"{username}:{password}".encode()).decode()
+        self.sessions = {}
+        self.power_state = "On"
+        self.power_off_delay = power_off_delay
+        self.power_on_delay = power_on_delay
+        self.expand_enabled = expand
+        self.sensors = sensor_specs(sensors)
+        self.sensor_fault_rate = sensor_fault_rate
+        self.last_reset_time = now_iso()
+        self._transition = None
+        self.requests_served = 0
+        self.subscriptions = {}
+        self.streams = set()
+        self.events_sent = 0
+        self.events_dropped = 0
+        self._event_id = 0
+        self._deliveries = set()
+        self.server = None
+        self._cache = {}
+        self._routes = {
+            "/redfish": self.get_redfish,
+            "/redfish/v1": self.get_service_root,
+            "/redfish/v1/SessionService": self.get_session_service,
+            "/redfish/v1/SessionService/Sessions": self.get_sessions,
+            "/redfish/v1/Systems": self.get_systems,
+            "/redfish/v1/Systems/system": self.get_system,
+            "/redfish/v1/Chassis": self.get_chassis_collection,
+            "/redfish/v1/Chassis/chassis": self.get_chassis,
+            "/redfish/v1/Chassis/chassis/ThermalSubSystem": self.get_thermal_subsystem,
+            "/redfish/v1/Chassis/chassis/Thermal": self.get_thermal,
+            "/redfish/v1/EventService": self.get_event_service,
+            "/redfish/v1/EventService/Subscriptions": self.get_subscriptions,
+        }
+        self._volatile = {
+            "/redfish/v1/Chassis/chassis/ThermalSubSystem",
+            "/redfish/v1/Chassis/chassis/Thermal",
+        }
+        self._routes.update(self.static_resources())
+        self._public = {"/redfish", "/redfish/v1"}
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port,
+            ssl=self.ssl_context, backlog=1024, reuse_address=True
+        )
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+    @property
+    def base_url(self):
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://{self.host}:{self.port}"
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+
+                headers = {}
+                for line in lines[1:]:
+                    if not line:
+                        continue
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY:
+                    writer.write(self.render(413, {}, None, keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if version == "HTTP/1.0":
+                    keep_alive = headers.get("connection", "").lower() == "keep-alive"
+
+                delay = self.delay_for(target)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                status, extra, payload = self.dispatch(method, target, headers, body)
+                self.requests_served += 1
+                if isinstance(payload, EventStream):
+                    await self.stream_events(writer, payload)
+                    break
+                writer.write(self.render(status, extra, payload, keep_alive))
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def stream_events(self, writer, stream):
+        head = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/event-stream",
+            "Cache-Control: no-cache",
+            "OData-Version: 4.0",
+            "Connection: close",
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        self.streams.add(stream)
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    event_id, data = await asyncio.wait_for(stream.queue.get(), SSE_KEEPALIVE)
+                    writer.write(f"id: {event_id}\ndata: {data}\n\n".encode())
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                await writer.drain()
+        finally:
+            self.streams.discard(stream)
+
+    def delay_for(self, target):
+        path = target.split("?", 1)[0].rstrip("/")
+        base = self.route_latency.get(path, self.latency)
+        if self.jitter:
+            return max(0.0, random.gauss(base, self.jitter))
+        return base
+
+    def render(self, status, extra, payload, keep_alive=True):
+        if payload is None:
+            data = b""
+        elif isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload).encode()
+
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        if data:
+            head.append("Content-Type: application/json")
+        head.append(f"Content-Length: {len(data)}")
+        head.append("OData-Version: 4.0")
+        head.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        for name, value in extra.items():
+            head.append(f"{name}: {value}")
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data
+
+    def dispatch(self, method, target, headers, body):
+        path = target.split("?", 1)[0]
+        if len(path) > 1:
+            path = path.rstrip("/")
+
+        try:
+            if path == "/redfish/v1/SessionService/Sessions" and method == "POST":
+                return self.create_session(body)
+            if path not in self._public and not self.authorized(headers):
+                raise HTTPError(401)
+
+            if path.startswith("/redfish/v1/SessionService/Sessions/"):
+                return self.session_member(method, path.rsplit("/", 1)[1])
+            if path == "/redfish/v1/EventService/SSE":
+                if method != "GET":
+                    raise HTTPError(405)
+                return 200, {}, EventStream()
+            if path == "/redfish/v1/EventService/Subscriptions" and method == "POST":
+                return self.create_subscription(body)
+            if path.startswith("/redfish/v1/EventService/Subscriptions/"):
+                return self.subscription_member(method, path.rsplit("/", 1)[1])
+            if path == "/redfish/v1/Systems/system/Actions/ComputerSystem.Reset":
+                if method != "POST":
+                    raise HTTPError(405)
+                return self.reset(body)
+
+            handler = self._routes.get(path)
+            if handler is None:
+                raise HTTPError(404)
+            if method not in ("GET", "HEAD"):
+                raise HTTPError(405)
+
+            query = target.partition("?")[2]
+            if query:
+                payload = self.query_payload(handler, query)
+                etag = self.etag(payload)
+            else:
+                cached = self._cache.get(path)
+                if cached is None or path in self._volatile:
+                    payload = json.dumps(handler()).encode()
+                    cached = self._cache[path] = (payload, self.etag(payload))
+                payload, etag = cached
+            if self.not_modified(headers.get("if-none-match"), etag):
+                return 304, {"ETag": etag}, None
+            return 200, {"ETag": etag}, payload if method == "GET" else None
+        except HTTPError as e:
+            return e.status, {}, self.error_body(e.message)
+
+    def authorized(self, headers):
+        token = headers.get("x-auth-token")
+        if token:
+            return token in self.sessions
+        return headers.get("authorization") == self.basic_auth
+
+    def error_body(self, message):
+        return {
+            "error": {
+                "code": "Base.1.13.0.GeneralError",
+                "message": message,
+            }
+        }
+
+    def etag(self, payload):
+        return f'"{zlib.crc32(payload):08X}"'
+
+    def not_modified(self, header, etag):
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    def query_payload(self, handler, query):
+        params = parse_qs(query, keep_blank_values=True)
+        data = handler()
+        if "$expand" in params:
+            if not self.expand_enabled:
+                raise HTTPError(400, "QueryNotSupported: $expand")
+            levels, links = self.parse_expand(params["$expand"][0])
+            data = self.expand(data, levels, links)
+        if "$select" in params:
+            names = {name.strip() for name in params["$select"][0].split(",") if name.strip()}
+            data = {key: value for key, value in data.items() if key in names or key in SELECT_ALWAYS}
+        return json.dumps(data).encode()
+
+    def parse_expand(self, value):
+        """$expand=.|*[($levels=N)] -> (уровни, раскрывать ли Links)."""
+        kind, _, rest = value.partition("(")
+        if kind not in (".", "*"):
+            raise HTTPError(400, f"Invalid $expand: {value}")
+        levels = 1
+        if rest:
+            name, _, number = rest.rstrip(")").partition("=")
+            if name != "$levels" or not number.isdigit():
+                raise HTTPError(400, f"Invalid $expand: {value}")
+            levels = int(number)
+        if not 1 <= levels <= MAX_EXPAND_LEVELS:
+            raise HTTPError(400, f"$levels вне диапазона 1-{MAX_EXPAND_LEVELS}")
+        return levels, kind == "*"
+
+    def expand(self, node, levels, links, in_links=False):
+        """Заменяет ссылки {"@odata.id": ...} на сами ресурсы (кроме Links для ".")."""
+        if isinstance(node, list):
+            return [self.expand(item, levels, links, in_links) for item in node]
+        if not isinstance(node, dict):
+            return node
+        if set(node) == {"@odata.id"}:
+            handler = self._routes.get(node["@odata.id"].rstrip("/"))
+            if handler is None or (in_links and not links):
+                return node
+            return self.expand(handler(), levels - 1, links) if levels > 1 else handler()
+        return {
+            key: self.expand(value, levels, links, in_links or key == "Links")
+            for key, value in node.items()
+        }
+
+    def invalidate(self, *paths):
+        for path in paths:
+            self._cache.pop(path, None)
+
+    def parse_json(self, body):
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Malformed JSON")
+
+    def create_session(self, body):
+        data = self.parse_json(body)
+        if (data.get("UserName"), data.get("Password")) != self.credentials:
+            raise HTTPError(401)
+
+        session_id = uuid.uuid4().hex[:10]
+        token = uuid.uuid4().hex
+        self.sessions[token] = session_id
+        self.invalidate("/redfish/v1/SessionService/Sessions")
+
+        location = f"/redfish/v1/SessionService/Sessions/{session_id}"
+        return 201, {"X-Auth-Token": token, "Location": location}, {
+            "@odata.id": location,
+            "@odata.type": "#Session.v1_5_0.Session",
+            "Id": session_id,
+            "Name": "User Session",
+            "UserName": self.credentials[0],
+        }
+
+    def session_member(self, method, session_id):
+        token = next((t for t, s in self.sessions.items() if s == session_id), None)
+        if token is None:
+            raise HTTPError(404)
+        if method == "DELETE":
+            del self.sessions[token]
+            self.invalidate("/redfish/v1/SessionService/Sessions")
+            return 200, {}, {}
+        if method == "GET":
+            return 200, {}, {
+                "@odata.id": f"/redfish/v1/SessionService/Sessions/{session_id}",
+                "@odata.type": "#Session.v1_5_0.Session",
+                "Id": session_id,
+                "UserName": self.credentials[0],
+            }
+        raise HTTPError(405)
+
+    def reset(self, body):
+        reset_type = self.parse_json(body).get("ResetType")
+        if reset_type not in RESET_TYPES:
+            raise HTTPError(400, f"Invalid ResetType: {reset_type}")
+
+        if self._transition is not None:
+            self._transition.cancel()
+            self._transition = None
+        steps = self.power_steps(reset_type)
+        if any(delay for _, delay in steps):
+            self._transition = asyncio.get_running_loop().create_task(self.power_transition(steps))
+        else:
+            for state, _ in steps:
+                self.set_power_state(state)
+        return 204, {}, None
+
+    def power_steps(self, reset_type):
+        """Последовательность (PowerState, время в нем) для ResetType."""
+        off, on = self.power_off_delay, self.power_on_delay
+        if reset_type == "ForceOff":
+            return [("PoweringOff", off / 4), ("Off", 0)]
+        if reset_type == "GracefulShutdown":
+            return [("PoweringOff", off), ("Off", 0)]
+        if reset_type in ("On", "ForceOn"):
+            if self.power_state == "On":
+                return [("On", 0)]
+            return [("PoweringOn", on), ("On", 0)]
+        shutdown = off / 4 if reset_type in ("ForceRestart", "PowerCycle") else off
+        return [("PoweringOff", shutdown), ("Off", off / 4), ("PoweringOn", on), ("On", 0)]
+
+    async def power_transition(self, steps):
+        for state, delay in steps:
+            self.set_power_state(state)
+            if delay:
+                await asyncio.sleep(delay * random.uniform(1 - POWER_JITTER, 1 + POWER_JITTER))
+        self._transition = None
+
+    def set_power_state(self, state):
+        if state == "PoweringOn":
+            self.last_reset_time = now_iso()
+        self.power_state = state
+        self.invalidate("/redfish/v1/Systems/system")
+        if state in ("On", "Off"):
+            self.publish(
+                "ResourceEvent.1.0.ResourceChanged", "/redfish/v1/Systems/system",
+                f"PowerState: {state}", [state]
+            )
+
+    def create_subscription(self, body):
+        data = self.parse_json(body)
+        destination = data.get("Destination", "")
+        if urlsplit(destination).scheme not in ("http", "https"):
+            raise HTTPError(400, f"Invalid Destination: {destination}")
+        subscription_id = uuid.uuid4().hex[:10]
+        self.subscriptions[subscription_id] = {
+            "Destination": destination,
+            "Context": data.get("Context", ""),
+            "Protocol": data.get("Protocol", "Redfish"),
+        }
+        self.invalidate("/redfish/v1/EventService/Subscriptions")
+        location = f"/redfish/v1/EventService/Subscriptions/{subscription_id}"
+        return 201, {"Location": location}, self.subscription(subscription_id)
+
+    def subscription_member(self, method, subscription_id):
+        if subscription_id not in self.subscriptions:
+            raise HTTPError(404)
+        if method == "DELETE":
+            del self.subscriptions[subscription_id]
+            self.invalidate("/redfish/v1/EventService/Subscriptions")
+            return 200, {}, {}
+        if method == "GET":
+            return 200, {}, self.subscription(subscription_id)
+        raise HTTPError(405)
+
+    def subscription(self, subscription_id):
+        return {
+            "@odata.id": f"/redfish/v1/EventService/Subscriptions/{subscription_id}",
+            "@odata.type": "#EventDestination.v1_8_0.EventDestination",
+            "Id": subscription_id,
+            "Name": "Event Subscription",
+            "EventFormatType": "Event",
+            "SubscriptionType": "RedfishEvent",
+            **self.subscriptions[subscription_id],
+        }
+
+    def publish(self, message_id, origin, message, args=()):
+        """Рассылает событие SSE-клиентам и подписчикам; вызывается из обработчика запроса."""
+        self._event_id += 1
+        event = {
+            "@odata.type": "#Event.v1_4_0.Event",
+            "Id": str(self._event_id),
+            "Name": "Event Log",
+            "Events": [{
+                "EventId": str(self._event_id),
+                "EventTimestamp": now_iso(),
+                "MessageId": message_id,
+                "Message": message,
+                "MessageArgs": list(args),
+                "OriginOfCondition": {"@odata.id": origin},
+                "Severity": "OK",
+            }],
+        }
+        data = json.dumps(event)
+        for stream in list(self.streams):
+            try:
+                stream.queue.put_nowait((self._event_id, data))
+                self.events_sent += 1
+            except asyncio.QueueFull:
+                self.events_dropped += 1
+        loop = asyncio.get_running_loop()
+        for subscription in self.subscriptions.values():
+            payload = json.dumps(dict(event, Context=subscription["Context"])).encode()
+            task = loop.create_task(self.deliver(subscription["Destination"], payload))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def deliver(self, destination, payload):
+        url = urlsplit(destination)
+        secure = url.scheme == "https"
+        context = None
+        if secure:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(url.hostname, url.port or (443 if secure else 80), ssl=context), 5
+            )
+            head = (
+                f"POST {url.path or '/'} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + payload)
+            await writer.drain()
+            await asyncio.wait_for(reader.readline(), 5)
+            writer.close()
+            self.events_sent += 1
+        except (OSError, asyncio.TimeoutError, ssl.SSLError):
+            self.events_dropped += 1
+
+    def get_redfish(self):
+        return {"v1": "/redfish/v1/"}
+
+    def get_service_root(self):
+        return {
+            "@odata.id": "/redfish/v1",
+            "@odata.type": "#ServiceRoot.v1_15_0.ServiceRoot",
+            "Id": "RootService",
+            "Name": "Root Service",
+            "RedfishVersion": "1.17.0",
+            "UUID": "00000000-0000-0000-0000-000000000000",
+            "Chassis": {"@odata.id": "/redfish/v1/Chassis"},
+            "SessionService": {"@odata.id": "/redfish/v1/SessionService"},
+            "EventService": {"@odata.id": "/redfish/v1/EventService"},
+            "Systems": {"@odata.id": "/redfish/v1/Systems"},
+            "Managers": {"@odata.id": "/redfish/v1/Managers"},
+            "UpdateService": {"@odata.id": "/redfish/v1/UpdateService"},
+            "AccountService": {"@odata.id": "/redfish/v1/AccountService"},
+            "ProtocolFeaturesSupported": {
+                "ExpandQuery": {
+                    "ExpandAll": self.expand_enabled,
+                    "Levels": self.expand_enabled,
+                    "MaxLevels": MAX_EXPAND_LEVELS if self.expand_enabled else 0,
+                    "Links": self.expand_enabled,
+                    "NoLinks": self.expand_enabled,
+                },
+                "SelectQuery": True,
+                "FilterQuery": False,
+                "OnlyMemberQuery": False,
+                "ExcerptQuery": False,
+            },
+            "Links": {
+                "Sessions": {"@odata.id": "/redfish/v1/SessionService/Sessions"}
+            },
+        }
+
+    def get_session_service(self):
+        return {
+            "@odata.id": "/redfish/v1/SessionService",
+            "@odata.type": "#SessionService.v1_0_2.SessionService",
+            "Id": "SessionService",
+            "Name": "Session Service",
+            "ServiceEnabled": True,
+            "SessionTimeout": 1800,
+            "Sessions": {"@odata.id": "/redfish/v1/SessionService/Sessions"},
+        }
+
+    def get_sessions(self):
+        members = [
+            {"@odata.id": f"/redfish/v1/SessionService/Sessions/{session_id}"}
+            for session_id in self.sessions.values()
+        ]
+        return {
+            "@odata.id": "/redfish/v1/SessionService/Sessions",
+            "@odata.type": "#SessionCollection.SessionCollection",
+            "Name": "Session Collection",
+            "Members": members,
+            "Members@odata.count": len(members),
+        }
+
+    def get_event_service(self):
+        return {
+            "@odata.id": "/redfish/v1/EventService",
+            "@odata.type": "#EventService.v1_10_0.EventService",
+            "Id": "EventService",
+            "Name": "Event Service",
+            "ServiceEnabled": True,
+            "DeliveryRetryAttempts": 3,
+            "EventFormatTypes": ["Event"],
+            "ServerSentEventUri": "/redfish/v1/EventService/SSE",
+            "Subscriptions": {"@odata.id": "/redfish/v1/EventService/Subscriptions"},
+        }
+
+    def get_subscriptions(self):
+        members = [
+            {"@odata.id": f"/redfish/v1/EventService/Subscriptions/{subscription_id}"}
+            for subscription_id in self.subscriptions
+        ]
+        return {
+            "@odata.id": "/redfish/v1/EventService/Subscriptions",
+            "@odata.type": "#EventDestinationCollection.EventDestinationCollection",
+            "Name": "Event Subscriptions Collection",
+            "Members": members,
+            "Members@odata.count": len(members),
+        }
+
+    def get_systems(self):
+        return {
+            "@odata.id": "/redfish/v1/Systems",
+            "@odata.type": "#ComputerSystemCollection.ComputerSystemCollection",
+            "Name": "Computer System Collection",
+            "Members": [{"@odata.id": "/redfish/v1/Systems/system"}],
+            "Members@odata.count": 1,
+        }
+
+    def get_system(self):
+        return {
+            "@odata.id": "/redfish/v1/Systems/system",
+            "@odata.type": "#ComputerSystem.v1_16_0.ComputerSystem",
+            "Id": "system",
+            "Name": "system",
+            "SystemType": "Physical",
+            "PowerState": self.power_state,
+            "LastResetTime": self.last_reset_time,
+            "Status": {"Health": "OK", "State": "Enabled"},
+            "Processors": {"@odata.id": "/redfish/v1/Systems/system/Processors"},
+            "Memory": {"@odata.id": "/redfish/v1/Systems/system/Memory"},
+            "LogServices": {"@odata.id": "/redfish/v1/Systems/system/LogServices"},
+            "Links": {
+                "Chassis": [{"@odata.id": "/redfish/v1/Chassis/chassis"}],
+                "ManagedBy": [{"@odata.id": "/redfish/v1/Managers/bmc"}],
+            },
+            "Actions": {
+                "#ComputerSystem.Reset": {
+                    "target": "/redfish/v1/Systems/system/Actions/ComputerSystem.Reset",
+                    "ResetType@Redfish.AllowableValues": RESET_TYPES,
+                }
+            },
+        }
+
+    def get_chassis_collection(self):
+        return {
+            "@odata.id": "/redfish/v1/Chassis",
+            "@odata.type": "#ChassisCollection.ChassisCollection",
+            "Name": "Chassis Collection",
+            "Members": [{"@odata.id": "/redfish/v1/Chassis/chassis"}],
+            "Members@odata.count": 1,
+        }
+
+    def get_chassis(self):
+        return {
+            "@odata.id": "/redfish/v1/Chassis/chassis",
+            "@odata.type": "#Chassis.v1_22_0.Chassis",
+            "Id": "chassis",
+            "Name": "chassis",
+            "ChassisType": "RackMount",
+            "PowerState": self.power_state,
+            "Status": {"Health": "OK", "State": "Enabled"},
+            "Thermal": {"@odata.id": "/redfish/v1/Chassis/chassis/Thermal"},
+            "ThermalSubSystem": {
+                "@odata.id": "/redfish/v1/Chassis/chassis/ThermalSubSystem"
+            },
+            "Sensors": {"@odata.id": "/redfish/v1/Chassis/chassis/Sensors"},
+            "Links": {
+                "ComputerSystems": [{"@odata.id": "/redfish/v1/Systems/system"}],
+                "ManagedBy": [{"@odata.id": "/redfish/v1/Managers/bmc"}],
+            },
+        }
+
+    def sensor_reading(self, index):
+        """Показание меняется раз в SENSOR_UPDATE с; с sensor_fault_rate - выброс в 10 раз."""
+        kind = SENSOR_KINDS[self.sensors[index][1]]
+        base = kind[2] + (index % 4) * 5 if kind[1] == "Cel" else kind[2]
+        if self.sensor_fault_rate and random.random() < self.sensor_fault_rate:
+            return base * 10
+        tick = int(time.time() / SENSOR_UPDATE)
+        return round(base + kind[3] * math.sin(2 * math.pi * tick / SENSOR_PERIOD + index), 1)
+
+    def sensor_indexes(self, kind, limit=4):
+        return [index for index, (_, name) in enumerate(self.sensors) if name == kind][:limit]
+
+    def temperatures(self):
+        sensors = []
+        for number, index in enumerate(self.sensor_indexes("temperature")):
+            name = self.sensors[index][0].split("_", 1)[1]
+            sensors.append({
+                "@odata.id": f"/redfish/v1/Chassis/chassis/Thermal#/Temperatures/{number}",
+                "MemberId": name,
+                "Name": name,
+                "ReadingCelsius": self.sensor_reading(index),
+                "UpperThresholdCritical": SENSOR_KINDS["temperature"][5],
+                "Status": {"Health": "OK", "State": "Enabled"},
+            })
+        return sensors
+
+    def fans(self):
+        fans = []
+        for number, index in enumerate(self.sensor_indexes("fan_tach")):
+            name = self.sensors[index][0].rsplit("_", 1)[1]
+            fans.append({
+                "@odata.id": f"/redfish/v1/Chassis/chassis/Thermal#/Fans/{number}",
+                "MemberId": name,
+                "Name": name,
+                "Reading": self.sensor_reading(index),
+                "ReadingUnits": "RPM",
+                "LowerThresholdCritical": SENSOR_KINDS["fan_tach"][4],
+                "Status": {"Health": "OK", "State": "Enabled"},
+            })
+        return fans
+
+    def get_sensor(self, index):
+        name, kind = self.sensors[index]
+        reading_type, units, _, _, lower, upper = SENSOR_KINDS[kind]
+        thresholds = {}
+        if lower is not None:
+            thresholds["LowerCritical"] = {"Reading": lower}
+        if upper is not None:
+            thresholds["UpperCritical"] = {"Reading": upper}
+        return {
+            "@odata.id": f"/redfish/v1/Chassis/chassis/Sensors/{name}",
+            "@odata.type": "#Sensor.v1_2_0.Sensor",
+            "Id": name,
+            "Name": name,
+            "Reading": self.sensor_reading(index),
+            "ReadingType": reading_type,
+            "ReadingUnits": units,
+            "Thresholds": thresholds,
+            "Status": {"Health": "OK", "State": "Enabled"},
+        }
+
+    def get_thermal_subsystem(self):
+        # Настоящий bmcweb отдает показания через ThermalMetrics, но тесты
+        # ждут массив Temperatures от первого доступного endpoint.
+        return {
+            "@odata.id": "/redfish/v1/Chassis/chassis/ThermalSubSystem",
+            "@odata.type": "#ThermalSubSystem.v1_0_0.ThermalSubSystem",
+            "Id": "ThermalSubSystem",
+            "Name": "Thermal Subsystem",
+            "Status": {"Health": "OK", "State": "Enabled"},
+            "Temperatures": self.temperatures(),
+        }
+
+    def get_thermal(self):
+        return {
+            "@odata.id": "/redfish/v1/Chassis/chassis/Thermal",
+            "@odata.type": "#Thermal.v1_7_0.Thermal",
+            "Id": "Thermal",
+            "Name": "Thermal",
+            "Temperatures": self.temperatures(),
+            "Fans": self.fans(),
+        }
+
+    def static_resources(self):
+        """Остальное дерево bmcweb: коллекции и ресурсы, которые не меняются."""
+        routes = {}
+
+        def add(path, odata_type, **fields):
+            resource = {"@odata.id": path, "@odata.type": odata_type, **fields}
+            routes[path] = lambda: resource
+
+        def add_collection(path, odata_type, name, members):
+            add(path, odata_type, Name=name,
+                Members=[{"@odata.id": member} for member in members],
+                **{"Members@odata.count": len(members)})
+
+        system = "/redfish/v1/Systems/system"
+        add_collection(f"{system}/Processors", "#ProcessorCollection.ProcessorCollection",
+                       "Processor Collection", [f"{system}/Processors/cpu{i}" for i in range(2)])
+        for i in range(2):
+            add(f"{system}/Processors/cpu{i}", "#Processor.v1_18_0.Processor", Id=f"cpu{i}",
+                Name=f"cpu{i}", ProcessorType="CPU", TotalCores=8, Status={"Health": "OK", "State": "Enabled"})
+        add_collection(f"{system}/Memory", "#MemoryCollection.MemoryCollection",
+                       "Memory Module Collection", [f"{system}/Memory/dimm{i}" for i in range(4)])
+        for i in range(4):
+            add(f"{system}/Memory/dimm{i}", "#Memory.v1_17_0.Memory", Id=f"dimm{i}", Name=f"dimm{i}",
+                CapacityMiB=16384, MemoryDeviceType="DDR4", Status={"Health": "OK", "State": "Enabled"})
+        self.add_log_service(add, add_collection, f"{system}/LogServices", "EventLog", LOG_ENTRIES)
+
+        chassis = "/redfish/v1/Chassis/chassis"
+        add_collection(f"{chassis}/Sensors", "#SensorCollection.SensorCollection", "Sensors",
+                       [f"{chassis}/Sensors/{name}" for name, _ in self.sensors])
+        for index, (name, _) in enumerate(self.sensors):
+            routes[f"{chassis}/Sensors/{name}"] = functools.partial(self.get_sensor, index)
+            self._volatile.add(f"{chassis}/Sensors/{name}")
+
+        manager = "/redfish/v1/Managers/bmc"
+        add_collection("/redfish/v1/Managers", "#ManagerCollection.ManagerCollection",
+                       "Manager Collection", [manager])
+        add(manager, "#Manager.v1_14_0.Manager", Id="bmc", Name="OpenBmc Manager", ManagerType="BMC",
+            FirmwareVersion="2.14.0-dev", Status={"Health": "OK", "State": "Enabled"},
+            NetworkProtocol={"@odata.id": f"{manager}/NetworkProtocol"},
+            EthernetInterfaces={"@odata.id": f"{manager}/EthernetInterfaces"},
+            LogServices={"@odata.id": f"{manager}/LogServices"},
+            Links={
+                "ManagerForServers": [{"@odata.id": system}],
+                "ManagerForChassis": [{"@odata.id": chassis}],
+            })
+        add(f"{manager}/NetworkProtocol", "#ManagerNetworkProtocol.v1_9_0.ManagerNetworkProtocol",
+            Id="NetworkProtocol", Name="Manager Network Protocol", HostName="romulus",
+            HTTPS={"Port": 443, "ProtocolEnabled": True}, SSH={"Port": 22, "ProtocolEnabled": True})
+        add_collection(f"{manager}/EthernetInterfaces",
+                       "#EthernetInterfaceCollection.EthernetInterfaceCollection",
+                       "Ethernet Network Interface Collection", [f"{manager}/EthernetInterfaces/eth0"])
+        add(f"{manager}/EthernetInterfaces/eth0", "#EthernetInterface.v1_9_0.EthernetInterface",
+            Id="eth0", Name="Manager Ethernet Interface", MACAddress="52:54:00:12:34:56",
+            IPv4Addresses=[{"Address": "10.0.2.15", "AddressOrigin": "DHCP", "SubnetMask": "255.255.255.0"}])
+        self.add_log_service(add, add_collection, f"{manager}/LogServices", "Journal", JOURNAL_ENTRIES)
+
+        update = "/redfish/v1/UpdateService"
+        firmware = ("bmc_active", "bios_active")
+        add(update, "#UpdateService.v1_11_1.UpdateService", Id="UpdateService", Name="Update Service",
+            ServiceEnabled=True, HttpPushUri="/redfish/v1/UpdateService/update",
+            FirmwareInventory={"@odata.id": f"{update}/FirmwareInventory"})
+        add_collection(f"{update}/FirmwareInventory",
+                       "#SoftwareInventoryCollection.SoftwareInventoryCollection",
+                       "Software Inventory Collection", [f"{update}/FirmwareInventory/{name}" for name in firmware])
+        for name in firmware:
+            add(f"{update}/FirmwareInventory/{name}", "#SoftwareInventory.v1_1_0.SoftwareInventory",
+                Id=name, Name="Software Inventory", Updateable=True, Version="2.14.0-dev",
+                Status={"Health": "OK", "State": "Enabled"})
+
+        account = "/redfish/v1/AccountService"
+        roles = ("Administrator", "Operator", "ReadOnly")
+        add(account, "#AccountService.v1_10_0.AccountService", Id="AccountService",
+            Name="Account Service", ServiceEnabled=True, MaxPasswordLength=20, MinPasswordLength=8,
+            Accounts={"@odata.id": f"{account}/Accounts"}, Roles={"@odata.id": f"{account}/Roles"})
+        add_collection(f"{account}/Accounts", "#ManagerAccountCollection.ManagerAccountCollection",
+                       "Accounts Collection", [f"{account}/Accounts/{self.credentials[0]}"])
+        add(f"{account}/Accounts/{self.credentials[0]}", "#ManagerAccount.v1_4_0.ManagerAccount",
+            Id=self.credentials[0], Name="User Account", UserName=self.credentials[0], RoleId="Administrator",
+            Enabled=True, Links={"Role": {"@odata.id": f"{account}/Roles/Administrator"}})
+        add_collection(f"{account}/Roles", "#RoleCollection.RoleCollection", "Roles Collection",
+                       [f"{account}/Roles/{role}" for role in roles])
+        for role in roles:
+            add(f"{account}/Roles/{role}", "#Role.v1_2_2.Role", Id=role, Name="User Role",
+                RoleId=role, IsPredefined=True)
+        return routes
+
+    def add_log_service(self, add, add_collection, path, service, count):
+        """LogServices с одной службой; записи, как в bmcweb, целиком входят в Members."""
+        add_collection(path, "#LogServiceCollection.LogServiceCollection",
+                       "System Log Services Collection", [f"{path}/{service}"])
+        add(f"{path}/{service}", "#LogService.v1_2_0.LogService", Id=service, Name=f"{service} Log Service",
+            OverWritePolicy="WrapsWhenFull", Entries={"@odata.id": f"{path}/{service}/Entries"})
+        entries = []
+        for index in range(1, count + 1):
+            entry = {
+                "@odata.id": f"{path}/{service}/Entries/{index}",
+                "@odata.type": "#LogEntry.v1_9_0.LogEntry",
+                "Id": str(index),
+                "Name": f"{service} Log Entry",
+                "EntryType": "Event",
+                "Severity": "OK",
+                "Message": f"Message {index}",
+                "Created": "2024-01-01T00:00:00+00:00",
+            }
+            entries.append(entry)
+            add(entry["@odata.id"], entry["@odata.type"], **{
+                key: value for key, value in entry.items() if not key.startswith("@odata.")
+            })
+        add(f"{path}/{service}/Entries", "#LogEntryCollection.LogEntryCollection",
+            Name=f"{service} Log Entries", Members=entries, **{"Members@odata.count": count})
+
+
+def generate_self_signed_cert(directory=None):
+    """Создает самоподписанный сертификат через openssl, возвращает (cert, key)."""
+    directory = directory or tempfile.mkdtemp(prefix="redfish-mock-")
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    if not (os.path.exists(certfile) and os.path.exists(keyfile)):
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+             "-keyout", keyfile, "-out", certfile, "-days", "30",
+             "-subj", "/CN=localhost"],
+            check=True, capture_output=True
+        )
+    return certfile, keyfile
+
+
+def make_ssl_context(certfile, keyfile):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def parse_route_latency(values):
+    routes = {}
+    for item in values or []:
+        path, _, ms = item.rpartition("=")
+        if not path:
+            raise argparse.ArgumentTypeError(f"Ожидается PATH=MS: {item}")
+        routes[path.rstrip("/")] = float(ms) / 1000
+    return routes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Redfish mock для тестов OpenBMC")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2443)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="средняя задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="стандартное отклонение задержки, мс")
+    parser.add_argument("--route-latency", action="append", metavar="PATH=MS",
+                        help="задержка для конкретного пути, можно повторять")
+    parser.add_argument("--power-off-delay", type=float, default=0.0,
+                        help="время GracefulShutdown в PoweringOff, с (Force* - четверть)")
+    parser.add_argument("--power-on-delay", type=float, default=0.0,
+                        help="время включения в PoweringOn, с")
+    parser.add_argument("--sensors", type=int, default=len(BASE_SENSORS),
+                        help="число датчиков в Chassis/chassis/Sensors")
+    parser.add_argument("--sensor-fault-rate", type=float, default=0.0,
+                        help="доля показаний с выбросом (0-1)")
+    parser.add_argument("--no-expand", action="store_true",
+                        help="без $expand, как bmcweb без insecure-enable-redfish-query")
+    parser.add_argument("--tls", action="store_true",
+                        help="HTTPS с самоподписанным сертификатом")
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args(argv)
+
+    ssl_context = None
+    if args.certfile and args.keyfile:
+        ssl_context = make_ssl_context(args.certfile, args.keyfile)
+    elif args.tls:
+        ssl_context = make_ssl_context(*generate_self_signed_cert())
+
+    mock = RedfishMock(
+        host=args.host,
+        port=args.port,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        route_latency=parse_route_latency(args.route_latency),
+        ssl_context=ssl_context,
+        power_off_delay=args.power_off_delay,
+        power_on_delay=args.power_on_delay,
+        expand=not args.no_expand,
+        sensors=args.sensors,
+        sensor_fault_rate=args.sensor_fault_rate,
+    )
+
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
+    async def run():
+        await mock.start()
+        print(f"Redfish mock слушает {mock.base_url}", flush=True)
+        started = time.time()
+        try:
+            await mock.serve_forever()
+        finally:
+            elapsed = time.time() - started
+            print(f"Обработано запросов: {mock.requests_served} за {elapsed:.1f} с, "
+                  f"событий доставлено: {mock.events_sent}, потеряно: {mock.events_dropped}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Проверка ответов под нагрузкой без разбора и print на каждый запрос.
+
+Проверки собираются один раз при импорте в список замыканий, поэтому на
+запрос остается только json.loads и обход уже разобранных путей. Тело
+проверяется у доли ответов --validate-sample (по умолчанию 10%), у
+остальных смотрится только HTTP-статус. Ошибка проверки помечает
+запрос в Locust как failure, а подробности уходят в логгер через
+QueueHandler, так что запись в stdout/файл не тормозит пользователей:
+
+    with self.client.get(path, name=name, catch_response=True) as response:
+        response_checks.validate(response, response_checks.SYSTEM)
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+
+SAMPLE_RATE = float(os.environ.get("OPENBMC_VALIDATE_SAMPLE", 0.1))
+LOG_FILE = os.environ.get("OPENBMC_VALIDATE_LOG")
+POWER_STATES = ("On", "Off", "PoweringOn", "PoweringOff", "Paused")
+REDFISH_REQUIRED = ("@odata.id", "@odata.type")
+
+logger = logging.getLogger("openbmc.validation")
+logger.propagate = False
+
+_sample_rate = SAMPLE_RATE
+_listener = None
+
+
+class Check:
+    """Скомпилированная проверка: список функций data -> сообщение об ошибке или None."""
+
+    def __init__(self, name, required=(), enums=None, ranges=None):
+        self.name = name
+        self._rules = []
+        for path in required:
+            self._rules.append(_required_rule(path, _compile_path(path)))
+        for path, allowed in (enums or {}).items():
+            self._rules.append(_enum_rule(path, _compile_path(path), frozenset(allowed)))
+        for path, (low, high) in (ranges or {}).items():
+            self._rules.append(_range_rule(path, _compile_path(path), low, high))
+
+    def __call__(self, data):
+        if not isinstance(data, dict):
+            return f"{self.name}: ожидался JSON-объект"
+        for rule in self._rules:
+            error = rule(data)
+            if error:
+                return f"{self.name}: {error}"
+        return None
+
+
+_MISSING = object()
+_PATH_TOKEN = re.compile(r"([^.\[\]]*@odata\.[^.\[\]]+|[^.\[\]]+)|\[(\d*)\]")
+
+
+def _compile_path(path):
+    """"a.b[].c" и "a[0].b" в список шагов; [] - по всем элементам списка.
+
+    Аннотации вида "@odata.id" и "Members@odata.count" - один ключ.
+    """
+    return [
+        key if key else (int(index) if index else None)
+        for key, index in _PATH_TOKEN.findall(path)
+    ]
+
+
+def _resolve(data, steps):
+    values = [data]
+    for step in steps:
+        resolved = []
+        for value in values:
+            if step is None:
+                if isinstance(value, list):
+                    resolved.extend(value)
+            elif isinstance(step, int):
+                if isinstance(value, list) and -len(value) <= step < len(value):
+                    resolved.append(value[step])
+                else:
+                    resolved.append(_MISSING)
+            elif isinstance(value, dict):
+                resolved.append(value.get(step, _MISSING))
+            else:
+                resolved.append(_MISSING)
+        values = resolved
+    return values
+
+
+def _required_rule(path, steps):
+    def rule(data):
+        values = _resolve(data, steps)
+        if not values or any(v is _MISSING or v is None for v in values):
+            return f"нет поля {path}"
+    return rule
+
+
+def _enum_rule(path, steps, allowed):
+    def rule(data):
+        for value in _resolve(data, steps):
+            if value is not _MISSING and value not in allowed:
+                return f"{path}={value!r} не из {sorted(allowed)}"
+    return rule
+
+
+def _range_rule(path, steps, low, high):
+    def rule(data):
+        for value in _resolve(data, steps):
+            if value is _MISSING or value is None:
+                continue
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return f"{path}={value!r} не число"
+            if not low <= number <= high:
+                return f"{path}={number:g} вне диапазона [{low}, {high}]"
+    return rule
+
+
+SYSTEM = Check(
+    "System",
+    required=REDFISH_REQUIRED + ("Id",),
+    enums={"PowerState": POWER_STATES},
+)
+THERMAL = Check(
+    "ThermalSubSystem",
+    required=REDFISH_REQUIRED,
+    ranges={"Temperatures[].ReadingCelsius": (-20, 120)},
+)
+RESOURCE = Check("Resource", required=REDFISH_REQUIRED)
+SESSION_SERVICE = Check("SessionService", required=REDFISH_REQUIRED + ("Sessions.@odata.id",))
+WEATHER = Check(
+    "wttr.in",
+    required=("current_condition[0].temp_C",),
+    ranges={"current_condition[0].temp_C": (-80, 60)},
+)
+
+
+def sampled(rate=None):
+    rate = _sample_rate if rate is None else rate
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def validate(response, check, rate=None):
+    """Проверяет ответ из with-блока catch_response=True; возвращает разобранный JSON или None.
+
+    Статус проверяется всегда, тело - с вероятностью rate. Ошибка
+    соединения (SSL, таймаут) тоже помечает запрос failure: response.ok
+    в этом случае пробросил бы сохраненное исключение из задачи.
+    """
+    error = getattr(response, "error", None)
+    if error is not None:
+        response.failure(str(error) or type(error).__name__)
+        return None
+    if not response.ok:
+        response.failure(f"HTTP {response.status_code}")
+        return None
+    if not sampled(rate):
+        return None
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        response.failure(f"{check.name}: ответ не JSON")
+        logger.warning("%s %s: ответ не JSON", response.request.method, response.url)
+        return None
+    error = check(data)
+    if error:
+        response.failure(error)
+        logger.warning("%s %s: %s", response.request.method, response.url, error)
+        return None
+    return data
+
+
+def start_logging(path=LOG_FILE):
+    """Обработчик логгера в отдельном потоке; пользователи только кладут запись в очередь."""
+    global _listener
+    if _listener is not None:
+        return
+    target = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+    target.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(records, target)
+    _listener.start()
+
+
+def stop_logging():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--validate-sample", type=float, default=SAMPLE_RATE, env_var="OPENBMC_VALIDATE_SAMPLE",
+        help="Доля ответов, тело которых проверяется (0-1)",
+    )
+    parser.add_argument(
+        "--validate-log", default=LOG_FILE, env_var="OPENBMC_VALIDATE_LOG",
+        help="Файл для диагностики проверок, по умолчанию stderr",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, **kwargs):
+    global _sample_rate
+    options = environment.parsed_options
+    rate = getattr(options, "validate_sample", None)
+    _sample_rate = SAMPLE_RATE if rate is None else rate
+    start_logging(getattr(options, "validate_log", None) or LOG_FILE)
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    global _sample_rate
+    if isinstance(environment.runner, WorkerRunner):
+        rate = getattr(environment.parsed_options, "validate_sample", None)
+        if rate is not None:
+            _sample_rate = rate
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    stop_logging()
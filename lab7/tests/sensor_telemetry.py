@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""Телеметрия датчиков BMC под нагрузкой.
+
+test_api_thermal_sensors читает Temperatures один раз, а задача
+get_thermal_data нагрузочного теста ответ не разбирает, поэтому
+застывшие показания, дрожание опроса и выбросы под нагрузкой не видны.
+SensorTelemetry раз в --telemetry-interval секунд параллельно
+опрашивает коллекции датчиков (--telemetry-sources, по умолчанию
+Chassis/chassis/Sensors и Chassis/chassis/Thermal). Коллекция Sensors
+читается одним запросом с $expand, если служба его объявляет, иначе ее
+члены запрашиваются параллельно.
+
+Показания пишутся в заранее выделенные кольцевые буферы NumPy (строка -
+датчик, столбец - опрос), а проверки раз в BATCH опросов идут
+векторными операциями сразу по всем датчикам:
+
+    диапазон      вне критических порогов датчика (без порогов - RANGES по единицам)
+    скорость      |dV/dt| выше RATE_LIMITS по единицам, dt не меньше RATE_WINDOW
+    устаревание   сколько секунд показание не менялось
+    пропуски      датчик уже был, а показания нет (Reading null или ошибка запроса)
+
+В отчет идут сводка опроса (интервал, дрожание, латентность, просрочки)
+и датчики с нарушениями.
+
+    locust -f lab7/tests/locustfile.py --headless --telemetry-interval 0.5
+    python lab7/tests/sensor_telemetry.py --url https://localhost:2443 --interval 0.5 --duration 60
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gevent
+import numpy as np
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+import bmc_farm
+import redfish_crawler
+
+SOURCES = ("/redfish/v1/Chassis/chassis/Sensors", "/redfish/v1/Chassis/chassis/Thermal")
+INTERVAL = float(os.environ.get("OPENBMC_TELEMETRY_INTERVAL", 0))
+SOURCES_LIST = os.environ.get("OPENBMC_TELEMETRY_SOURCES", ",".join(SOURCES))
+STALE_AFTER = float(os.environ.get("OPENBMC_TELEMETRY_STALE", 60))
+CAPACITY = 1200
+BATCH = 10
+WORKERS = 16
+INITIAL_SENSORS = 64
+TIMEOUT = 10
+RATE_WINDOW = 1.0
+REPORT_SENSORS = 20
+LOAD_SUITE = "load"
+RANGES = {
+    "Cel": (-20.0, 120.0),
+    "RPM": (0.0, 30000.0),
+    "V": (0.0, 60.0),
+    "A": (0.0, 500.0),
+    "W": (0.0, 5000.0),
+    "%": (0.0, 100.0),
+}
+RATE_LIMITS = {"Cel": 5.0, "RPM": 3000.0, "V": 2.0, "A": 50.0, "W": 1000.0, "%": 50.0}
+ARRAYS = (
+    ("Temperatures", "ReadingCelsius", "Cel"),
+    ("Fans", "Reading", "RPM"),
+    ("Voltages", "ReadingVolts", "V"),
+)
+# Буферы по датчикам: имя, начальное значение, тип; values и times - матрицы датчик x опрос.
+SENSOR_FIELDS = (
+    ("values", np.nan, np.float32),
+    ("times", np.nan, np.float64),
+    ("low", -np.inf, np.float64),
+    ("high", np.inf, np.float64),
+    ("rate_limit", np.inf, np.float64),
+    ("first_seen", np.nan, np.float64),
+    ("last_change", -np.inf, np.float64),
+    ("max_age", 0.0, np.float64),
+    ("peak_rate", 0.0, np.float64),
+    ("samples", 0, np.int64),
+    ("missing", 0, np.int64),
+    ("out_of_range", 0, np.int64),
+    ("spikes", 0, np.int64),
+)
+MATRIX_FIELDS = ("values", "times")
+
+
+class TelemetryError(Exception):
+    pass
+
+
+def _first(*values):
+    return next((value for value in values if value is not None), None)
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def _limits(item, units):
+    low, high = RANGES.get(units, (-np.inf, np.inf))
+    thresholds = item.get("Thresholds") or {}
+    return (
+        _first((thresholds.get("LowerCritical") or {}).get("Reading"), item.get("LowerThresholdCritical"), low),
+        _first((thresholds.get("UpperCritical") or {}).get("Reading"), item.get("UpperThresholdCritical"), high),
+    )
+
+
+def _sensor(data):
+    units = data.get("ReadingUnits") or ""
+    return (data["@odata.id"], data.get("Reading"), units, *_limits(data, units))
+
+
+def parse_readings(data):
+    """[(id, показание, единицы, нижний, верхний порог)] из Sensor, Sensors с $expand или Thermal."""
+    readings = []
+    if "Reading" in data and "@odata.id" in data:
+        readings.append(_sensor(data))
+    for member in data.get("Members") or ():
+        if isinstance(member, dict) and "Reading" in member and "@odata.id" in member:
+            readings.append(_sensor(member))
+    for key, field, default_units in ARRAYS:
+        for item in data.get(key) or ():
+            units = item.get("ReadingUnits") or default_units
+            sensor = item.get("@odata.id") or f"{data.get('@odata.id')}#/{key}/{item.get('MemberId')}"
+            readings.append((sensor, item.get(field), units, *_limits(item, units)))
+    return readings
+
+
+def new_session(workers=WORKERS):
+    session = redfish_crawler.new_session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class SensorTelemetry:
+    """Опрос датчиков в кольцевые буферы NumPy и пакетная векторная проверка."""
+
+    def __init__(self, session, base_url, sources=SOURCES, interval=1.0, capacity=CAPACITY,
+                 workers=WORKERS, stale_after=STALE_AFTER):
+        if capacity <= BATCH:
+            raise ValueError(f"capacity должна быть больше {BATCH}")
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.sources = list(sources)
+        self.interval = interval
+        self.capacity = capacity
+        self.stale_after = stale_after
+        self.expand = None
+        self.ids = []
+        self.units = []
+        self._rows = {}
+        self._layouts = {}
+        self._members = {}
+        self._expanded = set()
+        self._rows_allocated = 0
+        self._allocate(INITIAL_SENSORS)
+        self.poll_started = np.full(capacity, np.nan)
+        self.poll_latency = np.full(capacity, np.nan)
+        self.head = 0
+        self.count = 0
+        self.pending = 0
+        self.polls = 0
+        self.overruns = 0
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._stop = threading.Event()
+        self._greenlet = None
+
+    def _allocate(self, rows):
+        for name, fill, dtype in SENSOR_FIELDS:
+            shape = (rows, self.capacity) if name in MATRIX_FIELDS else (rows,)
+            array = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+        self._rows_allocated = rows
+
+    def _add_sensor(self, sensor, units, low, high, now):
+        row = len(self.ids)
+        if row == self._rows_allocated:
+            self._allocate(self._rows_allocated * 2)
+        self.ids.append(sensor)
+        self.units.append(units)
+        self._rows[sensor] = row
+        self.low[row] = _number(low) if low is not None else -np.inf
+        self.high[row] = _number(high) if high is not None else np.inf
+        self.rate_limit[row] = RATE_LIMITS.get(units, np.inf)
+        self.first_seen[row] = now
+        return row
+
+    def _rows_for(self, path, readings, now):
+        """Строки датчиков ответа; раскладка ответа path запоминается между опросами."""
+        ids = [reading[0] for reading in readings]
+        layout = self._layouts.get(path)
+        if layout is not None and layout[0] == ids:
+            return layout[1]
+        rows = np.empty(len(readings), dtype=np.intp)
+        for i, (sensor, _, units, low, high) in enumerate(readings):
+            row = self._rows.get(sensor)
+            rows[i] = self._add_sensor(sensor, units, low, high, now) if row is None else row
+        self._layouts[path] = (ids, rows)
+        return rows
+
+    def detect_expand(self):
+        try:
+            response = self.session.get(f"{self.base_url}{redfish_crawler.ROOT}", timeout=TIMEOUT)
+            self.expand = response.status_code == 200 and redfish_crawler.supports_expand(response.json())
+        except (ValueError, requests.RequestException):
+            self.expand = False
+        return self.expand
+
+    def _paths(self):
+        paths = []
+        for source in self.sources:
+            paths.extend(self._members.get(source, (source,)))
+        return paths
+
+    def _discover(self, path, data):
+        """Коллекция из одних ссылок: дальше $expand или параллельный опрос членов."""
+        members = data.get("Members")
+        if not members or not all(isinstance(m, dict) and set(m) == {"@odata.id"} for m in members):
+            return
+        if self.expand and path not in self._expanded:
+            self._expanded.add(path)
+        else:
+            self._members[path] = [member["@odata.id"] for member in members]
+
+    def _fetch(self, path):
+        url = f"{self.base_url}{path}"
+        if path in self._expanded:
+            url += f"?$expand={redfish_crawler.EXPAND}"
+        try:
+            response = self.session.get(url, timeout=TIMEOUT)
+            arrived = time.time()
+            if response.status_code != 200:
+                raise TelemetryError(f"HTTP {response.status_code}")
+            data = json.loads(response.content)
+        except (TelemetryError, ValueError, requests.RequestException):
+            with self._lock:
+                self.errors[path] = self.errors.get(path, 0) + 1
+            return path, None, None
+        return path, arrived, data
+
+    def poll(self):
+        """Один опрос всех источников в следующий столбец буфера; возвращает длительность, с."""
+        if self.expand is None:
+            self.detect_expand()
+        started = time.time()
+        column = self.head
+        self.values[:, column] = np.nan
+        self.times[:, column] = np.nan
+        for path, arrived, data in self._pool.map(self._fetch, self._paths()):
+            if data is None:
+                continue
+            if path in self.sources:
+                self._discover(path, data)
+            readings = parse_readings(data)
+            if not readings:
+                continue
+            rows = self._rows_for(path, readings, arrived)
+            self.values[rows, column] = [_number(reading[1]) for reading in readings]
+            self.times[rows, column] = arrived
+        latency = time.time() - started
+        self.poll_started[column] = started
+        self.poll_latency[column] = latency
+        self.head = (column + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.polls += 1
+        self.pending += 1
+        if latency > self.interval:
+            self.overruns += 1
+        if self.pending >= BATCH:
+            self.check()
+        return latency
+
+    def _columns(self, count, extra=0):
+        return (self.head - count - extra + np.arange(count + extra)) % self.capacity
+
+    def ages(self, now):
+        n = len(self.ids)
+        reference = np.where(self.last_change[:n] > -np.inf, self.last_change[:n], self.first_seen[:n])
+        return now - reference
+
+    def check(self):
+        """Проверяет столбцы, записанные после прошлой проверки, сразу по всем датчикам."""
+        k, n = self.pending, len(self.ids)
+        self.pending = 0
+        if not k or not n:
+            return
+        extra = 1 if self.count > k else 0
+        columns = self._columns(k, extra)
+        values = self.values[:n][:, columns].astype(np.float64)
+        times = self.times[:n][:, columns]
+        current = values[:, extra:]
+        polled = self.poll_started[columns[extra:]]
+
+        valid = ~np.isnan(current)
+        self.samples[:n] += valid.sum(axis=1)
+        self.missing[:n] += (~valid & (self.first_seen[:n, None] <= polled[None, :])).sum(axis=1)
+        outside = (current < self.low[:n, None]) | (current > self.high[:n, None])
+        self.out_of_range[:n] += (valid & outside).sum(axis=1)
+
+        if values.shape[1] > 1:
+            delta = np.diff(values, axis=1)
+            with np.errstate(invalid="ignore"):
+                rate = np.abs(delta) / np.maximum(np.diff(times, axis=1), RATE_WINDOW)
+            known = ~np.isnan(rate)
+            self.spikes[:n] += (known & (rate > self.rate_limit[:n, None])).sum(axis=1)
+            self.peak_rate[:n] = np.maximum(self.peak_rate[:n], np.where(known, rate, 0).max(axis=1))
+            changed = known & (delta != 0)
+            self.last_change[:n] = np.maximum(
+                self.last_change[:n], np.where(changed, times[:, 1:], -np.inf).max(axis=1)
+            )
+        self.max_age[:n] = np.fmax(self.max_age[:n], self.ages(time.time()))
+
+    def poll_stats(self):
+        columns = self._columns(self.count)
+        started = self.poll_started[columns]
+        latency = self.poll_latency[columns] * 1000
+        intervals = np.diff(started) * 1000
+        return {
+            "polls": self.polls,
+            "sensors": len(self.ids),
+            "interval_ms": float(intervals.mean()) if len(intervals) else None,
+            "jitter_ms": float(intervals.std()) if len(intervals) else None,
+            "latency_p50_ms": float(np.percentile(latency, 50)) if len(latency) else None,
+            "latency_p95_ms": float(np.percentile(latency, 95)) if len(latency) else None,
+            "latency_max_ms": float(latency.max()) if len(latency) else None,
+            "overruns": self.overruns,
+            "errors": sum(self.errors.values()),
+        }
+
+    def sensor_stats(self):
+        """Сводка по каждому датчику за окно буфера, в порядке обнаружения."""
+        self.check()
+        n = len(self.ids)
+        if not n:
+            return []
+        values = self.values[:n][:, self._columns(self.count)].astype(np.float64)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, values, 0).sum(axis=1) / count
+        low = np.where(valid, values, np.inf).min(axis=1)
+        high = np.where(valid, values, -np.inf).max(axis=1)
+        max_age = np.fmax(self.max_age[:n], self.ages(time.time()))
+        rows = []
+        for i, sensor in enumerate(self.ids):
+            rows.append({
+                "sensor": sensor,
+                "units": self.units[i],
+                "samples": int(self.samples[i]),
+                "min": float(low[i]) if count[i] else None,
+                "mean": float(mean[i]) if count[i] else None,
+                "max": float(high[i]) if count[i] else None,
+                "out_of_range": int(self.out_of_range[i]),
+                "spikes": int(self.spikes[i]),
+                "peak_rate": float(self.peak_rate[i]),
+                "max_age": float(max_age[i]),
+                "missing": int(self.missing[i]),
+            })
+        return rows
+
+    def run(self, duration=None):
+        """Опрос каждые interval секунд до stop() или duration; пропущенные такты не догоняются."""
+        deadline = None if duration is None else time.monotonic() + duration
+        next_poll = time.monotonic()
+        while not self._stop.is_set() and (deadline is None or next_poll < deadline):
+            self.poll()
+            next_poll += self.interval
+            now = time.monotonic()
+            if next_poll < now:
+                next_poll = now
+            self._stop.wait(next_poll - now)
+        self.check()
+
+    def start(self):
+        if self._greenlet is None:
+            self._stop.clear()
+            self._greenlet = gevent.spawn(self.run)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._stop.set()
+            self._greenlet.join()
+            self._greenlet = None
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+def short_sensor(sensor):
+    return sensor.replace("/redfish/v1/Chassis/", "")
+
+
+def problems(row, stale_after=STALE_AFTER):
+    found = []
+    if row["out_of_range"]:
+        found.append(f"вне диапазона {row['out_of_range']}")
+    if row["spikes"]:
+        found.append(f"скачков {row['spikes']} (до {row['peak_rate']:.1f} {row['units']}/с)")
+    if row["max_age"] > stale_after:
+        found.append(f"не менялось {row['max_age']:.0f} с")
+    if row["missing"]:
+        found.append(f"пропусков {row['missing']}")
+    return found
+
+
+def failed(row):
+    return bool(row["out_of_range"] or row["spikes"])
+
+
+def format_polls(stats):
+    if stats["interval_ms"] is None:
+        return f"опросов {stats['polls']}, датчиков {stats['sensors']}, ошибок {stats['errors']}"
+    return (
+        f"опросов {stats['polls']}, датчиков {stats['sensors']}, "
+        f"интервал {stats['interval_ms']:.0f} ± {stats['jitter_ms']:.0f} мс, "
+        f"латентность p50 {stats['latency_p50_ms']:.0f} p95 {stats['latency_p95_ms']:.0f} "
+        f"max {stats['latency_max_ms']:.0f} мс, просрочено {stats['overruns']}, ошибок {stats['errors']}"
+    )
+
+
+def format_sensor(row, stale_after=STALE_AFTER):
+    if row["min"] is None:
+        values = "нет показаний"
+    else:
+        values = f"{row['min']:.1f}..{row['max']:.1f} {row['units']}, среднее {row['mean']:.1f}"
+    found = problems(row, stale_after)
+    return (
+        f"{short_sensor(row['sensor'])}: показаний {row['samples']}, {values}"
+        + (f" - {', '.join(found)}" if found else "")
+    )
+
+
+def report(environment, reporter, suite=LOAD_SUITE):
+    telemetry = getattr(environment, "sensor_telemetry", None)
+    if telemetry is None:
+        return
+    reporter.add_test_result(suite, "telemetry polling", 'passed', format_polls(telemetry.poll_stats()), 0)
+    rows = telemetry.sensor_stats()
+    flagged = [row for row in rows if problems(row, telemetry.stale_after)]
+    bad = [row for row in flagged if failed(row)]
+    reporter.add_test_result(
+        suite, "telemetry sensors", 'failed' if bad else 'passed',
+        f"датчиков {len(rows)}, с нарушениями {len(flagged)}, выбросы и выход за пороги у {len(bad)}", 0
+    )
+    for row in sorted(flagged, key=lambda r: (not failed(r), r["sensor"]))[:REPORT_SENSORS]:
+        reporter.add_test_result(
+            suite, f"telemetry {short_sensor(row['sensor'])}", 'failed' if failed(row) else 'passed',
+            format_sensor(row, telemetry.stale_after), 0
+        )
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--telemetry-interval", type=float, default=INTERVAL, env_var="OPENBMC_TELEMETRY_INTERVAL",
+        help="Интервал опроса датчиков BMC, с; 0 - без телеметрии",
+    )
+    parser.add_argument(
+        "--telemetry-sources", default=SOURCES_LIST, env_var="OPENBMC_TELEMETRY_SOURCES",
+        help="Коллекции датчиков через запятую",
+    )
+    parser.add_argument(
+        "--telemetry-stale", type=float, default=STALE_AFTER, env_var="OPENBMC_TELEMETRY_STALE",
+        help="Показание, не менявшееся дольше стольких секунд, считается устаревшим",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, runner, **kwargs):
+    if isinstance(runner, WorkerRunner):
+        return
+    options = environment.parsed_options
+    interval = getattr(options, "telemetry_interval", None) or INTERVAL
+    if interval <= 0:
+        return
+    sources = getattr(options, "telemetry_sources", None) or SOURCES_LIST
+    environment.sensor_telemetry = SensorTelemetry(
+        new_session(),
+        environment.host or bmc_farm.target_for(0)["url"],
+        [source.strip().rstrip("/") for source in sources.split(",") if source.strip()],
+        interval,
+        stale_after=getattr(options, "telemetry_stale", None) or STALE_AFTER,
+    )
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    telemetry = getattr(environment, "sensor_telemetry", None)
+    if telemetry is not None:
+        telemetry.start()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    telemetry = getattr(environment, "sensor_telemetry", None)
+    if telemetry is None:
+        return
+    telemetry.stop()
+    print(f"Телеметрия датчиков: {format_polls(telemetry.poll_stats())}")
+    for row in telemetry.sensor_stats():
+        if problems(row, telemetry.stale_after):
+            print(f"  {format_sensor(row, telemetry.stale_after)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Телеметрия датчиков OpenBMC")
+    parser.add_argument("--url", default=os.environ.get("OPENBMC_URL", "https://localhost:2443"))
+    parser.add_argument("--interval", type=float, default=1.0, help="интервал опроса, с")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность, с")
+    parser.add_argument("--sources", default=SOURCES_LIST, help="коллекции датчиков через запятую")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="одновременных запросов")
+    parser.add_argument("--stale-after", type=float, default=STALE_AFTER, help="порог устаревания, с")
+    parser.add_argument("--output", help="JSON со сводкой опроса и датчиков")
+    args = parser.parse_args(argv)
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    telemetry = SensorTelemetry(
+        new_session(args.workers), args.url,
+        [source.strip().rstrip("/") for source in args.sources.split(",") if source.strip()],
+        args.interval, workers=args.workers, stale_after=args.stale_after,
+    )
+    telemetry.run(args.duration)
+    telemetry.close()
+    stats = telemetry.poll_stats()
+    rows = telemetry.sensor_stats()
+    print(format_polls(stats))
+    for row in rows:
+        if problems(row, args.stale_after):
+            print(f"  {format_sensor(row, args.stale_after)}")
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "polling": stats, "sensors": rows}, f, indent=2, ensure_ascii=False)
+    return 1 if any(failed(row) for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
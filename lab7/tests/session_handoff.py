@@ -0,0 +1,86 @@
+"""Одна Redfish-сессия на все процессы pytest-xdist.
+
+Первый worker под flock создает сессию и записывает токен в общий
+файл, остальные берут его оттуда. Файл хранит счетчик пользователей:
+последний завершившийся worker удаляет сессию на BMC.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+
+
+class SessionHandoffError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class SessionHandoff:
+    def __init__(self, path, redfish_url, username, password, timeout=30):
+        self.path = str(path)
+        self.lock_path = f"{self.path}.lock"
+        self.redfish_url = redfish_url
+        self.credentials = {"UserName": username, "Password": password}
+        self.timeout = timeout
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, state):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def acquire(self, http):
+        """Возвращает токен общей сессии, создавая ее при первом обращении."""
+        with self._locked():
+            state = self._read()
+            if state is None:
+                response = http.post(
+                    f"{self.redfish_url}/SessionService/Sessions",
+                    json=self.credentials,
+                    timeout=self.timeout
+                )
+                token = response.headers.get("X-Auth-Token")
+                if response.status_code != 201 or not token:
+                    raise SessionHandoffError(response.status_code)
+                state = {
+                    "token": token,
+                    "id": response.json().get("Id", ""),
+                    "users": 0,
+                }
+            state["users"] += 1
+            self._write(state)
+            return state["token"]
+
+    def release(self, http):
+        with self._locked():
+            state = self._read()
+            if state is None:
+                return
+            state["users"] -= 1
+            if state["users"] > 0:
+                self._write(state)
+                return
+            os.remove(self.path)
+            try:
+                http.delete(
+                    f"{self.redfish_url}/SessionService/Sessions/{state['id']}",
+                    headers={"X-Auth-Token": state["token"]},
+                    timeout=self.timeout
+                )
+            except Exception:
+                pass
@@ -0,0 +1,330 @@
+"""Общий пул Redfish-сессий для пользователей Locust и worker-процессов.
+
+Создание сессии на BMC дорогое, а число одновременных сессий ограничено,
+поэтому пользователи не логинятся сами, а берут X-Auth-Token из пула:
+
+    def on_start(self):
+        self.client.verify = False
+        self.client.auth = session_pool.auth_for(self)
+
+    def redfish_get(self, path, name, check):
+        session_pool.before_request(self.client)
+        with self.client.get(path, name=name, catch_response=True) as response:
+            ...
+
+auth_for() создает сессию слота еще в on_start, а before_request()
+обновляет токен до начала замера, поэтому логин не попадает во время
+ответа. Ответ 401 не повторяется: он остается failure, а сессия слота
+пересоздается перед следующим запросом. В распределенном режиме сессии создает master, worker-процессы получают
+токены сообщениями, поэтому все процессы делят один пул. Время логина
+пишется в environment.login_stats, отдельно от статистики запросов,
+чтобы пересоздание сессий не попадало в Aggregated, SLO и историю
+прогонов. При остановке теста все созданные сессии удаляются.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+from locust import events
+from locust.runners import MasterRunner, WorkerRunner
+import requests
+import urllib3
+from requests.auth import AuthBase
+
+import cassette
+from hdr_histogram import LatencyRecorder, format_summary
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+SESSIONS_PATH = "/redfish/v1/SessionService/Sessions"
+USERNAME = "root"
+PASSWORD = "0penBmc"
+POOL_SIZE = int(os.environ.get("OPENBMC_SESSION_POOL_SIZE", 4))
+TIMEOUT = 30
+LOGIN_NAME = "POST /SessionService/Sessions"
+LOGIN_FAILED = f"{LOGIN_NAME} failed"
+
+
+class SessionPoolError(Exception):
+    pass
+
+
+class _Slot:
+    __slots__ = ("lock", "token")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.token = None
+
+
+class RedfishSessionPool:
+    """Фиксированное число Redfish-сессий, которые делят между собой пользователи.
+
+    fetch позволяет получать токены не логином, а из другого процесса:
+    fetch(slot, stale_token) -> token. recorder - LatencyRecorder для
+    времени логина (неудачные попадают под LOGIN_FAILED).
+    """
+
+    def __init__(self, base_url, username=USERNAME, password=PASSWORD,
+                 size=POOL_SIZE, timeout=TIMEOUT, verify=False,
+                 recorder=None, fetch=None):
+        if size < 1:
+            raise ValueError("Размер пула сессий должен быть не меньше 1")
+        self.base_url = base_url.rstrip("/")
+        self.credentials = {"UserName": username, "Password": password}
+        self.size = size
+        self.timeout = timeout
+        self.recorder = recorder
+        self.fetch = fetch
+        self.login_times = []
+        self._slots = [_Slot() for _ in range(size)]
+        self._counter = itertools.count()
+        self._owned = {}
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self._http.verify = verify
+        cassette.install(self._http)
+
+    def assign(self):
+        return next(self._counter) % self.size
+
+    def auth(self, slot=None):
+        return PooledTokenAuth(self, self.assign() if slot is None else slot)
+
+    def token(self, slot, stale=None):
+        """Возвращает токен слота, при необходимости создавая новую сессию.
+
+        stale - токен, который BMC только что отверг; если слот все еще
+        держит его, сессия пересоздается, иначе отдается уже обновленный.
+        """
+        entry = self._slots[slot % self.size]
+        with entry.lock:
+            if entry.token is None or entry.token == stale:
+                if entry.token is not None:
+                    self._forget(entry.token)
+                if self.fetch is not None:
+                    entry.token = self.fetch(slot % self.size, entry.token)
+                else:
+                    entry.token = self._login()
+            return entry.token
+
+    def _login(self):
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self._http.post(
+                f"{self.base_url}{SESSIONS_PATH}",
+                json=self.credentials,
+                timeout=self.timeout
+            )
+            if response.status_code != 201:
+                raise SessionPoolError(f"Не удалось создать сессию: HTTP {response.status_code}")
+            token = response.headers.get("X-Auth-Token")
+            if not token:
+                raise SessionPoolError("BMC не вернул X-Auth-Token")
+            failed = False
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.login_times.append(elapsed)
+            if self.recorder is not None:
+                self.recorder.record(LOGIN_FAILED if failed else LOGIN_NAME, elapsed)
+
+        location = response.headers.get("Location")
+        if not location:
+            location = f"{SESSIONS_PATH}/{response.json().get('Id', '')}"
+        with self._lock:
+            self._owned[token] = location
+        return token
+
+    def _forget(self, token):
+        with self._lock:
+            self._owned.pop(token, None)
+
+    def close(self):
+        """Удаляет все сессии, созданные этим пулом."""
+        with self._lock:
+            owned = list(self._owned.items())
+            self._owned.clear()
+        for slot in self._slots:
+            slot.token = None
+
+        for token, location in owned:
+            url = location if location.startswith("http") else f"{self.base_url}{location}"
+            try:
+                self._http.delete(url, headers={"X-Auth-Token": token}, timeout=self.timeout)
+            except requests.RequestException:
+                pass
+        return len(owned)
+
+
+class PooledTokenAuth(AuthBase):
+    """requests-авторизация токеном слота пула.
+
+    Токен берется в prepare(), до начала замеряемого запроса. При 401
+    токен запоминается как устаревший, и следующий prepare() получает
+    для слота новую сессию.
+    """
+
+    def __init__(self, pool, slot):
+        self.pool = pool
+        self.slot = slot
+        self.token = None
+        self.stale = None
+
+    def prepare(self):
+        self.token = self.pool.token(self.slot, stale=self.stale)
+        self.stale = None
+        return self.token
+
+    def __call__(self, r):
+        token = self.token if self.stale is None and self.token else self.prepare()
+        r.headers.pop("Authorization", None)
+        r.headers["X-Auth-Token"] = token
+        r.register_hook("response", self.handle_401)
+        return r
+
+    def handle_401(self, r, **kwargs):
+        if r.status_code == 401:
+            self.stale = r.request.headers.get("X-Auth-Token")
+        return r
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+_replies = {}
+_waiters = {}
+_serving = threading.Event()
+
+
+def _pool_size(environment):
+    options = getattr(environment, "parsed_options", None)
+    return getattr(options, "session_pool_size", None) or POOL_SIZE
+
+
+def get_pool(environment, host=None):
+    """Пул процесса для host; на worker-процессах токены запрашиваются у master.
+
+    При нескольких BMC (bmc_farm) у каждой цели свой пул.
+    """
+    host = (host or environment.host or os.environ.get("OPENBMC_URL", "https://localhost:2443")).rstrip("/")
+    with _pool_lock:
+        pool = _pools.get(host)
+        if pool is None:
+            fetch = None
+            if isinstance(environment.runner, WorkerRunner):
+                fetch = lambda slot, stale: _fetch_from_master(environment, host, slot, stale)
+            pool = _pools[host] = RedfishSessionPool(
+                host,
+                size=_pool_size(environment),
+                recorder=getattr(environment, "login_stats", None),
+                fetch=fetch,
+            )
+        return pool
+
+
+def auth_for(user):
+    """PooledTokenAuth для пользователя; сессия слота создается сразу, в on_start."""
+    auth = get_pool(user.environment, user.host).auth()
+    auth.prepare()
+    return auth
+
+
+def before_request(client):
+    """Обновляет токен пула до запроса, чтобы логин не попал во время ответа."""
+    auth = getattr(client, "auth", None)
+    if isinstance(auth, PooledTokenAuth):
+        auth.prepare()
+
+
+def close_pool():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    return sum(pool.close() for pool in pools if pool.fetch is None)
+
+
+def _fetch_from_master(environment, host, slot, stale):
+    key = (host, slot)
+    waiter = threading.Event()
+    _waiters[key] = waiter
+    environment.runner.send_message("session_pool:acquire", {"host": host, "slot": slot, "stale": stale})
+    if not waiter.wait(TIMEOUT):
+        raise SessionPoolError(f"Master не выдал токен для слота {slot} ({host})")
+    reply = _replies.pop(key)
+    if "error" in reply:
+        raise SessionPoolError(reply["error"])
+    return reply["token"]
+
+
+def _serve_token(environment, msg, **kwargs):
+    host = msg.data["host"]
+    slot = msg.data["slot"]
+    try:
+        if not _serving.is_set():
+            raise SessionPoolError("Тест остановлен, новые сессии не создаются")
+        token = get_pool(environment, host).token(slot, stale=msg.data.get("stale"))
+        reply = {"host": host, "slot": slot, "token": token}
+    except Exception as e:
+        reply = {"host": host, "slot": slot, "error": str(e)}
+    environment.runner.send_message("session_pool:token", reply, client_id=msg.node_id)
+
+
+def _receive_token(environment, msg, **kwargs):
+    key = (msg.data["host"], msg.data["slot"])
+    _replies[key] = msg.data
+    waiter = _waiters.pop(key, None)
+    if waiter is not None:
+        waiter.set()
+
+
+def report(environment, reporter, suite="load"):
+    recorder = getattr(environment, "login_stats", None)
+    if recorder is None or not recorder.histograms:
+        return
+    summary = recorder.summary()
+    row = summary.get(LOGIN_NAME)
+    failed = summary.get(LOGIN_FAILED, {}).get("count", 0)
+    message = f"логинов {row['count'] if row else 0}, неудачных {failed}"
+    if row:
+        message += f", p50 {row['p50']:.0f} мс, p95 {row['p95']:.0f} мс, max {row['max']:.0f} мс"
+    reporter.add_test_result(suite, "session logins", 'failed' if failed else 'passed', message, 0)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--session-pool-size", type=int, default=POOL_SIZE,
+        env_var="OPENBMC_SESSION_POOL_SIZE",
+        help="Число Redfish-сессий, которые делят все пользователи и worker-процессы",
+    )
+
+
+@events.init.add_listener
+def _on_init(environment, **kwargs):
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        runner.register_message("session_pool:acquire", _serve_token, concurrent=True)
+    elif isinstance(runner, WorkerRunner):
+        runner.register_message("session_pool:token", _receive_token)
+    # Логинится только master или локальный процесс, worker берут токены у него.
+    if not isinstance(runner, WorkerRunner):
+        environment.login_stats = LatencyRecorder()
+
+
+@events.test_start.add_listener
+def _on_test_start(environment, **kwargs):
+    _serving.set()
+
+
+@events.test_stop.add_listener
+def _on_test_stop(environment, **kwargs):
+    _serving.clear()
+    recorder = getattr(environment, "login_stats", None)
+    if recorder is not None and recorder.histograms:
+        print("Логин Redfish-сессий, мс:")
+        print(format_summary(recorder.summary()))
+    closed = close_pool()
+    if closed:
+        print(f"Удалено Redfish-сессий: {closed}")
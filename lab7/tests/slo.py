@@ -0,0 +1,144 @@
+"""Бюджеты латентности и ошибок для endpoint нагрузочного теста.
+
+Бюджеты задаются JSON-файлом по имени запроса (name в Locust):
+
+    {"GET /Systems/system": {"p95": 4000, "p99": 8000, "max_error_pct": 1, "min_rps": 0.5}}
+
+pNN - верхняя граница перцентиля в мс, max_error_pct - доля ошибок в %,
+min_rps - нижняя граница пропускной способности. "Aggregated" проверяет
+сумму по всем запросам. Каждая пара endpoint/метрика становится
+отдельным testcase в suite load, поэтому Jenkins показывает, какой
+endpoint вышел за бюджет. Endpoint без запросов в этом сценарии
+отмечается как skipped.
+"""
+
+from locust import events
+from locust.runners import WorkerRunner
+from locust.stats import StatsEntry
+import json
+import os
+
+from xml_reporter import XMLReporter
+
+SLO_FILE = os.environ.get(
+    "OPENBMC_SLO_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "slo.json")
+)
+LOAD_SUITE = "load"
+TOTAL_NAME = "Aggregated"
+
+
+class SLOResult:
+    __slots__ = ("endpoint", "metric", "measured", "limit", "passed", "unit")
+
+    def __init__(self, endpoint, metric, measured, limit, passed, unit):
+        self.endpoint = endpoint
+        self.metric = metric
+        self.measured = measured
+        self.limit = limit
+        self.passed = passed
+        self.unit = unit
+
+    @property
+    def name(self):
+        return f"slo {self.endpoint} {self.metric}"
+
+    @property
+    def message(self):
+        bound = ">=" if self.metric == "min_rps" else "<="
+        if self.measured is None:
+            return f"{self.metric}: нет запросов к endpoint, бюджет {bound} {self.limit}{self.unit}"
+        return f"{self.metric}={self.measured:.2f}{self.unit}, бюджет {bound} {self.limit}{self.unit}"
+
+
+def load_budgets(path=SLO_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_entry(stats, endpoint):
+    if endpoint == TOTAL_NAME:
+        return stats.total
+    matches = [e for e in stats.entries.values() if e.name == endpoint]
+    if not matches:
+        return None
+    if len(matches) == 1:
+        return matches[0]
+    merged = StatsEntry(stats, endpoint, "", use_response_times_cache=False)
+    for entry in matches:
+        merged.extend(entry)
+    return merged
+
+
+def measure(entry, metric):
+    if metric == "max_error_pct":
+        return entry.fail_ratio * 100, "%"
+    if metric == "min_rps":
+        return entry.total_rps, "rps"
+    if metric.startswith("p"):
+        percent = float(metric[1:]) / 100
+        if not 0 < percent <= 1:
+            raise ValueError(f"Недопустимый перцентиль: {metric}")
+        return float(entry.get_response_time_percentile(percent)), "ms"
+    raise ValueError(f"Неизвестная метрика SLO: {metric}")
+
+
+def evaluate(stats, budgets):
+    results = []
+    for endpoint, limits in budgets.items():
+        entry = find_entry(stats, endpoint)
+        for metric, limit in limits.items():
+            if entry is None or entry.num_requests == 0:
+                _, unit = measure(StatsEntry(stats, endpoint, ""), metric)
+                results.append(SLOResult(endpoint, metric, None, limit, True, unit))
+                continue
+            measured, unit = measure(entry, metric)
+            if metric == "min_rps":
+                passed = measured >= limit
+            else:
+                passed = measured <= limit
+            results.append(SLOResult(endpoint, metric, measured, limit, passed, unit))
+    return results
+
+
+def report(results, reporter, suite=LOAD_SUITE):
+    for result in results:
+        if result.measured is None:
+            status = 'skipped'
+        else:
+            status = 'passed' if result.passed else 'failed'
+        reporter.add_test_result(suite, result.name, status, result.message, 0)
+    return all(result.passed for result in results)
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument(
+        "--slo-file", default=None, env_var="OPENBMC_SLO_FILE",
+        help="JSON с бюджетами латентности/ошибок по имени запроса",
+    )
+    parser.add_argument(
+        "--slo-junit", default=None,
+        help="Куда записать результаты проверки SLO в формате JUnit XML",
+    )
+
+
+@events.quitting.add_listener
+def _on_quitting(environment, **kwargs):
+    options = environment.parsed_options
+    if isinstance(environment.runner, WorkerRunner) or not getattr(options, "slo_file", None):
+        return
+
+    results = evaluate(environment.stats, load_budgets(options.slo_file))
+    for result in results:
+        if not result.passed:
+            print(f"SLO нарушен: {result.endpoint} {result.message}")
+
+    if options.slo_junit:
+        reporter = XMLReporter(options.slo_junit, name="OpenBMC Load SLO")
+        passed = report(results, reporter)
+        reporter.close()
+    else:
+        passed = all(result.passed for result in results)
+
+    if not passed:
+        environment.process_exit_code = 1
@@ -1,35 +1,75 @@
 #!/usr/bin/env python3
 
-import sys
 import os
 
-if 'locust' in sys.modules:
-    del sys.modules['locust']
+if os.environ.get("PYTEST_XDIST_WORKER"):
+    # execnet в worker-процессах xdist работает на настоящих потоках,
+    # а нагрузочный тест там не запускается.
+    os.environ.setdefault("LOCUST_SKIP_MONKEY_PATCH", "1")
+
+# locust выполняет monkey-patch gevent при импорте, поэтому он должен
+# загрузиться раньше модулей, которые импортируют ssl, urllib и requests.
+import load_runner
+import bench_history
+import bmc_farm
+import bmc_monitor
+import capacity
+import cassette
+import event_service
+import fast_http
+import image_metadata
+import open_loop
+import phase_timing
+import power_tracker
+import redfish_crawler
+import response_checks
+import sensor_telemetry
+import session_pool
+import slo
+from load_users import OpenBMCFastLoadTest, OpenBMCLoadTest
+from locustfile_capacity import OpenBMCCapacityShape, OpenBMCCapacityTest, OpenBMCFastCapacityTest
+from locustfile_open_loop import OpenBMCArrivalShape, OpenBMCOpenLoopTest
+from locustfile_tree import OpenBMCFastTreeTest, OpenBMCTreeTest
+from locust.clients import HttpSession
+from locust.event import EventHook
 
 import pytest
 import requests
 import urllib3
 import time
-import json
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import threading
-import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from qemu_manager import QemuError, QemuManager, find_qemuboot, redfish_ready
+from session_handoff import SessionHandoff, SessionHandoffError
+from webui import ChromePool, StepTimer, WebUILogin
+from xml_reporter import XMLReporter
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-BASE_URL = "https://localhost:2443"
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+TARGET = bmc_farm.target_for(bmc_farm.shard_index(XDIST_WORKER))
+BASE_URL = TARGET["url"]
 REDFISH_URL = f"{BASE_URL}/redfish/v1"
 USERNAME = "root"
 PASSWORD = "0penBmc"
 TIMEOUT = 30
 RESULTS_DIR = "/tmp/results"
+WEBUI_POOL_SIZE = int(os.environ.get("OPENBMC_WEBUI_POOL_SIZE", 1))
+WEBUI_TIMINGS = f"{RESULTS_DIR}/webui_timings.jsonl"
+LOAD_WORKERS = int(os.environ.get("OPENBMC_LOAD_WORKERS", -1))
+HISTORY_DIR = os.environ.get("OPENBMC_HISTORY_DIR")
+QEMU_STATE_DIR = os.environ.get("OPENBMC_QEMU_STATE_DIR")
+EVENT_SUBSCRIBERS = (1, int(os.environ.get("OPENBMC_EVENT_SUBSCRIBERS", 8)))
+TELEMETRY_SECONDS = float(os.environ.get("OPENBMC_TELEMETRY_SECONDS", 5))
+TELEMETRY_INTERVAL = 0.5
+# Тесты, которые переключают питание Systems/system, под pytest-xdist
+# выполняются одним worker подряд (--dist loadgroup), иначе они гоняются
+# за PowerState одного BMC.
+POWER_GROUP = pytest.mark.xdist_group("power")
+IMAGE_DIR = os.environ.get(
+    "OPENBMC_IMAGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "romulus")
+)
 
 test_results = {
     'webui': [],
@@ -37,151 +77,132 @@ test_results = {
     'load': []
 }
 
-class XMLReporter:
-    def __init__(self):
-        self.testsuites = ET.Element('testsuites')
-        self.testsuites.set('name', 'OpenBMC Unified Tests')
-        self.testsuites.set('timestamp', datetime.now().isoformat())
-    
-    def add_test_result(self, test_type, test_name, status, message="", duration=0):
-        testsuite = self.testsuites.find(f".//testsuite[@name='{test_type}']")
-        if testsuite is None:
-            testsuite = ET.SubElement(self.testsuites, 'testsuite')
-            testsuite.set('name', test_type)
-            testsuite.set('tests', '0')
-            testsuite.set('failures', '0')
-            testsuite.set('errors', '0')
-            testsuite.set('time', '0')
-        
-        testcase = ET.SubElement(testsuite, 'testcase')
-        testcase.set('name', test_name)
-        testcase.set('time', str(duration))
-        
-        if status == 'failed':
-            failure = ET.SubElement(testcase, 'failure')
-            failure.set('message', message)
-            failure.text = message
-            testsuite.set('failures', str(int(testsuite.get('failures', 0)) + 1))
-        elif status == 'error':
-            error = ET.SubElement(testcase, 'error')
-            error.set('message', message)
-            error.text = message
-            testsuite.set('errors', str(int(testsuite.get('errors', 0)) + 1))
-        
-        testsuite.set('tests', str(int(testsuite.get('tests', 0)) + 1))
-        testsuite.set('time', str(float(testsuite.get('time', 0)) + duration))
-    
-    def save_xml(self, filename):
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        tree = ET.ElementTree(self.testsuites)
-        tree.write(filename, encoding='utf-8', xml_declaration=True)
+if XDIST_WORKER:
+    xml_reporter = XMLReporter(f"{RESULTS_DIR}/unified_test_results.{XDIST_WORKER}.xml")
+else:
+    xml_reporter = XMLReporter(f"{RESULTS_DIR}/unified_test_results.xml")
+
+@pytest.fixture(scope="session", autouse=True)
+def bmc():
+    """Поднимает OpenBMC в QEMU, если задан OPENBMC_QEMU_STATE_DIR.
 
-xml_reporter = XMLReporter()
+    Под pytest-xdist QEMU должен быть запущен заранее через qemu_manager.py start.
+    С фермой (OPENBMC_TARGETS) только проверяет, что BMC этого worker отвечает.
+    """
+    if os.environ.get(bmc_farm.REGISTRY_ENV):
+        if not redfish_ready(BASE_URL):
+            pytest.exit(f"BMC {BASE_URL} из реестра фермы не отвечает", returncode=1)
+        yield None
+        return
+    if not QEMU_STATE_DIR or XDIST_WORKER:
+        yield None
+        return
+
+    port = urllib3.util.parse_url(BASE_URL).port or 443
+    try:
+        manager = QemuManager(find_qemuboot(IMAGE_DIR), QEMU_STATE_DIR, ports={"https": port}, snapshot=True)
+        metrics = manager.start()
+    except (QemuError, OSError) as e:
+        xml_reporter.add_test_result('qemu', 'boot_to_ready', 'error', str(e))
+        pytest.exit(f"Не удалось запустить QEMU: {e}", returncode=1)
+
+    xml_reporter.add_test_result(
+        'qemu', 'boot_to_ready', 'passed',
+        f"{metrics['mode']} start: {metrics['boot_to_ready']:.1f} с",
+        metrics['boot_to_ready']
+    )
+    yield manager
+    manager.stop()
+
+@pytest.fixture(scope="session", autouse=True)
+def firmware():
+    """Теги прошивки из метаданных сборки IMAGE_DIR; в отчет пишутся один раз."""
+    tags = image_metadata.image_tags(IMAGE_DIR)
+    if tags is not None and XDIST_WORKER in (None, "gw0"):
+        image_metadata.report(tags, xml_reporter)
+    return tags
 
 @pytest.fixture(scope="session")
-def webdriver_session():
-    chrome_options = Options()
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("--ignore-ssl-errors")
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-web-security")
-    chrome_options.add_argument("--allow-running-insecure-content")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    chrome_paths = [
-        "/usr/bin/google-chrome",
-        "/usr/bin/chromium-browser", 
-        "/usr/bin/chromium",
-        "/usr/bin/chrome"
-    ]
-    
-    for path in chrome_paths:
-        if os.path.exists(path):
-            chrome_options.binary_location = path
-            break
-    
+def chrome_pool():
+    # Chrome запускается лениво, поэтому каждый xdist worker поднимает
+    # столько браузеров, сколько его тестов одновременно их держат.
+    pool = ChromePool(WEBUI_POOL_SIZE)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def webdriver_session(chrome_pool):
+    """Драйвер из пула на время теста; вход восстанавливает ensure_logged_in."""
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.implicitly_wait(10)
-        yield driver
+        driver = chrome_pool.acquire()
     except Exception as e:
         pytest.skip(f"WebDriver не может быть создан: {e}")
-    finally:
-        if 'driver' in locals():
-            driver.quit()
+    yield driver
+    chrome_pool.release(driver)
 
 @pytest.fixture(scope="session")
-def api_session():
+def webui_login():
+    return WebUILogin(BASE_URL, USERNAME, PASSWORD)
+
+@pytest.fixture(scope="session")
+def api_session(tmp_path_factory):
+    # Под pytest-xdist базовый tmp у каждого worker свой, общий - уровнем выше.
+    shared_dir = tmp_path_factory.getbasetemp()
+    if XDIST_WORKER:
+        shared_dir = shared_dir.parent
+    handoff = SessionHandoff(shared_dir / f"redfish_session.{TARGET['name']}.json", REDFISH_URL, USERNAME, PASSWORD, TIMEOUT)
+
     session = requests.Session()
     session.verify = False
-    
-    response = session.post(
-        f"{REDFISH_URL}/SessionService/Sessions",
-        json={"UserName": USERNAME, "Password": PASSWORD},
-        timeout=TIMEOUT
-    )
-    
-    if response.status_code == 201:
-        auth_token = response.headers.get('X-Auth-Token')
-        if auth_token:
-            session.headers['X-Auth-Token'] = auth_token
-    else:
-        pytest.skip(f"Не удалось создать API сессию: {response.status_code}")
-    
-    yield session
-    
+    phases = phase_timing.PhaseRecorder()
+    phase_timing.install(session)
+    session.hooks["response"].append(phase_timing.response_hook(phases))
+    cassette.install(session)
+
     try:
-        session.delete(f"{REDFISH_URL}/SessionService/Sessions/{response.json().get('Id', '')}", timeout=TIMEOUT)
-    except:
-        pass
+        session.headers['X-Auth-Token'] = handoff.acquire(session)
+    except SessionHandoffError as e:
+        session.close()
+        pytest.skip(f"Не удалось создать API сессию: {e.status_code}")
+
+    yield session
+
+    handoff.release(session)
     session.close()
+    cassette.save()
+    phase_timing.flush()
+    phase_timing.report(xml_reporter, phases, suite='api')
+
+def first_success(session, urls, timeout=TIMEOUT):
+    """Опрашивает urls параллельно и возвращает (url, response) первого ответа 200."""
+    pool = ThreadPoolExecutor(max_workers=len(urls))
+    futures = {pool.submit(session.get, url, timeout=timeout): url for url in urls}
+    try:
+        for future in as_completed(futures):
+            try:
+                response = future.result()
+            except requests.RequestException:
+                continue
+            if response.status_code == 200:
+                return futures[future], response
+        return None, None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 class TestWebUI:
-    def test_webui_login(self, webdriver_session):
+    def test_webui_login(self, webdriver_session, webui_login):
         start_time = time.time()
         test_name = "test_webui_login"
+        timer = StepTimer(test_name)
         
         try:
-            webdriver_session.get(BASE_URL)
-            time.sleep(3)
-            
-            inputs = webdriver_session.find_elements(By.TAG_NAME, "input")
-            username_field = None
-            password_field = None
+            success = webui_login.login(webdriver_session, timer)
             
-            for inp in inputs:
-                field_type = inp.get_attribute("type")
-                if field_type == "text":
-                    username_field = inp
-                elif field_type == "password":
-                    password_field = inp
+            with timer.step("screenshot"):
+                screenshot_path = f"{RESULTS_DIR}/webui_login_success.png"
+                os.makedirs(RESULTS_DIR, exist_ok=True)
+                webdriver_session.save_screenshot(screenshot_path)
             
-            assert username_field and password_field, "Не найдены поля для ввода логина/пароля"
-            
-            username_field.send_keys(USERNAME)
-            password_field.send_keys(PASSWORD)
-            
-            buttons = webdriver_session.find_elements(By.TAG_NAME, "button")
-            login_button = None
-            for btn in buttons:
-                if "Log in" in btn.text or "Login" in btn.text:
-                    login_button = btn
-                    break
-            
-            assert login_button, "Не найдена кнопка входа"
-            login_button.click()
-            
-            time.sleep(5)
-            current_url = webdriver_session.current_url
-            
-            screenshot_path = f"{RESULTS_DIR}/webui_login_success.png"
-            os.makedirs(RESULTS_DIR, exist_ok=True)
-            webdriver_session.save_screenshot(screenshot_path)
-            
-            success = current_url != f"{BASE_URL}/#/login"
             if not success:
                 try:
                     main_elements = webdriver_session.find_elements(By.XPATH, 
@@ -191,11 +212,12 @@ class TestWebUI:
                     success = False
             
             duration = time.time() - start_time
+            timer.dump(WEBUI_TIMINGS)
             
             if success:
-                xml_reporter.add_test_result('webui', test_name, 'passed', '', duration)
+                xml_reporter.add_test_result('webui', test_name, 'passed', timer.summary(), duration)
             else:
-                xml_reporter.add_test_result('webui', test_name, 'failed', 'Не удалось авторизоваться', duration)
+                xml_reporter.add_test_result('webui', test_name, 'failed', f'Не удалось авторизоваться. {timer.summary()}', duration)
             
             assert success, "Не удалось авторизоваться в Web UI"
             
@@ -204,45 +226,27 @@ class TestWebUI:
             xml_reporter.add_test_result('webui', test_name, 'error', str(e), duration)
             raise
     
-    def test_webui_navigation(self, webdriver_session):
+    def test_webui_navigation(self, webdriver_session, webui_login):
         start_time = time.time()
         test_name = "test_webui_navigation"
+        timer = StepTimer(test_name)
         
         try:
-            webdriver_session.get(BASE_URL)
-            time.sleep(3)
-            
-            inputs = webdriver_session.find_elements(By.TAG_NAME, "input")
-            for inp in inputs:
-                field_type = inp.get_attribute("type")
-                if field_type == "text":
-                    inp.send_keys(USERNAME)
-                elif field_type == "password":
-                    inp.send_keys(PASSWORD)
+            webui_login.ensure_logged_in(webdriver_session, timer)
             
-            buttons = webdriver_session.find_elements(By.TAG_NAME, "button")
-            for btn in buttons:
-                if "Log in" in btn.text or "Login" in btn.text:
-                    btn.click()
-                    break
-            
-            time.sleep(5)
-            
-            navigation_links = webdriver_session.find_elements(By.TAG_NAME, "a")
-            nav_found = False
-            
-            for link in navigation_links:
-                link_text = link.text.lower()
-                if any(keyword in link_text for keyword in ['system', 'overview', 'dashboard', 'inventory']):
-                    nav_found = True
-                    break
+            with timer.step("navigation"):
+                nav_link = webui_login.wait_for_navigation(
+                    webdriver_session, ['system', 'overview', 'dashboard', 'inventory']
+                )
+            nav_found = nav_link is not None
             
             duration = time.time() - start_time
+            timer.dump(WEBUI_TIMINGS)
             
             if nav_found:
-                xml_reporter.add_test_result('webui', test_name, 'passed', '', duration)
+                xml_reporter.add_test_result('webui', test_name, 'passed', timer.summary(), duration)
             else:
-                xml_reporter.add_test_result('webui', test_name, 'failed', 'Не найдены элементы навигации', duration)
+                xml_reporter.add_test_result('webui', test_name, 'failed', f'Не найдены элементы навигации. {timer.summary()}', duration)
             
             assert nav_found, "Не найдены элементы навигации"
             
@@ -299,6 +303,7 @@ class TestRedfishAPI:
             xml_reporter.add_test_result('api', test_name, 'error', str(e), duration)
             raise
     
+    @POWER_GROUP
     def test_api_power_management(self, api_session):
         start_time = time.time()
         test_name = "test_api_power_management"
@@ -318,24 +323,33 @@ class TestRedfishAPI:
                 pytest.skip("Действие Reset недоступно")
             
             reset_types = ["GracefulRestart", "ForceRestart"]
-            success_count = 0
+            tracker = power_tracker.PowerTransitionTracker(api_session, BASE_URL)
+            transitions = []
+            unsupported = []
             
             for reset_type in reset_types:
-                resp = api_session.post(
-                    f"{REDFISH_URL}/Systems/system/Actions/ComputerSystem.Reset",
-                    json={"ResetType": reset_type},
-                    timeout=TIMEOUT
-                )
-                if resp.status_code in [200, 202, 204, 400]:
-                    success_count += 1
+                transition = tracker.reset(reset_type)
+                # 400 - BMC не поддерживает этот ResetType в текущем состоянии:
+                # такой переход пропускается, а не засчитывается как успешный.
+                if transition.status == 400:
+                    unsupported.append(reset_type)
+                else:
+                    transitions.append(transition)
             
             duration = time.time() - start_time
-            
-            if success_count > 0:
-                xml_reporter.add_test_result('api', test_name, 'passed', f'Успешно: {success_count}/{len(reset_types)}', duration)
+            completed = [t for t in transitions if t.completed]
+            details = "; ".join(t.describe() for t in transitions)
+            if unsupported:
+                details = f"{details}; не поддерживаются: {', '.join(unsupported)}".lstrip("; ")
+            
+            if not completed:
+                xml_reporter.add_test_result('api', test_name, 'failed', f'Ни одна перезагрузка не завершилась: {details}', duration)
+                assert False, f"Ни одна перезагрузка не завершилась: {details}"
+            elif len(completed) < len(transitions):
+                xml_reporter.add_test_result('api', test_name, 'failed', f'Перезагрузка не завершилась: {details}', duration)
+                assert False, f"Перезагрузка не завершилась: {details}"
             else:
-                xml_reporter.add_test_result('api', test_name, 'failed', 'Все типы перезагрузки недоступны', duration)
-                assert False, "Все типы перезагрузки недоступны"
+                xml_reporter.add_test_result('api', test_name, 'passed', f'Успешно: {len(completed)}/{len(reset_types)}. {details}', duration)
             
         except Exception as e:
             duration = time.time() - start_time
@@ -354,11 +368,9 @@ class TestRedfishAPI:
             ]
             
             thermal_data = None
-            for endpoint in thermal_endpoints:
-                response = api_session.get(endpoint, timeout=TIMEOUT)
-                if response.status_code == 200:
-                    thermal_data = response.json()
-                    break
+            endpoint, response = first_success(api_session, thermal_endpoints)
+            if response is not None:
+                thermal_data = response.json()
             
             duration = time.time() - start_time
             
@@ -388,114 +400,209 @@ class TestRedfishAPI:
             xml_reporter.add_test_result('api', test_name, 'error', str(e), duration)
             raise
 
-def run_load_test():
-    start_time = time.time()
-    test_name = "test_load_performance"
-
-    try:
-        locust_script = os.path.join(os.path.dirname(__file__), 'load_test.py')
-        with open(locust_script, 'w') as f:
-            f.write(f'''
-from locust import HttpUser, task, between
-import urllib3
+    def test_api_resource_tree(self, api_session):
+        start_time = time.time()
+        test_name = "test_api_resource_tree"
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        try:
+            crawler = redfish_crawler.RedfishCrawler(api_session, BASE_URL)
+            resources = crawler.crawl()
+            duration = time.time() - start_time
 
-BASE_URL = "{BASE_URL}"
-REDFISH_URL = "{REDFISH_URL}"
-USERNAME = "{USERNAME}"
-PASSWORD = "{PASSWORD}"
-TIMEOUT = {TIMEOUT}
+            message = redfish_crawler.format_crawl(crawler, resources)
+            problems = [f"{path}: {error}" for path, error in sorted(crawler.errors.items())]
+            problems += [f"{path}: нет {', '.join(missing)}" for path, missing in sorted(crawler.invalid.items())]
+            if problems:
+                xml_reporter.add_test_result('api', test_name, 'failed', f"{message}; " + "; ".join(problems), duration)
+                assert False, f"Ошибки в дереве Redfish: {problems}"
+            xml_reporter.add_test_result('api', test_name, 'passed', message, duration)
 
-class OpenBMCLoadTest(HttpUser):
-    wait_time = between(1, 3)
-    host = BASE_URL
+        except Exception as e:
+            duration = time.time() - start_time
+            xml_reporter.add_test_result('api', test_name, 'error', str(e), duration)
+            raise
 
-    def on_start(self):
-        self.auth_token = None
-        self.setup_auth()
+    def test_api_sensor_telemetry(self, api_session):
+        start_time = time.time()
+        test_name = "test_api_sensor_telemetry"
 
-    def setup_auth(self):
         try:
-            response = self.client.post(
-                f"{{REDFISH_URL}}/SessionService/Sessions",
-                json={{"UserName": USERNAME, "Password": PASSWORD}},
-                verify=False,
-                timeout=TIMEOUT
-            )
-            if response.status_code == 201:
-                self.auth_token = response.headers.get('X-Auth-Token')
-                if self.auth_token:
-                    self.client.headers['X-Auth-Token'] = self.auth_token
+            telemetry = sensor_telemetry.SensorTelemetry(api_session, BASE_URL, interval=TELEMETRY_INTERVAL, workers=4)
+            try:
+                telemetry.run(TELEMETRY_SECONDS)
+            finally:
+                telemetry.close()
+            duration = time.time() - start_time
+
+            stats = telemetry.poll_stats()
+            message = sensor_telemetry.format_polls(stats)
+            if not stats["sensors"]:
+                xml_reporter.add_test_result('api', test_name, 'failed', f'{message}; датчики не найдены', duration)
+                assert False, "Датчики не найдены"
+            bad = [sensor_telemetry.format_sensor(row) for row in telemetry.sensor_stats() if sensor_telemetry.failed(row)]
+            if bad:
+                xml_reporter.add_test_result('api', test_name, 'failed', f"{message}; " + "; ".join(bad), duration)
+                assert False, f"Недопустимые показания датчиков: {bad}"
+            xml_reporter.add_test_result('api', test_name, 'passed', message, duration)
+
         except Exception as e:
-            pass
+            duration = time.time() - start_time
+            xml_reporter.add_test_result('api', test_name, 'error', str(e), duration)
+            raise
+
+    @POWER_GROUP
+    def test_api_event_delivery(self, api_session):
+        start_time = time.time()
+        test_name = "test_api_event_delivery"
 
-    @task(3)
-    def get_system_info(self):
         try:
-            response = self.client.get(
-                f"{{REDFISH_URL}}/Systems/system",
-                verify=False,
-                timeout=TIMEOUT
+            response = api_session.get(f"{REDFISH_URL}/EventService", timeout=TIMEOUT)
+            if response.status_code != 200 or not response.json().get("ServerSentEventUri"):
+                duration = time.time() - start_time
+                xml_reporter.add_test_result('api', test_name, 'failed', 'EventService SSE недоступен', duration)
+                pytest.skip("EventService SSE недоступен")
+
+            headers = {"X-Auth-Token": api_session.headers["X-Auth-Token"]}
+            tracker = power_tracker.PowerTransitionTracker(api_session, BASE_URL)
+            # Каждый прогон должен менять состояние питания, иначе события не будет.
+            state, _ = tracker.power_state()
+            reset_type = "On" if state == "Off" else "ForceOff"
+            results = []
+            try:
+                for subscribers in EVENT_SUBSCRIBERS:
+                    latencies = event_service.measure_delivery(
+                        BASE_URL, headers, subscribers, timeout=TIMEOUT, reset_type=reset_type
+                    )
+                    delivered = sorted(l for l in latencies if l is not None)
+                    results.append((subscribers, delivered))
+                    reset_type = "On" if reset_type == "ForceOff" else "ForceOff"
+            finally:
+                api_session.post(
+                    f"{REDFISH_URL}/Systems/system/Actions/ComputerSystem.Reset",
+                    json={"ResetType": "On"},
+                    timeout=TIMEOUT
+                )
+
+            duration = time.time() - start_time
+            message = "; ".join(
+                f"{subscribers} подписчиков: доставлено {len(delivered)}/{subscribers}"
+                + (f", p50 {delivered[len(delivered) // 2] * 1000:.0f} мс, max {delivered[-1] * 1000:.0f} мс" if delivered else "")
+                for subscribers, delivered in results
             )
-            if response.status_code == 200:
-                data = response.json()
-                power_state = data.get("PowerState", "unknown")
+            if all(len(delivered) == subscribers for subscribers, delivered in results):
+                xml_reporter.add_test_result('api', test_name, 'passed', message, duration)
+            else:
+                xml_reporter.add_test_result('api', test_name, 'failed', message, duration)
+                assert False, f"События доставлены не всем подписчикам: {message}"
+
         except Exception as e:
-            pass
+            duration = time.time() - start_time
+            xml_reporter.add_test_result('api', test_name, 'error', str(e), duration)
+            raise
+
+class TestLoadChecks:
+    def test_validate_connection_error(self):
+        start_time = time.time()
+        test_name = "test_validate_connection_error"
+        failures = []
+
+        def on_request(exception=None, **kwargs):
+            failures.append(exception)
 
-    @task(2)
-    def get_thermal_data(self):
         try:
-            response = self.client.get(
-                f"{{REDFISH_URL}}/Chassis/chassis/ThermalSubSystem",
-                verify=False,
-                timeout=TIMEOUT
-            )
-            if response.status_code == 200:
-                data = response.json()
-                temperatures = data.get("Temperatures", [])
+            # Порт 1 закрыт: ответ Locust содержит ошибку соединения вместо статуса.
+            request_event = EventHook()
+            request_event.add_listener(on_request)
+            client = HttpSession("http://127.0.0.1:1", request_event=request_event, user=None)
+            with client.get("/redfish/v1/Systems/system", catch_response=True, timeout=TIMEOUT) as response:
+                assert response.error is not None
+                data = response_checks.validate(response, response_checks.SYSTEM, rate=1)
+
+            duration = time.time() - start_time
+            assert data is None
+            assert len(failures) == 1 and failures[0] is not None, f"Ожидался один failure: {failures}"
+            xml_reporter.add_test_result('load', test_name, 'passed', f'failure: {failures[0]}', duration)
+
         except Exception as e:
-            pass
+            duration = time.time() - start_time
+            xml_reporter.add_test_result('load', test_name, 'error', str(e), duration)
+            raise
 
-    @task(1)
-    def get_session_info(self):
-        try:
-            response = self.client.get(
-                f"{{REDFISH_URL}}/SessionService",
-                verify=False,
-                timeout=TIMEOUT
+def run_load_test(users=5, spawn_rate=1, run_time=30, workers=LOAD_WORKERS):
+    start_time = time.time()
+    test_name = "test_load_performance"
+    # Сценарий - ключ истории прогонов; поиск емкости в историю не пишется,
+    # у него нет постоянного профиля нагрузки для сравнения.
+    scenario = None
+
+    try:
+        if capacity.ENABLED:
+            user_class = OpenBMCFastCapacityTest if fast_http.ENABLED else OpenBMCCapacityTest
+            environment = load_runner.run_load(
+                [user_class], BASE_URL,
+                run_time=capacity.CAPACITY_RUN_TIME, workers=workers, shape_class=OpenBMCCapacityShape
+            )
+        elif open_loop.ARRIVAL_RATE:
+            scenario = "open_loop"
+            environment = load_runner.run_load(
+                [OpenBMCOpenLoopTest], BASE_URL,
+                run_time=run_time, workers=workers, shape_class=OpenBMCArrivalShape
+            )
+        elif redfish_crawler.TREE_LOAD:
+            scenario = "tree"
+            user_class = OpenBMCFastTreeTest if fast_http.ENABLED else OpenBMCTreeTest
+            environment = load_runner.run_load(
+                [user_class], BASE_URL,
+                users=users, spawn_rate=spawn_rate, run_time=run_time, workers=workers
+            )
+        else:
+            scenario = "load"
+            user_class = OpenBMCFastLoadTest if fast_http.ENABLED else OpenBMCLoadTest
+            environment = load_runner.run_load(
+                [user_class], BASE_URL,
+                users=users, spawn_rate=spawn_rate, run_time=run_time, workers=workers
             )
-            if response.status_code == 200:
-                pass
-        except Exception as e:
-            pass
-''')
-
-        cmd = [
-            "locust",
-            "-f", locust_script,
-            "--headless",
-            "-u", "5",
-            "-r", "1",
-            "--run-time", "30s",
-            "--host", BASE_URL
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
         duration = time.time() - start_time
 
-        try:
-            os.remove(locust_script)
-        except:
-            pass
+        load_runner.report_stats(environment, xml_reporter)
+        load_runner.report_cpu(environment, xml_reporter)
+        bmc_monitor.report(environment, xml_reporter)
+        open_loop.report(environment, xml_reporter)
+        capacity.report(environment, xml_reporter)
+        redfish_crawler.report(environment, xml_reporter)
+        sensor_telemetry.report(environment, xml_reporter)
+        fast_http.report(environment, xml_reporter)
+        session_pool.report(environment, xml_reporter)
+        phase_timing.report(xml_reporter)
+        slo_passed = slo.report(slo.evaluate(environment.stats, slo.load_budgets()), xml_reporter)
+        if HISTORY_DIR and scenario:
+            store = bench_history.scenario_store(HISTORY_DIR, scenario)
+            image = bench_history.detect_image(IMAGE_DIR)
+            index = image_metadata.load_index(IMAGE_DIR)
+            findings = bench_history.record_and_compare(
+                store, image,
+                bench_history.stats_from_environment(environment),
+                packages=index.images[image]["packages"] if image in index.images else None
+            )
+            bench_history.report(findings, xml_reporter)
+            bench_history.report_changes(bench_history.package_changes(store, image), xml_reporter)
+        total = environment.stats.total
+        if capacity.ENABLED:
+            # Уровни за изломом по определению выходят за бюджеты.
+            result = capacity.shape_result(environment)
+            success = bool(result and result["users"]) and not environment.runner.exceptions
+        else:
+            success = load_runner.load_passed(environment) and slo_passed
 
-        if result.returncode == 0:
-            xml_reporter.add_test_result('load', test_name, 'passed', 'Нагрузочные тесты завершены', duration)
+        load_runner.report_workers(environment, xml_reporter, failed=not success)
+        message = (f'Запросов: {total.num_requests}, ошибок: {total.num_failures}, '
+                   f'RPS: {total.total_rps:.2f}')
+        if success:
+            xml_reporter.add_test_result('load', test_name, 'passed', f'Нагрузочные тесты завершены. {message}', duration)
         else:
-            xml_reporter.add_test_result('load', test_name, 'failed', f'Ошибка: {result.stderr}', duration)
+            xml_reporter.add_test_result('load', test_name, 'failed', f'Ошибка: {message}', duration)
 
-        return result.returncode == 0
+        return success
 
     except Exception as e:
         duration = time.time() - start_time
@@ -504,6 +611,8 @@ class OpenBMCLoadTest(HttpUser):
 
 def run_all_tests():
     os.makedirs(RESULTS_DIR, exist_ok=True)
+    for path in XMLReporter.recover(xml_reporter.filename):
+        print(f"Восстановлен отчет прерванного запуска: {path}")
     
     pytest_args = [
         __file__,
@@ -516,7 +625,7 @@ def run_all_tests():
     
     load_success = run_load_test()
     
-    xml_reporter.save_xml(f"{RESULTS_DIR}/unified_test_results.xml")
+    xml_reporter.close()
     
     return exit_code == 0 and load_success
 
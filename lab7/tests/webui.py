@@ -0,0 +1,252 @@
+"""Вход в OpenBMC WebUI на явных ожиданиях и повторное использование сессии.
+
+WebUILogin.login() ждет форму входа и уход с маршрута #/login вместо
+фиксированных sleep. После входа cookies и localStorage сохраняются, и
+ensure_logged_in() в следующих тестах восстанавливает их вместо нового
+входа. ChromePool выдает headless Chrome на время теста и запускает
+новый экземпляр, только когда все созданные заняты параллельными
+UI-сценариями. StepTimer записывает длительность каждого шага.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+CHROME_PATHS = [
+    "/usr/bin/google-chrome",
+    "/usr/bin/chromium-browser",
+    "/usr/bin/chromium",
+    "/usr/bin/chrome"
+]
+WAIT_TIMEOUT = 20
+LOGIN_ROUTE = "#/login"
+PASSWORD_INPUT = (By.CSS_SELECTOR, "input[type='password']")
+USERNAME_INPUT = (By.CSS_SELECTOR, "input[type='text'], input:not([type])")
+LOGIN_BUTTON = (By.XPATH, "//button[contains(., 'Log in') or contains(., 'Login')]")
+NAVIGATION_LINKS = (By.TAG_NAME, "a")
+
+
+def chrome_options():
+    options = Options()
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--ignore-ssl-errors")
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--allow-running-insecure-content")
+    options.add_argument("--window-size=1920,1080")
+
+    for path in CHROME_PATHS:
+        if os.path.exists(path):
+            options.binary_location = path
+            break
+    return options
+
+
+def create_driver():
+    return webdriver.Chrome(options=chrome_options())
+
+
+class StepTimer:
+    def __init__(self, name):
+        self.name = name
+        self.steps = []
+
+    @contextmanager
+    def step(self, step_name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((step_name, time.perf_counter() - start))
+
+    def summary(self):
+        return " ".join(f"{name}={seconds:.2f}s" for name, seconds in self.steps)
+
+    def dump(self, path):
+        """Дописывает шаги в JSON Lines файл."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"test": self.name, "steps": dict(self.steps)}) + "\n")
+
+
+class WebUILogin:
+    def __init__(self, base_url, username, password, timeout=WAIT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.state = None
+        self._lock = threading.Lock()
+
+    def wait(self, driver):
+        return WebDriverWait(driver, self.timeout)
+
+    def logged_in(self, driver):
+        return LOGIN_ROUTE not in driver.current_url
+
+    def wait_logged_in(self, driver):
+        self.wait(driver).until(
+            lambda d: self.logged_in(d) and d.execute_script("return document.readyState") == "complete"
+        )
+
+    def login(self, driver, timer=None):
+        """Полный вход через форму; возвращает True при уходе с #/login."""
+        timer = timer or StepTimer("login")
+
+        with timer.step("open"):
+            driver.get(f"{self.base_url}/{LOGIN_ROUTE}")
+        with timer.step("form"):
+            password_field = self.wait(driver).until(EC.visibility_of_element_located(PASSWORD_INPUT))
+            username_field = next(
+                (f for f in driver.find_elements(*USERNAME_INPUT) if f.is_displayed()), None
+            )
+            if username_field is None:
+                raise AssertionError("Не найдены поля для ввода логина/пароля")
+        with timer.step("submit"):
+            username_field.clear()
+            username_field.send_keys(self.username)
+            password_field.clear()
+            password_field.send_keys(self.password)
+            self.wait(driver).until(EC.element_to_be_clickable(LOGIN_BUTTON)).click()
+        with timer.step("redirect"):
+            try:
+                self.wait_logged_in(driver)
+            except TimeoutException:
+                return False
+
+        with timer.step("save_state"):
+            self.save_state(driver)
+        return True
+
+    def save_state(self, driver):
+        state = {
+            "cookies": driver.get_cookies(),
+            "local_storage": driver.execute_script(
+                "return Object.assign({}, window.localStorage);"
+            ),
+        }
+        with self._lock:
+            self.state = state
+
+    def restore(self, driver, timer=None):
+        """Восстанавливает сохраненную сессию в браузере без формы входа."""
+        timer = timer or StepTimer("restore")
+        with self._lock:
+            state = self.state
+        if state is None:
+            return False
+
+        with timer.step("restore"):
+            driver.get(f"{self.base_url}/{LOGIN_ROUTE}")
+            for cookie in state["cookies"]:
+                cookie = {k: v for k, v in cookie.items() if k != "sameSite" or v in ("Strict", "Lax", "None")}
+                try:
+                    driver.add_cookie(cookie)
+                except WebDriverException:
+                    pass
+            driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) window.localStorage.setItem(k, v);",
+                state["local_storage"]
+            )
+            driver.get(f"{self.base_url}/")
+        with timer.step("redirect"):
+            try:
+                self.wait_logged_in(driver)
+            except TimeoutException:
+                return False
+        return True
+
+    def ensure_logged_in(self, driver, timer=None):
+        """Текущая сессия браузера, сохраненное состояние или полный вход."""
+        timer = timer or StepTimer("ensure_logged_in")
+        if driver.current_url.startswith(self.base_url) and self.logged_in(driver):
+            return True
+        if self.restore(driver, timer):
+            return True
+        return self.login(driver, timer)
+
+    def wait_for_navigation(self, driver, keywords):
+        """Ждет появления ссылки навигации с одним из keywords в тексте."""
+        def find(d):
+            for link in d.find_elements(*NAVIGATION_LINKS):
+                text = link.text.lower()
+                if any(keyword in text for keyword in keywords):
+                    return link
+            return False
+
+        try:
+            return self.wait(driver).until(find)
+        except TimeoutException:
+            return None
+
+
+class ChromePool:
+    """До size headless Chrome; драйвер создается, когда свободных нет.
+
+    Свободные драйверы выдаются в порядке LIFO, чтобы последовательные
+    тесты получали один и тот же уже авторизованный браузер.
+    """
+
+    def __init__(self, size=1, factory=create_driver):
+        if size < 1:
+            raise ValueError("Размер пула Chrome должен быть не меньше 1")
+        self.size = size
+        self.factory = factory
+        self._idle = queue.LifoQueue()
+        self._drivers = []
+        self._starting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = len(self._drivers) + self._starting < self.size
+            if create:
+                self._starting += 1
+        if not create:
+            return self._idle.get(timeout=timeout)
+        try:
+            driver = self.factory()
+        finally:
+            with self._lock:
+                self._starting -= 1
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def release(self, driver):
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+        self._drivers.clear()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""JUnit XML отчет с потоковой записью результатов на диск.
+
+Каждый <testcase> сразу дописывается во фрагмент своего testsuite
+в каталоге <filename>.parts.<pid>. Итоговый файл собирается из
+фрагментов при save_xml()/close() через временный файл и os.replace,
+поэтому Jenkins никогда не видит наполовину записанный XML. Если процесс
+был убит, фрагменты остаются на диске и собираются через recover().
+"""
+
+import atexit
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from xml.sax.saxutils import quoteattr
+
+STATUS_TAGS = {
+    'failed': 'failure',
+    'error': 'error',
+    'skipped': 'skipped',
+}
+
+
+class _Suite:
+    __slots__ = ('name', 'path', 'stream', 'tests', 'failures', 'errors', 'skipped', 'time')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.stream = None
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.skipped = 0
+        self.time = 0.0
+
+    def open_tag(self):
+        return (
+            f'<testsuite name={quoteattr(self.name)} tests="{self.tests}" '
+            f'failures="{self.failures}" errors="{self.errors}" '
+            f'skipped="{self.skipped}" time="{self.time:.3f}">'
+        )
+
+    def count(self, status, duration):
+        self.tests += 1
+        self.time += duration
+        if status == 'failed':
+            self.failures += 1
+        elif status == 'error':
+            self.errors += 1
+        elif status == 'skipped':
+            self.skipped += 1
+
+
+class XMLReporter:
+    def __init__(self, filename=None, name='OpenBMC Unified Tests'):
+        self.filename = filename
+        self.name = name
+        self.timestamp = datetime.now().isoformat()
+        self._suites = {}
+        self._lock = threading.RLock()
+        self._spool = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def _spool_dir(self):
+        if self._spool is None:
+            if self.filename:
+                self._spool = f"{self.filename}.parts.{os.getpid()}"
+            else:
+                self._spool = tempfile.mkdtemp(prefix='xml-reporter-')
+            os.makedirs(self._spool, exist_ok=True)
+            with open(os.path.join(self._spool, 'header'), 'w', encoding='utf-8') as f:
+                f.write(f'{self.name}\n{self.timestamp}\n')
+        return self._spool
+
+    def _suite(self, test_type):
+        suite = self._suites.get(test_type)
+        if suite is None:
+            path = os.path.join(self._spool_dir(), f'{len(self._suites):04d}.xml')
+            suite = _Suite(test_type, path)
+            suite.stream = open(path, 'ab', buffering=0)
+            suite.stream.write(f'<testsuite name={quoteattr(test_type)}>\n'.encode('utf-8'))
+            self._suites[test_type] = suite
+        return suite
+
+    def add_test_result(self, test_type, test_name, status, message="", duration=0):
+        testcase = ET.Element('testcase')
+        testcase.set('classname', test_type)
+        testcase.set('name', test_name)
+        testcase.set('time', f'{duration:.3f}')
+
+        tag = STATUS_TAGS.get(status)
+        if tag:
+            child = ET.SubElement(testcase, tag)
+            child.set('message', message)
+            child.text = message
+        elif message:
+            ET.SubElement(testcase, 'system-out').text = message
+
+        # Один testcase на строку: так recover() отбрасывает оборванную запись.
+        data = ET.tostring(testcase, encoding='utf-8')
+        data = data.replace(b'\r', b'&#13;').replace(b'\n', b'&#10;') + b'\n'
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('XMLReporter уже закрыт')
+            suite = self._suite(test_type)
+            suite.stream.write(data)
+            suite.count(status, duration)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    'tests': s.tests,
+                    'failures': s.failures,
+                    'errors': s.errors,
+                    'skipped': s.skipped,
+                    'time': s.time,
+                }
+                for name, s in self._suites.items()
+            }
+
+    def save_xml(self, filename=None):
+        filename = filename or self.filename
+        if not filename:
+            raise ValueError('Не указан файл для XML отчета')
+        with self._lock:
+            _assemble(filename, self.name, self.timestamp, list(self._suites.values()))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                if self.filename and self._suites:
+                    self.save_xml()
+            finally:
+                for suite in self._suites.values():
+                    suite.stream.close()
+                if self._spool:
+                    shutil.rmtree(self._spool, ignore_errors=True)
+        atexit.unregister(self.close)
+
+    @classmethod
+    def recover(cls, filename, target=None):
+        """Собирает отчеты из фрагментов, оставшихся после аварийного завершения.
+
+        Возвращает список собранных файлов.
+        """
+        recovered = []
+        for spool in sorted(glob.glob(f"{glob.escape(filename)}.parts.*")):
+            pid = spool.rsplit('.', 1)[1]
+            if pid.isdigit() and _pid_alive(int(pid)):
+                continue
+
+            try:
+                with open(os.path.join(spool, 'header'), encoding='utf-8') as f:
+                    name, timestamp = f.read().splitlines()[:2]
+            except (OSError, ValueError):
+                name, timestamp = 'OpenBMC Unified Tests', datetime.now().isoformat()
+
+            suites = []
+            for path in sorted(glob.glob(os.path.join(spool, '*.xml'))):
+                suite = _recount(path)
+                if suite is not None:
+                    suites.append(suite)
+
+            out = target or f'{os.path.splitext(filename)[0]}.recovered.{pid}.xml'
+            _assemble(out, name, timestamp, suites)
+            shutil.rmtree(spool, ignore_errors=True)
+            recovered.append(out)
+        return recovered
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _recount(path):
+    """Восстанавливает счетчики suite по фрагменту, отбрасывая оборванный хвост."""
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    if not lines:
+        return None
+
+    try:
+        head = ET.fromstring(lines[0].decode('utf-8').strip()[:-1] + '/>')
+    except ET.ParseError:
+        return None
+    suite = _Suite(head.get('name', ''), path)
+
+    valid = [lines[0]]
+    for line in lines[1:]:
+        try:
+            testcase = ET.fromstring(line)
+        except ET.ParseError:
+            break
+        status = 'passed'
+        for status_name, tag in STATUS_TAGS.items():
+            if testcase.find(tag) is not None:
+                status = status_name
+        suite.count(status, float(testcase.get('time', 0)))
+        valid.append(line)
+
+    with open(path, 'wb') as f:
+        f.writelines(valid)
+    return suite
+
+
+def _assemble(filename, name, timestamp, suites):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tests = sum(s.tests for s in suites)
+    failures = sum(s.failures for s in suites)
+    errors = sum(s.errors for s in suites)
+    duration = sum(s.time for s in suites)
+
+    tmp = f'{filename}.tmp.{os.getpid()}'
+    with open(tmp, 'wb') as out:
+        out.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+        out.write(
+            f'<testsuites name={quoteattr(name)} timestamp={quoteattr(timestamp)} '
+            f'tests="{tests}" failures="{failures}" errors="{errors}" '
+            f'time="{duration:.3f}">\n'.encode('utf-8')
+        )
+        for suite in suites:
+            out.write(suite.open_tag().encode('utf-8') + b'\n')
+            with open(suite.path, 'rb') as fragment:
+                fragment.readline()
+                shutil.copyfileobj(fragment, out)
+            out.write(b'</testsuite>\n')
+        out.write(b'</testsuites>\n')
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, filename)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"Использование: {sys.argv[0]} RESULTS.xml")
+        sys.exit(2)
+    for path in XMLReporter.recover(sys.argv[1]):
+        print(f"Восстановлен отчет: {path}")